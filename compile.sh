@@ -51,8 +51,22 @@ echo "Generating meta files..."
 python3 "${PWD}"/src/generate_metainfo.py
 
 cp -f "${PWD}"/src/financials.py "${PWD}"/build/
+cp -f "${PWD}"/src/asyncresults.py "${PWD}"/build/
+cp -f "${PWD}"/src/budget.py "${PWD}"/build/
+cp -f "${PWD}"/src/hedge.py "${PWD}"/build/
+cp -f "${PWD}"/src/hosts.py "${PWD}"/build/
+cp -f "${PWD}"/src/lrucache.py "${PWD}"/build/
+cp -f "${PWD}"/src/prefetch.py "${PWD}"/build/
+cp -f "${PWD}"/src/ratelimit.py "${PWD}"/build/
+cp -f "${PWD}"/src/quoted.py "${PWD}"/build/
+cp -f "${PWD}"/src/sessions.py "${PWD}"/build/
+cp -f "${PWD}"/src/snapshot.py "${PWD}"/build/
+cp -f "${PWD}"/src/settings.py "${PWD}"/build/
+cp -f "${PWD}"/src/stats.py "${PWD}"/build/
+cp -f "${PWD}"/src/tickstore.py "${PWD}"/build/
 cp -f "${PWD}"/src/datacode.py "${PWD}"/build/
 cp -f "${PWD}"/src/baseclient.py "${PWD}"/build/
+cp -f "${PWD}"/src/breaker.py "${PWD}"/build/
 cp -f "${PWD}"/src/naivehtmlparser.py "${PWD}"/build/
 cp -f "${PWD}"/src/tz.py "${PWD}"/build/
 cp -f "${PWD}"/src/financials_ft.py "${PWD}"/build/
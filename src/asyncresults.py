@@ -0,0 +1,134 @@
+#  asyncresults.py - non-blocking cells using XVolatileResult
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import logging
+import queue
+import threading
+
+import uno
+import unohelper
+from com.sun.star.sheet import XVolatileResult
+
+logger = logging.getLogger(__name__)
+
+
+# logger.setLevel(logging.DEBUG)
+
+
+class VolatileResult(unohelper.Base, XVolatileResult):
+    """Value of one or more cells - Calc registers a listener and gets notified whenever the value changes"""
+
+    def __init__(self, value, on_idle=None):
+        self.value = value
+        self.listeners = []
+        self.on_idle = on_idle
+
+    def addResultListener(self, listener):
+        self.listeners.append(listener)
+        listener.modified(self._event())
+
+    def removeResultListener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+        if not self.listeners and self.on_idle:
+            self.on_idle(self)
+
+    def setValue(self, value):
+        if value == self.value:
+            return
+
+        self.value = value
+
+        event = self._event()
+        for listener in list(self.listeners):
+            try:
+                listener.modified(event)
+            except BaseException:
+                logger.exception("BaseException notifying listener value=%s", value)
+
+    def _event(self):
+        event = uno.createUnoStruct('com.sun.star.sheet.ResultEvent')
+        event.Source = self
+        event.Value = '' if self.value is None else self.value
+        return event
+
+
+class AsyncResults:
+    """
+    Hands out VolatileResult objects immediately and fills them on a worker thread. Results are grouped
+    (e.g. by source and ticker) so all cells of one group share a single fetch and notification pass.
+    """
+
+    def __init__(self):
+        self.results = {}  # key -> (VolatileResult, fetch)
+        self.groups = {}  # group -> set of keys
+        self.queued = set()  # groups waiting for the worker
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def get(self, key, group, fetch):
+
+        """
+        Return the VolatileResult for key and schedule a refresh of its group
+
+        :param key: unique key of the cell arguments - Calc expects the same object for the same arguments
+        :param group: results sharing one fetch e.g. (source, ticker)
+        :param fetch: function returning the current value for key
+        :return: VolatileResult
+        """
+
+        with self.lock:
+            entry = self.results.get(key)
+            if entry is None:
+                entry = (VolatileResult('Loading...', on_idle=lambda r: self._discard(key, group)), fetch)
+                self.results[key] = entry
+                self.groups.setdefault(group, set()).add(key)
+
+            if group not in self.queued:
+                self.queued.add(group)
+                self.queue.put(group)
+
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='financials-async', daemon=True)
+                self.thread.start()
+
+        return entry[0]
+
+    def _discard(self, key, group):
+        with self.lock:
+            self.results.pop(key, None)
+            keys = self.groups.get(group)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.groups[group]
+
+    def _run(self):
+        while True:
+            group = self.queue.get()
+            if group is None:
+                break
+
+            with self.lock:
+                self.queued.discard(group)
+                entries = [self.results[k] for k in self.groups.get(group, ()) if k in self.results]
+
+            # first fetch of a group goes to the network, all others are answered from the provider cache
+            for result, fetch in entries:
+                try:
+                    value = fetch()
+                except BaseException as e:
+                    logger.exception("BaseException group=%s", group)
+                    value = str(e)
+                result.setValue(value)
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
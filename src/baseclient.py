@@ -8,12 +8,26 @@
 #  version 3 of the License, or (at your option) any later version.
 
 
+import collections
+import contextlib
 import logging
 import os
 import pathlib
 import random
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from importlib import util
-from datacode import Datacode
+
+import breaker
+import lrucache
+import ratelimit
+import sessions
+import settings
+import stats
+import tickstore
+from datacode import Datacode, TTLClass, TTL_DEFAULTS, ttl_class
 
 logger = logging.getLogger(__name__)
 
@@ -24,18 +38,30 @@ logger = logging.getLogger(__name__)
 curl_cffi_present = not util.find_spec("curl_cffi") is None
 requests_present = not util.find_spec("requests") is None
 
-if curl_cffi_present:
-    logger.debug("Importing curl_cffi...")
-    from curl_cffi import requests, __version__ as requests_version, __name__ as requests_name
-elif requests_present:
-    logger.debug("Importing requests...")
-    import requests
-    requests_version = requests.__version__
-    requests_name = requests.__name__
-else:
+if not curl_cffi_present and not requests_present:
     raise Exception("Neither curl_cffi nor requests found.")
 
-# import requests
+# curl_cffi/requests are imported by import_requests() when the first session is created
+requests = None
+requests_version = None
+requests_name = None
+
+
+def import_requests():
+    global requests, requests_version, requests_name
+
+    if requests is None:
+        if curl_cffi_present:
+            logger.debug("Importing curl_cffi...")
+            from curl_cffi import requests as module, __version__ as version, __name__ as name
+        else:
+            logger.debug("Importing requests...")
+            import requests as module
+            version = module.__version__
+            name = module.__name__
+        requests_version, requests_name, requests = version, name, module
+
+    return requests
 
 
 class HttpException(Exception):
@@ -55,14 +81,280 @@ class HttpException(Exception):
             return f"url='{self.url}' status={self.response.status_code} reason='{self.response.reason}'"
 
 
+class ThrottledException(HttpException):
+    """
+    Request not sent as the rate limit of its host would have meant waiting too long
+    """
+
+
+# HTTP requests made by each thread, used to tell cache hits from misses
+counters = threading.local()
+
+
+def thread_requests():
+    return getattr(counters, 'requests', 0)
+
+
+def count_requests(n):
+    counters.requests = thread_requests() + n
+
+
+def counted(fn, *args):
+
+    """
+    Call fn e.g. on a pool thread for another thread - that thread adds the requests made with count_requests()
+
+    :return: tuple of fn's result and the number of HTTP requests it made
+    """
+
+    start = thread_requests()
+    result = fn(*args)
+    return result, thread_requests() - start
+
+
+def copy_cookies(source, target):
+
+    """
+    Copy all cookies of HTTP session source to session target - curl_cffi and requests sessions
+    """
+
+    for cookie in getattr(source.cookies, 'jar', source.cookies):
+        target.cookies.set(cookie.name, cookie.value, domain=cookie.domain, path=cookie.path)
+
+
+# source -> provider module, imported and instantiated on first use of the source
+PROVIDERS = {'YAHOO': 'financials_yahoo', 'FT': 'financials_ft', 'COINBASE': 'financials_coinbase'}
+
+# max. number of tickers in the working set of a client
+WORKING_SET_SIZE = 5000
+
+# min. seconds between two speculative fetches of the working set
+SPECULATE_INTERVAL = 5.0
+
+# responses of throttled requests, retried after a backoff
+RETRY_STATUS = frozenset((429, 503))
+
+# kinds of failed realtime lookups with their own time to live
+NOT_FOUND = 'not_found'  # the source answered but has no data e.g. misspelled or delisted ticker
+TRANSIENT = 'transient'  # network errors, rate limits, server errors
+
+
+class SingleFlight:
+    """
+    Concurrent calls for the same key wait for the first one and share its result
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}  # key -> Flight in progress
+
+    def do(self, key, fn):
+        while True:
+            with self.lock:
+                flight = self.calls.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self.calls[key] = Flight()
+
+            if leader:
+                break
+
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.results is None:
+                return flight.result
+            if key in flight.results:
+                return flight.results[key]
+            # a do_many() flight that didn't get a result for key
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            flight.done.set()
+
+        return flight.result
+
+    def do_many(self, keys, fn):
+
+        """
+        One call for several keys - keys in flight already are left out
+
+        :param fn: function called with the list of keys taken, returns dict of key to result
+        :return: dict of key to result
+        """
+
+        flight = Flight()
+        flight.results = {}
+
+        with self.lock:
+            taken = [key for key in keys if key not in self.calls]
+            for key in taken:
+                self.calls[key] = flight
+
+        if not taken:
+            return {}
+
+        try:
+            flight.results = fn(taken)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                for key in taken:
+                    del self.calls[key]
+            flight.done.set()
+
+        return flight.results
+
+
+class Flight:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.results = None  # dict of key to result for do_many()
+        self.error = None
+
+
+def new_tick():
+
+    """
+    Empty tick data - all datacodes and TIMESTAMP are None until fetched
+    """
+
+    tick = {}
+
+    tick[Datacode.ADJ_CLOSE] = None
+    tick[Datacode.ASKSIZE] = None
+    tick[Datacode.ASK] = None
+    tick[Datacode.AVG_DAILY_VOL_3MONTH] = None
+    tick[Datacode.BETA] = None
+    tick[Datacode.BIDSIZE] = None
+    tick[Datacode.BID] = None
+    tick[Datacode.CHANGE] = None
+    tick[Datacode.CHANGE_IN_PERCENT] = None
+    tick[Datacode.CURRENCY] = None
+    tick[Datacode.DIV] = None
+    tick[Datacode.DIV_YIELD] = None
+    tick[Datacode.EPS] = None
+    tick[Datacode.EXCHANGE] = None
+    tick[Datacode.EXPIRY_DATE] = None
+    tick[Datacode.EX_DIV_DATE] = None
+    tick[Datacode.FREE_FLOAT] = None
+    tick[Datacode.SETTLEMENT_DATE] = None
+    tick[Datacode.HIGH] = None
+    tick[Datacode.HIGH_52_WEEK] = None
+    tick[Datacode.INDUSTRY] = None
+    tick[Datacode.LAST_PRICE] = None
+    tick[Datacode.LAST_PRICE_DATE] = None
+    tick[Datacode.LAST_PRICE_TIME] = None
+    tick[Datacode.LOW] = None
+    tick[Datacode.LOW_52_WEEK] = None
+    tick[Datacode.MARKET_CAP] = None
+    tick[Datacode.NAME] = None
+    tick[Datacode.OPEN] = None
+    tick[Datacode.PAYOUT_RATIO] = None
+    tick[Datacode.PE_RATIO] = None
+    tick[Datacode.PREV_CLOSE] = None
+    tick[Datacode.SECTOR] = None
+    tick[Datacode.SHARES_OUT] = None
+    tick[Datacode.TICKER] = None
+    tick[Datacode.TIMEZONE] = None
+    tick[Datacode.VOLUME] = None
+
+    tick[Datacode.TIMESTAMP] = None
+
+    return tick
+
+
 class BaseClient:
+
+    section = None  # section in financials.ini with settings for this source
+
+    # cookies are set in self.session within cookie_session() and copied to the HTTP session of each thread
+    shared_cookies = True
+
     def __init__(self):
         self.last_url = None
         self.redirect_count = 0
 
+        # seconds realtime data is served from cache unless overridden per call
+        self.max_age = settings.getfloat(self.section, 'max_age', fallback=60.0) if self.section else 60.0
+
+        # seconds data of the other TTL classes is served from cache unless max_age is given per call
+        self.ttl = {c: settings.getfloat(self.section, 'ttl_' + c.value, fallback=t) if self.section else t
+                    for c, t in TTL_DEFAULTS.items()}
+
+        # keep data cached from the close of a trading session until the next one opens
+        self.market_hours = settings.getboolean('general', 'market_hours', fallback=True)
+
+        # seconds past max_age expired data is still returned while it is refreshed in the background, 0 to disable
+        self.max_stale = settings.getfloat(self.section, 'max_stale', fallback=0.0) if self.section else 0.0
+
+        # seconds a failed lookup is answered with the same error instead of asking the source again
+        self.failure_ttl = {
+            NOT_FOUND: settings.getfloat(self.section, 'failure_ttl_not_found', fallback=600.0) if self.section else 600.0,
+            TRANSIENT: settings.getfloat(self.section, 'failure_ttl_transient', fallback=30.0) if self.section else 30.0,
+        }
+        self.failures = lrucache.LRUCache('{}.failures'.format(self.section), weigh=lambda failure: 256)
+        # seconds to wait for connecting and for data, a hung connection must not stall a recalc
+        self.timeout = (settings.getfloat(self.section, 'connect_timeout', fallback=5.0) if self.section else 5.0,
+                        settings.getfloat(self.section, 'read_timeout', fallback=20.0) if self.section else 20.0)
+
+        # requests per second and host, requests sent at once and retries of throttled requests
+        self.rate = settings.getfloat(self.section, 'rate', fallback=5.0) if self.section else 5.0
+        self.burst = settings.getfloat(self.section, 'burst', fallback=10.0) if self.section else 10.0
+        self.max_retries = settings.getint(self.section, 'max_retries', fallback=3) if self.section else 3
+        self.max_wait = settings.getfloat(self.section, 'max_wait', fallback=10.0) if self.section else 10.0
+
+        # after breaker_failures failed requests in a row the source isn't asked for breaker_cooldown seconds
+        self.breaker = breaker.CircuitBreaker(
+            self.section, settings.getint(self.section, 'breaker_failures', fallback=5) if self.section else 5,
+            settings.getfloat(self.section, 'breaker_cooldown', fallback=60.0) if self.section else 60.0,
+            sum(self.timeout) + 10.0)
+
+        self.local = threading.local()  # HTTP session and status of the last request per thread
+        self.flight = SingleFlight()
+
+        # tickers looked up recently are refreshed together once the first of them has expired
+        self.speculative = settings.getboolean('general', 'speculative_prefetch', fallback=True)
+        self.working_window = settings.getfloat('general', 'working_set_window', fallback=3600.0)
+        self.working_set = collections.OrderedDict()  # ticker -> (time of last lookup, datacode)
+        self.working_lock = threading.Lock()
+        self.speculated_at = 0.0
+        self.speculator = None  # ThreadPoolExecutor for speculative fetches, created on first use
+
+        self.refresher = None  # ThreadPoolExecutor for background refreshes, created on first use
+        self.refreshing = set()  # keys of queued background refreshes
+        self.refresh_lock = threading.Lock()
+        self.session_lock = threading.RLock()  # self.session and self.sessions
+        self.cookie_generation = 0  # incremented whenever cookies of self.session may have changed
+
         self.basedir = os.path.join(str(pathlib.Path.home()), '.financials-extension')
         os.makedirs(self.basedir, exist_ok=True)
 
+        self.realtime = lrucache.LRUCache('{}.realtime'.format(self.section), on_evict=self._evicted)
+        self.partial = set()  # tickers in self.realtime only holding some of the fields e.g. from a multi-symbol request
+        self.loaded = set()  # tickers already looked up in the persistent store
+
+        # ticks survive restarts in cache.sqlite unless disabled
+        use_store = self.section and settings.getboolean('general', 'persistent_cache', fallback=True)
+        self.store = tickstore.shared() if use_store else None
+
+        self.session = self._new_session()
+        self.sessions = [self.session]
+        if not self.shared_cookies:
+            self.local.session = self.session
+
+    def _new_session(self):
+
         user_agents = [
             'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:133.0) Gecko/20100101 Firefox/133.0',
             'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:134.0) Gecko/20100101 Firefox/134.0',
@@ -71,31 +363,95 @@ class BaseClient:
             'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:137.0) Gecko/20100101 Firefox/137.0',
         ]
 
+        requests = import_requests()
+
         if curl_cffi_present:
-            self.session = requests.Session()
-            if logger.isEnabledFor(logging.DEBUG) and self.session.curl:
-                self.session.curl.debug()
+            session = requests.Session()
+            if logger.isEnabledFor(logging.DEBUG) and session.curl:
+                session.curl.debug()
         else:
-            self.session = requests.Session()
-            self.session.headers.update({'User-Agent': random.sample(user_agents, 1)[0],
-                                         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                                         'Accept-Encoding': 'gzip, deflate',
-                                         'Accept-Language': 'en-US,en;q=0.5',
-                                         'Connection': 'keep-alive',
-                                         'Cache-Control': 'max-age=0',
-                                         })
+            session = requests.Session()
+            session.headers.update({'User-Agent': random.sample(user_agents, 1)[0],
+                                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                                    'Accept-Encoding': 'gzip, deflate',
+                                    'Accept-Language': 'en-US,en;q=0.5',
+                                    'Connection': 'keep-alive',
+                                    'Cache-Control': 'max-age=0',
+                                    })
 
-        self.session.max_redirects = 5
+        session.max_redirects = 5
 
-    def urlopen(self, url, data=None):
+        return session
+
+    def _thread_session(self):
+
+        """
+        HTTP session of the current thread - with shared_cookies it holds a copy of the cookies of self.session
+        """
+
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = self._new_session()
+            with self.session_lock:
+                self.sessions.append(session)
+
+        if self.shared_cookies and getattr(self.local, 'generation', None) != self.cookie_generation:
+            with self.session_lock:
+                copy_cookies(self.session, session)
+                self.local.generation = self.cookie_generation
+
+        return session
+
+    @contextlib.contextmanager
+    def cookie_session(self):
+
+        """
+        Requests of the current thread within the block are sent with self.session e.g. to get cookies and a crumb,
+        requests of other threads continue with their own sessions and pick up the new cookies afterwards
+        """
+
+        with self.session_lock:
+            self.local.cookies = True
+            try:
+                yield self.session
+            finally:
+                self.local.cookies = False
+                self.cookie_generation += 1
+
+    def urlopen(self, url, data=None, retries=None):
+
+        """
+        :param retries: retries of throttled requests, default max_retries
+        :return: response text
+        """
 
         self.last_url = None
 
-        resp = self.session.request('POST' if data else 'GET', url, data=data)
+        count_requests(1)
 
-        if 400 <= resp.status_code < 500:
-            if resp.headers.get('X-Cache') == 'Error from cloudfront':
-                resp = self.session.request('POST' if data else 'GET', url, data=data)
+        self.local.status = None
+
+        if not self.breaker.allow():
+            raise HttpException(url, 'source unavailable - not asked again for {:.0f} s'.format(
+                self.breaker.retry_in()))
+
+        try:
+            if getattr(self.local, 'cookies', False):
+                resp = self._request(self.session, url, data, retries)
+            else:
+                resp = self._request(self._thread_session(), url, data, retries)
+        except HttpException:
+            raise  # rate limited, nothing sent
+        except BaseException:
+            self.breaker.failure()
+            raise
+
+        if resp.status_code >= 500 or resp.status_code in RETRY_STATUS:
+            self.breaker.failure()
+        else:
+            self.breaker.success()
+
+        self.local.status = resp.status_code
 
         if resp.status_code >= 400:
             logger.warning("url='%s' status=%s reason='%s' headers=%s", resp.url,
@@ -108,52 +464,451 @@ class BaseClient:
 
         return resp.text
 
-    def get_ticker(self):
+    def _request(self, session, url, data, retries=None):
+
+        """
+        Send a request within the rate limit of its host - throttled requests are retried after Retry-After or
+        an exponential backoff, waiting at most max_wait seconds for a slot
+        """
+
+        host = urllib.parse.urlsplit(url).hostname
+        limiter = ratelimit.bucket(host, self.rate, self.burst)
+
+        retries = self.max_retries if retries is None else retries
+        attempt = 0
+        cloudfront_retried = False
+
+        while True:
+            if not limiter.acquire(self.max_wait):
+                self.local.status = 429
+                raise ThrottledException(url, 'rate limited - {} not asked again within {} s'.format(
+                    host, self.max_wait))
+
+            resp = session.request('POST' if data else 'GET', url, data=data, timeout=self.timeout)
+
+            if resp.status_code in RETRY_STATUS:
+                stats.throttled(host)
+                delay = limiter.backoff(attempt, resp.headers.get('Retry-After'))
+                logger.warning("url='%s' status=%s - requests to %s wait %.1f s", url, resp.status_code, host, delay)
+                if attempt < retries:
+                    attempt += 1
+                    continue
+
+            elif 400 <= resp.status_code < 500 and not cloudfront_retried:
+                if resp.headers.get('X-Cache') == 'Error from cloudfront':
+                    cloudfront_retried = True
+                    continue
+
+            return resp
+
+    def getRealtime(self, ticker, datacode, max_age=None):
+
+        """
+        Retrieve realtime data for ticker - served from cache if younger than max_age (or the time to live of
+        the datacode's TTL class), otherwise fetched with _fetch_realtime() and cached for further lookups.
+        With max_stale set, data up to max_stale seconds past that is returned as is and refreshed in the background.
+
+        :param ticker: the ticker symbol
+        :param datacode: the requested datacode
+        :param max_age: max. age of cached data in seconds for all datacodes, default by TTL class
+        :return: value, None or error message
+        """
+
+        ticker = self.normalize(ticker)
+
+        if self.speculative:
+            with self.working_lock:
+                self.working_set[ticker] = (time.time(), datacode)
+                self.working_set.move_to_end(ticker)
+                if len(self.working_set) > WORKING_SET_SIZE:
+                    self.working_set.popitem(last=False)
+
+        tick = self.cached(ticker, datacode, max_age)
+        if tick is not None:
+            return self._return_value(tick, datacode)
+
+        # max_age 0 always asks for fresh data
+        if self.max_stale and max_age != 0:
+            tick = self.cached(ticker, datacode, max_age, self.max_stale)
+            if tick is not None:
+                self.refresh(ticker, lambda: self.flight.do((ticker, self.fetch_kind(datacode)),
+                                                            lambda: self._refresh_realtime(ticker, datacode)))
+                self.speculate(ticker)
+                return self._return_value(tick, datacode)
+
+        # source is down - answer from cache without waiting for requests to fail
+        if not self.breaker.allow():
+            return self._unavailable(ticker, datacode)
+
+        if max_age != 0:
+            failure = self.failed(ticker)
+            if failure is not None:
+                self.breaker.release()
+                return failure[1]
+
+        self.speculate(ticker)
+
+        # concurrent lookups needing the same fetch share it - a thread holding the breaker's probe that was
+        # answered by another thread's fetch gives it up
+        try:
+            result = self.flight.do((ticker, self.fetch_kind(datacode)),
+                                    lambda: self._fetch_and_cache(ticker, datacode))
+        finally:
+            self.breaker.release()
+
+        if type(result) != dict:
+            return result
+
+        return self._return_value(result, datacode)
+
+    def getCached(self, ticker, datacode):
+
+        """
+        Realtime data for ticker from cache only, however old it is
+
+        :return: value ('' if the cached tick has no value for datacode) or None if not cached
+        """
+
+        ticker = self.normalize(ticker)
+
+        tick = self.cached(ticker, datacode, stale=float('inf'))
+        if tick is None:
+            return None
+
+        value = self._return_value(tick, datacode)
+        return '' if value is None else value
+
+    def _unavailable(self, ticker, datacode):
+
+        """
+        Answer of getRealtime() while the circuit breaker is open
+
+        :return: cached value however old or error message
+        """
+
+        value = self.getCached(ticker, datacode)
+        if value is not None:
+            return value
+
+        return '{}.getRealtime({}, {}) - source unavailable, not asked again for {:.0f} s'.format(
+            type(self).__name__, ticker, datacode, self.breaker.retry_in())
+
+    def speculate(self, ticker):
+
+        """
+        Ticker has expired - fetch the other expired tickers of the working set in the background so they are
+        cached or in flight by the time their cells ask for them
+        """
 
-        tick = {}
-
-        tick[Datacode.ADJ_CLOSE] = None
-        tick[Datacode.ASKSIZE] = None
-        tick[Datacode.ASK] = None
-        tick[Datacode.AVG_DAILY_VOL_3MONTH] = None
-        tick[Datacode.BETA] = None
-        tick[Datacode.BIDSIZE] = None
-        tick[Datacode.BID] = None
-        tick[Datacode.CHANGE] = None
-        tick[Datacode.CHANGE_IN_PERCENT] = None
-        tick[Datacode.CURRENCY] = None
-        tick[Datacode.DIV] = None
-        tick[Datacode.DIV_YIELD] = None
-        tick[Datacode.EPS] = None
-        tick[Datacode.EXCHANGE] = None
-        tick[Datacode.EXPIRY_DATE] = None
-        tick[Datacode.EX_DIV_DATE] = None
-        tick[Datacode.FREE_FLOAT] = None
-        tick[Datacode.SETTLEMENT_DATE] = None
-        tick[Datacode.HIGH] = None
-        tick[Datacode.HIGH_52_WEEK] = None
-        tick[Datacode.INDUSTRY] = None
-        tick[Datacode.LAST_PRICE] = None
-        tick[Datacode.LAST_PRICE_DATE] = None
-        tick[Datacode.LAST_PRICE_TIME] = None
-        tick[Datacode.LOW] = None
-        tick[Datacode.LOW_52_WEEK] = None
-        tick[Datacode.MARKET_CAP] = None
-        tick[Datacode.NAME] = None
-        tick[Datacode.OPEN] = None
-        tick[Datacode.PAYOUT_RATIO] = None
-        tick[Datacode.PE_RATIO] = None
-        tick[Datacode.PREV_CLOSE] = None
-        tick[Datacode.SECTOR] = None
-        tick[Datacode.SHARES_OUT] = None
-        tick[Datacode.TICKER] = None
-        tick[Datacode.TIMEZONE] = None
-        tick[Datacode.VOLUME] = None
-
-        tick[Datacode.TIMESTAMP] = None
+        now = time.time()
+        if not self.speculative or now - self.speculated_at < SPECULATE_INTERVAL or not self.breaker.closed():
+            return
+        self.speculated_at = now
+
+        with self.working_lock:
+            candidates = [(t, d) for t, (used, d) in self.working_set.items()
+                          if t != ticker and now - used < self.working_window]
+
+        expired = [(t, d) for t, d in candidates if self.cached(t, d) is None and self.failed(t) is None]
+        if not expired:
+            return
+
+        logger.debug("Speculative fetch of %s tickers after ticker=%s", len(expired), ticker)
+
+        try:
+            self._speculate(expired)
+        except RuntimeError:
+            pass  # closed
+
+    def _speculate(self, expired):
+
+        """
+        Fetch expired (ticker, datacode) pairs on the speculator pool - one fetch per ticker unless overridden
+        """
+
+        for t, d in expired:
+            self.speculator_pool().submit(self._speculative_fetch, t, d)
+
+    def _speculative_fetch(self, ticker, datacode):
+        try:
+            self.flight.do((ticker, self.fetch_kind(datacode)), lambda: self._fetch_and_cache(ticker, datacode))
+        except BaseException:
+            logger.exception("BaseException speculative fetch ticker=%s", ticker)
+
+    def speculator_pool(self):
+        with self.refresh_lock:
+            if self.speculator is None:
+                workers = settings.getint(self.section, 'workers', fallback=4) if self.section else 4
+                self.speculator = ThreadPoolExecutor(max_workers=max(1, workers or 1),
+                                                     thread_name_prefix='financials-speculate')
+            return self.speculator
+
+    def _fetch_and_cache(self, ticker, datacode):
+        result = self._fetch_realtime(ticker, datacode)
+
+        # a cached tick is kept, however old, e.g. to answer from while the circuit breaker is open
+        if type(result) != dict:
+            self.fail(ticker, result)
+            return result
+
+        self.failures.pop(ticker, None)
+        self.stamp(result)
+        self.realtime[ticker] = result
+        self.save(ticker)
+
+        return result
+
+    def fetch_kind(self, datacode):
+
+        """
+        Lookups of a ticker with the same fetch kind are answered by the same fetch - a source fetching different
+        data depending on datacode returns different kinds
+
+        :return: any hashable value
+        """
+
+        return None
+
+    def failed(self, ticker):
+
+        """
+        Failure of the last lookup of ticker if it is to be repeated instead of asking the source again
+
+        :return: tuple of expiry timestamp and result or None
+        """
+
+        failure = self.failures.get(ticker)
+        if failure is not None and time.time() < failure[0]:
+            return failure
+        return None
+
+    def fail(self, ticker, result):
+
+        """
+        Remember a failed lookup - it is not found if the source answered, transient otherwise
+        """
+
+        status = getattr(self.local, 'status', None)
+        kind = NOT_FOUND if status is not None and (status < 400 or status == 404) else TRANSIENT
+
+        logger.debug("Caching failure ticker=%s kind=%s status=%s result=%s", ticker, kind, status, result)
+        self.failures[ticker] = (time.time() + self.failure_ttl[kind], result)
+
+    def _refresh_realtime(self, ticker, datacode):
+        result = self._fetch_realtime(ticker, datacode)
+
+        # stale data is kept on errors until it is older than max_stale
+        if type(result) == dict:
+            self.stamp(result)
+            self.realtime[ticker] = result
+            self.save(ticker)
+        else:
+            logger.warning("Background refresh of ticker=%s failed: %s", ticker, result)
+
+        return result
+
+    def refresh(self, key, fn):
+
+        """
+        Run fn in the background unless a refresh for key is queued already
+        """
+
+        if not self.breaker.closed():
+            return
+
+        with self.refresh_lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+            if self.refresher is None:
+                self.refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='financials-refresh')
+
+        def run():
+            try:
+                fn()
+            except BaseException:
+                logger.exception("BaseException refreshing key=%s", key)
+            finally:
+                with self.refresh_lock:
+                    self.refreshing.discard(key)
+
+        self.refresher.submit(run)
+
+    def _fetch_realtime(self, ticker, datacode):
+
+        """
+        Fetch realtime data for ticker once its cached tick has expired - sources override it, it may run on
+        several threads at once for different tickers. A tick (see new_tick()) is cached, anything else is shown in
+        the cell and cached as a failure: not found if self.local.status is below 400 or 404, transient otherwise.
+
+        :param ticker: the normalized ticker symbol
+        :param datacode: the requested datacode, for messages and sources fetching different data per datacode
+        :return: tick data or error message
+        """
+
+        return '{} does not support realtime data'.format(type(self).__name__)
+
+    def normalize(self, ticker):
+        # remove white space
+        return "".join(ticker.split())
+
+    def cached(self, ticker, datacode, max_age=None, stale=0.0):
+
+        """
+        Cached realtime tick for ticker if it can answer datacode and is younger than max_age
+
+        :param stale: seconds past max_age the tick is still accepted
+        :return: tick data or None
+        """
+
+        tick = self.load(ticker)
+        if tick is None or type(tick.get(Datacode.TIMESTAMP)) != float:
+            return None
+
+        if time.time() < self._expiry(ticker, tick, datacode, max_age) + stale:
+            return tick
+
+        return None
+
+    def _expiry(self, ticker, tick, datacode, max_age):
+        ttl_cls = ttl_class(datacode)
+        fetched = tick.get(ttl_cls, tick[Datacode.TIMESTAMP])
+
+        if max_age is not None:
+            return fetched + max_age
+
+        expiry = fetched + (self.max_age if ttl_cls == TTLClass.LIVE else self.ttl[ttl_cls])
+        exchange = self.exchange(ticker, tick)
+
+        # daily values change with the next session at the latest
+        if ttl_cls == TTLClass.DAILY:
+            opens = sessions.next_open(exchange, fetched)
+            if opens and opens < expiry:
+                expiry = opens
+
+        # nothing changes until the market opens again
+        if self.market_hours:
+            opens = sessions.closed_until(exchange, fetched)
+            if opens and opens > expiry:
+                return opens
+
+        return expiry
+
+    def exchange(self, ticker, tick):
+
+        """
+        Exchange of ticker for looking up its trading session
+
+        :return: exchange name or None
+        """
+
+        return tick.get(Datacode.EXCHANGE)
+
+    def stamp(self, tick):
+
+        """
+        Record fetch time per TTL class in a freshly fetched tick - classes stamped already are kept
+        """
+
+        for ttl_cls in TTLClass:
+            tick.setdefault(ttl_cls, tick[Datacode.TIMESTAMP])
+
+        return tick
+
+    def merge(self, tick, fresh, ttl_classes):
+
+        """
+        Update fields of the given TTL classes in cached tick from a fresh (partial) tick, other fields keep their values
+
+        :return: the updated tick
+        """
+
+        for datacode, value in fresh.items():
+            if isinstance(datacode, Datacode) and datacode != Datacode.TIMESTAMP and ttl_class(datacode) in ttl_classes:
+                tick[datacode] = value
+
+        self.stamp(tick)
+        for ttl_cls in ttl_classes:
+            tick[ttl_cls] = fresh[Datacode.TIMESTAMP]
+        tick[Datacode.TIMESTAMP] = fresh[Datacode.TIMESTAMP]
 
         return tick
 
+    def load(self, ticker):
+
+        """
+        Realtime tick for ticker from memory - looked up once in the persistent store if not there
+
+        :return: tick data or None
+        """
+
+        tick = self.realtime.get(ticker)
+        if tick is not None or self.store is None or ticker in self.loaded:
+            return tick
+
+        self.loaded.add(ticker)
+
+        try:
+            row = self.store.load(self.section, ticker, self.get_ticker())
+        except BaseException:
+            logger.exception("BaseException loading ticker=%s", ticker)
+            return None
+
+        if row is None:
+            return None
+
+        tick, partial = row
+        self.realtime[ticker] = tick
+        if partial:
+            self.partial.add(ticker)
+
+        return tick
+
+    def _evicted(self, ticker):
+        # reloaded from the persistent store on next lookup
+        self.partial.discard(ticker)
+        self.loaded.discard(ticker)
+
+    def save(self, *tickers):
+
+        """
+        Write cached realtime ticks to the persistent store
+        """
+
+        if self.store is None:
+            return
+
+        try:
+            self.store.save(self.section, [(t, self.realtime[t], t in self.partial) for t in tickers if t in self.realtime])
+        except BaseException:
+            logger.exception("BaseException saving tickers=%s", tickers)
+
+    def expires_at(self, ticker, datacode, max_age=None):
+
+        """
+        Time until which the cached realtime tick answers datacode without a fetch
+
+        :param ticker: the ticker symbol as passed to getRealtime()
+        :param datacode: the requested datacode
+        :param max_age: max. age of cached data in seconds, default by TTL class
+        :return: timestamp or None if not cached - for a cached failure the time it expires
+        """
+
+        ticker = self.normalize(ticker)
+
+        tick = self.realtime.get(ticker)
+        expiry = None
+        if tick is not None and type(tick.get(Datacode.TIMESTAMP)) == float:
+            expiry = self._expiry(ticker, tick, datacode, max_age)
+            if expiry > time.time():
+                return expiry
+
+        failure = self.failed(ticker) if max_age != 0 else None
+        return failure[0] if failure else expiry
+
+    def get_ticker(self):
+        return new_tick()
+
     def _return_value(self, data: dict, datacode: int):
 
         """
@@ -322,4 +1077,11 @@ class BaseClient:
         return curl_version
 
     def close(self):
-        self.session.close()
+        with self.refresh_lock:
+            if self.refresher is not None:
+                self.refresher.shutdown(wait=False)
+            if self.speculator is not None:
+                self.speculator.shutdown(wait=False)
+        with self.session_lock:
+            for session in self.sessions:
+                session.close()
@@ -0,0 +1,95 @@
+#  benchmark.py - timings of the extension's hot paths without network access
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  Run like the unit tests e.g. python3 src/benchmark.py
+
+import argparse
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import financials
+from datacode import Datacode
+
+
+def cached_instance():
+
+    """
+    FinancialsImpl with a fresh realtime tick for IBM in the Yahoo cache
+    """
+
+    instance = financials.createInstance(None)
+
+    tick = instance.yahoo.get_ticker()
+    tick[Datacode.TICKER] = 'IBM'
+    tick[Datacode.LAST_PRICE] = 123.45
+    tick[Datacode.NAME] = 'International Business Machines Corporation'
+    tick[Datacode.TIMESTAMP] = time.time() + 3600  # stays valid for the whole benchmark
+    instance.yahoo.realtime['IBM'] = tick
+
+    return instance
+
+
+def bench_realtime_cache_hit(number):
+
+    instance = cached_instance()
+
+    instance.getRealtime('IBM', 'LAST_PRICE', 'YAHOO')
+    fast = timeit.timeit(lambda: instance.getRealtime('IBM', 'LAST_PRICE', 'YAHOO'), number=number)
+
+    # full validation and provider cache lookup as done for every call before the memo
+    slow = timeit.timeit(lambda: instance._getRealtime('IBM', 'LAST_PRICE', 'YAHOO'), number=number)
+
+    instance.close()
+
+    print(f"getRealtime cache hit (memo):      {1e6 * fast / number:8.3f} us/call")
+    print(f"getRealtime cache hit (validated): {1e6 * slow / number:8.3f} us/call")
+
+
+def bench_startup(number):
+
+    """
+    Time to import the extension and create the add-in instance, each run in a fresh interpreter
+    """
+
+    code = ('import time; start = time.perf_counter(); import financials; f = financials.createInstance(None); '
+            'print(time.perf_counter() - start); f.close()')
+
+    timings = []
+    for _ in range(number):
+        out = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                             capture_output=True, text=True, check=True).stdout
+        timings.append(float(out.strip().splitlines()[-1]))
+
+    print(f"startup (import + createInstance):  {1e3 * min(timings):8.3f} ms min, {1e3 * statistics.median(timings):8.3f} ms median")
+
+    # first use of a source loads its provider and HTTP library
+    code = ('import financials; f = financials.createInstance(None); import time; start = time.perf_counter(); '
+            'f.yahoo; print(time.perf_counter() - start); f.close()')
+
+    out = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                         capture_output=True, text=True, check=True).stdout
+
+    print(f"first use of YAHOO provider:        {1e3 * float(out.strip().splitlines()[-1]):8.3f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=100000, help='calls per benchmark')
+    parser.add_argument('--startups', type=int, default=5, help='interpreter starts for startup benchmark')
+    args = parser.parse_args()
+
+    bench_startup(args.startups)
+    bench_realtime_cache_hit(args.number)
@@ -0,0 +1,125 @@
+#  breaker.py - circuit breaker failing lookups fast while a source is down
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import logging
+import threading
+import time
+
+import stats
+
+logger = logging.getLogger(__name__)
+
+
+# logger.setLevel(logging.DEBUG)
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Opens after a number of consecutive failed requests to a source - no requests are sent for a cool-down period,
+    then one thread may probe the source and its success closes the breaker again. A probe not finished within
+    probe_timeout seconds or given up with release() may be taken by another thread.
+    """
+
+    def __init__(self, name, threshold, cooldown, probe_timeout=30.0):
+
+        """
+        :param name: the source e.g. yahoo
+        :param threshold: consecutive failures opening the breaker, 0 to disable
+        :param cooldown: seconds the breaker stays open before a probe
+        :param probe_timeout: max. seconds one thread holds the probe
+        """
+
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.probe_timeout = probe_timeout
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_until = 0.0
+        self.probe = None  # thread probing the source while half open
+        self.probe_until = 0.0
+
+    def allow(self):
+
+        """
+        :return: True if the current thread may send requests to the source
+        """
+
+        if self.state == CLOSED:
+            return True
+
+        with self.lock:
+            now = time.time()
+
+            if self.state == OPEN and now >= self.opened_until:
+                self.state = HALF_OPEN
+                self.probe = None
+                logger.info("Circuit breaker %s half open - probing", self.name)
+
+            if self.state == HALF_OPEN:
+                if self.probe is None or now >= self.probe_until:
+                    self.probe = threading.get_ident()
+                    self.probe_until = now + self.probe_timeout
+                return self.probe == threading.get_ident()
+
+            return self.state == CLOSED
+
+    def closed(self):
+        return self.state == CLOSED
+
+    def retry_in(self):
+
+        """
+        :return: seconds until the source is probed again
+        """
+
+        return max(0.0, self.opened_until - time.time())
+
+    def release(self):
+
+        """
+        The current thread is done without having sent a request e.g. it was answered by another thread's fetch -
+        let another thread probe
+        """
+
+        if self.state != HALF_OPEN:
+            return
+
+        with self.lock:
+            if self.state == HALF_OPEN and self.probe == threading.get_ident():
+                self.probe = None
+
+    def success(self):
+        if self.state == CLOSED and self.failures == 0:
+            return
+
+        with self.lock:
+            if self.state == HALF_OPEN:
+                logger.info("Circuit breaker %s closed", self.name)
+            self.state = CLOSED
+            self.failures = 0
+            self.probe = None
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.threshold and self.failures >= self.threshold):
+                self.state = OPEN
+                self.opened_until = time.time() + self.cooldown
+                self.probe = None
+                stats.breaker_opened(self.name)
+                logger.warning("Circuit breaker %s open for %s s after %s failures", self.name, self.cooldown,
+                               self.failures)
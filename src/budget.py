@@ -0,0 +1,72 @@
+#  budget.py - time budget of a recalc pass
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# logger.setLevel(logging.DEBUG)
+
+
+# seconds without calls into the extension after which the next call starts a new recalc pass
+IDLE = 2.0
+
+
+class Budget:
+    """
+    Calc calls the extension's functions one cell after the other - a recalc pass is a run of calls with less than
+    IDLE seconds between the end of one and the start of the next. Once a pass has taken longer than its budget
+    lookups should not wait for the network any more.
+    """
+
+    def __init__(self, seconds, idle=IDLE):
+
+        """
+        :param seconds: time budget of a pass, 0 or None for no limit
+        :param idle: gap between calls starting a new pass
+        """
+
+        self.seconds = seconds
+        self.idle = idle
+        self.lock = threading.Lock()
+        self.started = 0.0  # start of the current pass
+        self.last = 0.0  # end of the last call
+        self.active = 0  # calls in progress
+        self.logged = False
+
+    def enter(self):
+        with self.lock:
+            now = time.time()
+            if self.active == 0 and now - self.last > self.idle:
+                self.started = now
+                self.logged = False
+            self.active += 1
+
+    def leave(self):
+        with self.lock:
+            self.active -= 1
+            self.last = time.time()
+
+    def exhausted(self):
+
+        """
+        :return: True if the current pass has used up its budget
+        """
+
+        if not self.seconds or time.time() - self.started <= self.seconds:
+            return False
+
+        if not self.logged:
+            self.logged = True
+            logger.warning("Recalc budget of %s s used up - answering from cache until the pass ends", self.seconds)
+
+        return True
@@ -64,4 +64,79 @@ class Datacode(Enum):
 
     @classmethod
     def has_value(cls, value):
-        return any(value == item.value for item in cls)
+        return value in cls._value2member_map_
+
+
+@unique
+class TTLClass(Enum):
+    """
+    How long realtime data stays valid - LIVE uses the source's max_age, the others have their own time to live
+    """
+
+    LIVE = 'live'  # prices and sizes changing during trading
+    INTRADAY = 'intraday'  # derived from the price e.g. ratios, or set once per session e.g. the open
+    DAILY = 'daily'  # changing at most once per trading day
+    STATIC = 'static'  # reference data changing rarely if ever
+
+
+TTL_CLASSES = {
+    Datacode.LAST_PRICE: TTLClass.LIVE,
+    Datacode.LAST_PRICE_DATE: TTLClass.LIVE,
+    Datacode.LAST_PRICE_TIME: TTLClass.LIVE,
+    Datacode.CHANGE: TTLClass.LIVE,
+    Datacode.CHANGE_IN_PERCENT: TTLClass.LIVE,
+    Datacode.LOW: TTLClass.LIVE,
+    Datacode.HIGH: TTLClass.LIVE,
+    Datacode.BID: TTLClass.LIVE,
+    Datacode.ASK: TTLClass.LIVE,
+    Datacode.BIDSIZE: TTLClass.LIVE,
+    Datacode.ASKSIZE: TTLClass.LIVE,
+    Datacode.VOLUME: TTLClass.LIVE,
+
+    Datacode.MARKET_CAP: TTLClass.INTRADAY,
+    Datacode.PE_RATIO: TTLClass.INTRADAY,
+    Datacode.DIV_YIELD: TTLClass.INTRADAY,
+    Datacode.PREV_CLOSE: TTLClass.INTRADAY,
+    Datacode.OPEN: TTLClass.INTRADAY,
+
+    Datacode.HIGH_52_WEEK: TTLClass.DAILY,
+    Datacode.LOW_52_WEEK: TTLClass.DAILY,
+    Datacode.AVG_DAILY_VOL_3MONTH: TTLClass.DAILY,
+    Datacode.BETA: TTLClass.DAILY,
+    Datacode.EPS: TTLClass.DAILY,
+    Datacode.DIV: TTLClass.DAILY,
+    Datacode.PAYOUT_RATIO: TTLClass.DAILY,
+    Datacode.FREE_FLOAT: TTLClass.DAILY,
+    Datacode.CLOSE: TTLClass.DAILY,
+    Datacode.ADJ_CLOSE: TTLClass.DAILY,
+
+    Datacode.NAME: TTLClass.STATIC,
+    Datacode.SECTOR: TTLClass.STATIC,
+    Datacode.INDUSTRY: TTLClass.STATIC,
+    Datacode.EXCHANGE: TTLClass.STATIC,
+    Datacode.CURRENCY: TTLClass.STATIC,
+    Datacode.SHARES_OUT: TTLClass.STATIC,
+    Datacode.EX_DIV_DATE: TTLClass.STATIC,
+    Datacode.EXPIRY_DATE: TTLClass.STATIC,
+    Datacode.SETTLEMENT_DATE: TTLClass.STATIC,
+    Datacode.TICKER: TTLClass.STATIC,
+    Datacode.TIMEZONE: TTLClass.STATIC,
+}
+
+# default time to live in seconds for classes other than LIVE
+TTL_DEFAULTS = {
+    TTLClass.INTRADAY: 900.0,
+    TTLClass.DAILY: 43200.0,
+    TTLClass.STATIC: 604800.0,
+}
+
+
+def ttl_class(datacode):
+
+    """
+    TTLClass of a datacode given as Datacode or its int value - LIVE if unknown
+    """
+
+    if not isinstance(datacode, Datacode):
+        datacode = Datacode._value2member_map_.get(datacode)
+    return TTL_CLASSES.get(datacode, TTLClass.LIVE)
@@ -16,11 +16,14 @@ import pathlib
 import platform
 import ssl
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
-from importlib import util
+from importlib import import_module, util
 import xml.etree.ElementTree as ET
 
+import uno
 import unohelper
 from com.financials.getinfo import Financials
 
@@ -32,6 +35,8 @@ logging.basicConfig(
     format="%(asctime)s %(name)s %(levelname)s %(message)s",
     level=logging.INFO)
 
+logger = logging.getLogger(__name__)
+
 # Add current directory to import path
 current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
 if current_dir not in sys.path:
@@ -48,19 +53,24 @@ if dateutil_missing or pyparsing_missing or pytz_missing:
     msg += ' pytz' if pytz_missing else ''
     raise Exception("THIS EXTENSION NEEDS THE FOLLOWING PYTHON 3 LIBRARIES INSTALLED:" + msg)
 
-import dateutil.parser
-import pytz
-import pyparsing
-import six
+# dateutil, pytz, pyparsing, six, providers and their HTTP libraries are imported on first use to keep loading fast
 
+from asyncresults import AsyncResults
+import baseclient
+from baseclient import BaseClient, PROVIDERS
+from budget import Budget
 from datacode import Datacode
-import financials_yahoo as yahoo
-import financials_coinbase as coinbase
-import financials_ft as ft
+from hedge import Hedger
+import prefetch
+import settings
+import stats
 
 implementation_name = "com.financials.getinfo.python.FinancialsImpl"  # as defined in Financials.xcu
 implementation_services = ("com.sun.star.sheet.AddIn",)
 
+# max. number of entries in the getRealtime fast path memo
+MEMO_SIZE = 100000
+
 # Disabling SSL certificate validation as Python setup on MacOS seems to be broken
 # Only reading public data so this should be safe
 
@@ -72,17 +82,46 @@ else:
     ssl._create_default_https_context = _create_unverified_https_context
 
 
-def profile(fn):
+# full per call tracing is opt-in, histograms are always kept in memory
+trace = stats.Trace(os.path.join(basedir, 'trace.log')) if settings.getboolean('general', 'trace') else None
+
+
+def profile(fn=None, name=None):
+
+    """
+    Record latency of calls in stats histograms by function, source and cache hit/miss
+
+    :param name: name to record calls under, defaults to the function's name
+    """
+
+    if fn is None:
+        return lambda f: profile(f, name)
+
+    name = name or fn.__name__
+    params = list(inspect.signature(fn).parameters)
+    source_index = params.index('source') if 'source' in params else None
+
     @wraps(fn)
     def with_profiling(*args, **kwargs):
+        requests = baseclient.thread_requests()
         start = time.perf_counter()
-        r = fn(*args, **kwargs)
-        elapsed = time.perf_counter() - start
+        error = True
+        r = None
+        try:
+            r = fn(*args, **kwargs)
+            error = stats.is_error(r)
+        finally:
+            elapsed = 1000 * (time.perf_counter() - start)
+
+            source = kwargs.get('source')
+            if source_index is not None and source_index < len(args):
+                source = args[source_index]
 
-        with open(os.path.join(basedir, 'trace.log'), "a+", encoding="utf-8") as text_file:
-            print(
-                f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')} {fn.__name__} *args={args[1:]} r='{r}' {(1000 * elapsed):.3f} ms",
-                file=text_file)
+            stats.record(name, str(source).upper(), 'hit' if baseclient.thread_requests() == requests else 'miss', elapsed, error)
+
+            if trace:
+                trace.write(
+                    f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')} {name} *args={args[1:]} r='{r}' {elapsed:.3f} ms")
 
         return r
 
@@ -94,23 +133,200 @@ class FinancialsImpl(unohelper.Base, Financials):
 
     def __init__(self, ctx):
         self.ctx = ctx
-        self.yahoo = yahoo.createInstance(ctx)
-        self.coinbase = coinbase.createInstance(ctx)
-        self.ft = ft.createInstance(ctx)
+        self.providers = {}
+        self.pools = {}  # source -> ThreadPoolExecutor for array formulas
+        self.lock = threading.Lock()
+        self.asyncresults = AsyncResults()
+        self.memo = {}  # (ticker, datacode, source, maxage) as passed by Calc -> (expiry timestamp, value)
+
+        # once a recalc pass has taken recalc_budget seconds remaining cells are answered from cache
+        self.budget = Budget(settings.getfloat('general', 'recalc_budget', fallback=30.0))
+
+        # opt-in: slow lookups of tickers listed by Yahoo and FT are also sent to the other source
+        self.hedger = Hedger(self.provider)
+
+        # offline mode: all data comes from a snapshot file, nothing is fetched
+        self.snapshot = settings.get('general', 'snapshot')
+
+        # optionally warm caches with all tickers referenced in open documents
+        if ctx is not None and settings.getboolean('general', 'prefetch') and not self.snapshot:
+            prefetch.start(ctx, self)
+
+    def provider(self, source):
+
+        """
+        The client for source (upper case) - created on first use, a proxy for the shared daemon if enabled or
+        a client answering from the snapshot file in offline mode
+
+        :return: BaseClient, quoted.RemoteClient or None if source is not supported
+        """
+
+        p = self.providers.get(source)
+        if p is None and source in PROVIDERS:
+            with self.lock:
+                p = self.providers.get(source)
+                if p is None:
+                    if self.snapshot:
+                        import snapshot
+                        self.providers.update(snapshot.load(self.snapshot))
+                        p = self.providers[source]
+                    elif settings.getboolean('daemon', 'enabled'):
+                        import quoted
+                        p = quoted.RemoteClient(source, lambda: import_module(PROVIDERS[source]).createInstance(self.ctx))
+                    else:
+                        p = import_module(PROVIDERS[source]).createInstance(self.ctx)
+                    self.providers[source] = p
+        return p
+
+    @property
+    def yahoo(self):
+        return self.provider('YAHOO')
+
+    @property
+    def ft(self):
+        return self.provider('FT')
+
+    @property
+    def coinbase(self):
+        return self.provider('COINBASE')
+
+    def getRealtime(self, ticker, datacode=None, source=None, maxage=None):
+        return self._realtime(ticker, datacode, source, maxage, True)
+
+    def _realtime(self, ticker, datacode, source, maxage, budgeted):
+
+        """
+        :param budgeted: True for calls blocking Calc, they are answered from cache once the recalc budget is used up
+        """
+
+        # fast path: repeated calls are answered from memo while the provider's cached tick is valid
+        hit = self.memo.get((ticker, datacode, source, maxage))
+        if hit is not None and time.time() < hit[0]:
+            stats.memo_hit(source)
+            return hit[1]
+
+        if not budgeted:
+            return self._lookupRealtime(ticker, datacode, source, maxage, False)
+
+        self.budget.enter()
+        try:
+            return self._lookupRealtime(ticker, datacode, source, maxage, True)
+        finally:
+            self.budget.leave()
 
-    @profile
-    def getRealtime(self, ticker, datacode=None, source=None):
+    @profile(name='getRealtime')
+    def _lookupRealtime(self, ticker, datacode, source, maxage, budgeted):
 
         if ticker == 'SUPPORT' or ticker == 'support':
             return self.support(datacode)
 
+        if ticker == 'STATS' or ticker == 'stats':
+            return self.stats(datacode)
+
+        if type(ticker) == tuple or type(datacode) == tuple:
+            return self._getRealtimeMatrix(ticker, datacode, source, maxage, budgeted)
+
+        return self._getRealtime(ticker, datacode, source, maxage, budgeted)
+
+    def _getRealtimeMatrix(self, ticker, datacode, source, maxage, budgeted=True):
+
+        """
+        Array formula form of getRealtime: a range of tickers and optionally a row of datacodes. With a single
+        datacode the result has the shape of the ticker range, otherwise there is one row per ticker and one column
+        per datacode. Tickers are deduplicated, Yahoo tickers are prefetched with multi-symbol requests and
+        tickers of other sources are looked up in parallel.
+
+        :param ticker: the ticker symbol or a range of ticker symbols
+        :param datacode: the requested datacode or a range of datacodes
+        :param source: the source e.g. YAHOO
+        :param maxage: max. age of cached data in seconds
+        :param budgeted: False for async calls not subject to the recalc budget
+        :return: uno.Any holding a 2-D array
+        """
+
+        if type(source) == tuple:
+            return 'Cell range not allowed for source'
+
         try:
-            if type(ticker) == tuple:
-                return 'Cell range not allowed for ticker'
+            max_age = self._max_age(maxage)
+        except:
+            return 'Max age is invalid'
 
-            if type(datacode) == tuple:
-                return 'Cell range not allowed for datacode'
+        tickers = ticker if type(ticker) == tuple else ((ticker,),)
+
+        if type(datacode) == tuple:
+            datacodes = [d for row in datacode for d in row]
+            rows = [[(t, d) for d in datacodes] for row in tickers for t in row]
+        else:
+            rows = [[(t, datacode) for t in row] for row in tickers]
 
+        unique = sorted({str(t).strip() for row in tickers for t in row if t})
+
+        results = {}
+
+        if str(source).upper() == 'YAHOO' and len(unique) > 1:
+            # over budget cells are answered from cache by _getRealtime()
+            codes = set()
+            for d in {d for row in rows for _, d in row}:
+                try:
+                    codes.add(self._datacode(d))
+                except:
+                    pass  # reported by _getRealtime()
+            error = None if budgeted and self.budget.exhausted() else \
+                self.yahoo.getRealtimeBatch(unique, max_age, sorted(codes))
+            if error:
+                return error
+
+        elif len(unique) > 1:
+            # sources without multi-symbol requests are asked for several tickers at the same time
+            pool = self.pool(str(source).upper())
+            pairs = list(dict.fromkeys((t, d) for row in rows for t, d in row if t))
+            if pool is not None and len(pairs) > 1:
+                values = pool.map(lambda p: baseclient.counted(self._getRealtime, p[0], p[1], source, maxage, budgeted),
+                                  pairs)
+                for key, (value, requests) in zip(pairs, values):
+                    results[key] = value
+                    baseclient.count_requests(requests)
+
+        matrix = []
+
+        for row in rows:
+            values = []
+            for t, d in row:
+                if not t:
+                    values.append('')
+                    continue
+                key = (t, d)
+                if key not in results:
+                    results[key] = self._getRealtime(t, d, source, maxage, budgeted)
+                values.append('' if results[key] is None else results[key])
+            matrix.append(tuple(values))
+
+        return uno.Any('[][]any', tuple(matrix))
+
+    def pool(self, source):
+
+        """
+        Threads for parallel lookups of one source - [<source>] workers in financials.ini, default 4
+
+        :return: ThreadPoolExecutor or None if disabled
+        """
+
+        if source not in PROVIDERS:
+            return None
+
+        with self.lock:
+            if source not in self.pools:
+                workers = settings.getint(source.lower(), 'workers', fallback=4)
+                self.pools[source] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='financials-' + source.lower()) \
+                    if workers and workers > 1 else None
+            return self.pools[source]
+
+    def _getRealtime(self, ticker, datacode, source, maxage=None, budgeted=True):
+
+        key = (ticker, datacode, source, maxage)
+
+        try:
             if type(source) == tuple:
                 return 'Cell range not allowed for source'
 
@@ -121,27 +337,39 @@ class FinancialsImpl(unohelper.Base, Financials):
                 return 'Datacode is empty'
 
             try:
-                dc = str(datacode).strip().upper()
-                if dc in Datacode.__members__:
-                    dc = Datacode[dc].value
-                datacode = int(float(dc))
+                datacode = self._datacode(datacode)
             except:
                 return 'Datacode is invalid'
 
             if not Datacode.has_value(datacode):
                 return 'Datacode {} not supported'.format(datacode)
 
+            try:
+                max_age = self._max_age(maxage)
+            except:
+                return 'Max age is invalid'
+
             ticker = str(ticker).strip()
             source = str(source).upper()
 
-            if source == 'YAHOO':
-                s = self.yahoo.getRealtime(ticker, datacode)
-            elif source == 'FT':
-                s = self.ft.getRealtime(ticker, datacode)
-            elif source == 'COINBASE':
-                s = self.coinbase.getRealtime(ticker, datacode)
+            provider = self.provider(source)
+            if provider is None:
+                return 'Source \'{}\' not supported'.format(source)
+
+            if budgeted and self.budget.exhausted():
+                stats.budget_exceeded(source)
+                s = provider.getCached(ticker, datacode)
+                if s is None:
+                    return 'Timed out - recalc budget of {} s used up'.format(self.budget.seconds)
+                try:
+                    return float(s)
+                except:
+                    return s
+
+            if self.hedger.applies(ticker, datacode, source) and not self.snapshot:
+                s = self.hedger.getRealtime(ticker, datacode, source, max_age)
             else:
-                s = 'Source \'{}\' not supported'.format(source)
+                s = provider.getRealtime(ticker, datacode, max_age)
 
         except Exception as ex:
             return str(ex)
@@ -151,11 +379,25 @@ class FinancialsImpl(unohelper.Base, Financials):
         except:
             x = s
 
+        expires = provider.expires_at(ticker, datacode, max_age)
+        if isinstance(expires, (int, float)):
+            if len(self.memo) >= MEMO_SIZE:
+                self.memo.clear()
+            self.memo[key] = (expires, x)
+
         return x
 
     @profile
     def getHistoric(self, ticker, datacode=None, date=None, source=None):
 
+        return self._getHistoric(ticker, datacode, date, source, True)
+
+    def _getHistoric(self, ticker, datacode, date, source, budgeted):
+
+        """
+        :param budgeted: True for calls blocking Calc, they are answered from cached history once the recalc budget is used up
+        """
+
         if ticker == 'SUPPORT':
             return self.support(datacode)
 
@@ -182,41 +424,22 @@ class FinancialsImpl(unohelper.Base, Financials):
                 return 'Date is empty'
 
             try:
-                dc = str(datacode).strip().upper()
-                if dc in Datacode.__members__:
-                    dc = Datacode[dc].value
-                datacode = int(float(dc))
+                datacode = self._datacode(datacode)
             except:
                 return 'Datacode {} is invalid'.format(datacode)
 
             if not Datacode.has_value(datacode):
                 return 'Datacode {} not supported'.format(datacode)
 
-            if type(date) == float or type(date) == int:
-
-                try:
-                    offset = int(date)  # offset for 1899-12-30
-                    d = dateutil.parser.parse('1899-12-30', yearfirst=True, dayfirst=False) + datetime.timedelta(days=offset)
-                    d = d.date().isoformat()
-                except:
-                    return 'Date format not supported: {}'.format(date)
-                date = d
-
-            elif type(date) == str:
-
-                try:
-                    int(dateutil.parser.parse(date, yearfirst=True, dayfirst=False).timestamp())
-                except:
-                    return 'Date format not supported: \'{}\''.format(date)
-
-            else:
-                return 'Date type not supported: {} \'{}\''.format(type(date), date)
+            date, error = self._date(date)
+            if error:
+                return error
 
             ticker = str(ticker).strip()
             source = str(source).upper()
 
             if source == 'YAHOO':
-                s = self.yahoo.getHistoric(str(ticker).strip(), datacode, date)
+                s = self._historic(source, budgeted, lambda fetch: self.yahoo.getHistoric(ticker, datacode, date, fetch))
             else:
                 s = 'Source \'{}\' not supported'.format(source)
 
@@ -230,9 +453,220 @@ class FinancialsImpl(unohelper.Base, Financials):
 
         return x
 
+    def getRealtimeAsync(self, ticker, datacode=None, source=None, maxage=None):
+
+        """
+        Non-blocking getRealtime: returns a volatile result at once which is filled in by a worker thread - the
+        worker doesn't block Calc and isn't subject to the recalc budget
+        """
+
+        return self.asyncresults.get(('getRealtime', ticker, datacode, source, maxage),
+                                     (str(source).upper(), str(ticker).strip()),
+                                     lambda: self._realtime(ticker, datacode, source, maxage, False))
+
+    def getHistoricAsync(self, ticker, datacode=None, date=None, source=None):
+
+        """
+        Non-blocking getHistoric: returns a volatile result at once which is filled in by a worker thread - the
+        worker doesn't block Calc and isn't subject to the recalc budget
+        """
+
+        return self.asyncresults.get(('getHistoric', ticker, datacode, date, source),
+                                     (str(source).upper(), str(ticker).strip()),
+                                     lambda: self._getHistoric(ticker, datacode, date, source, False))
+
+    def _historic(self, source, budgeted, lookup):
+
+        """
+        Historic lookup within the recalc budget - once it is used up cells are answered from cached history
+
+        :param budgeted: True for calls blocking Calc
+        :param lookup: function of fetch, with fetch False it answers from cache only and returns None if not cached
+        :return: result of lookup or error message
+        """
+
+        if not budgeted:
+            return lookup(True)
+
+        self.budget.enter()
+        try:
+            if not self.budget.exhausted():
+                return lookup(True)
+
+            stats.budget_exceeded(source)
+            s = lookup(False)
+            if s is None:
+                return 'Timed out - recalc budget of {} s used up'.format(self.budget.seconds)
+            return s
+        finally:
+            self.budget.leave()
+
+    def _datacode(self, datacode):
+
+        """
+        Convert a datacode name or number as passed from a cell to int - raises on invalid input
+        """
+
+        dc = str(datacode).strip().upper()
+        if dc in Datacode.__members__:
+            dc = Datacode[dc].value
+        return int(float(dc))
+
+    def _max_age(self, maxage):
+
+        """
+        Convert an optional max. age in seconds as passed from a cell - raises on invalid input
+
+        :return: float or None for the source's default
+        """
+
+        if maxage is None or maxage == '':
+            return None
+
+        max_age = float(maxage)
+        if max_age < 0:
+            raise ValueError(maxage)
+        return max_age
+
+    def _date(self, date):
+
+        """
+        Convert a date as passed from a cell (serial number or string) to a yyyy-mm-dd string
+
+        :return: tuple of date and error message
+        """
+
+        if type(date) == float or type(date) == int:
+
+            try:
+                offset = int(date)  # offset for 1899-12-30
+                d = datetime.datetime(1899, 12, 30) + datetime.timedelta(days=offset)
+                d = d.date().isoformat()
+            except:
+                return None, 'Date format not supported: {}'.format(date)
+            return d, None
+
+        elif type(date) == str:
+
+            import dateutil.parser
+
+            try:
+                int(dateutil.parser.parse(date, yearfirst=True, dayfirst=False).timestamp())
+            except:
+                return None, 'Date format not supported: \'{}\''.format(date)
+            return date, None
+
+        return None, 'Date type not supported: {} \'{}\''.format(type(date), date)
+
+    @profile
+    def getHistoricRange(self, ticker, start=None, end=None, datacodes=None, source=None):
+
+        """
+        Historic data for all trading days between start and end (inclusive) as one array - first column is the date
+        as serial number followed by one column per datacode (default OPEN, HIGH, LOW, CLOSE, VOLUME)
+
+        :param ticker: the ticker symbol e.g. VOD.L
+        :param start: the first date
+        :param end: the last date, defaults to today
+        :param datacodes: a datacode or a range of datacodes
+        :param source: the source, only YAHOO supported
+        :return: uno.Any holding a 2-D array or error message
+        """
+
+        if type(ticker) == tuple:
+            return 'Cell range not allowed for ticker'
+
+        if type(start) == tuple:
+            return 'Cell range not allowed for start date'
+
+        if type(end) == tuple:
+            return 'Cell range not allowed for end date'
+
+        if type(source) == tuple:
+            return 'Cell range not allowed for source'
+
+        try:
+            if not ticker:
+                return 'Ticker is empty'
+
+            if not start:
+                return 'Date is empty'
+
+            start, error = self._date(start)
+            if error:
+                return error
+
+            if end:
+                end, error = self._date(end)
+                if error:
+                    return error
+            else:
+                end = datetime.date.today().isoformat()
+
+            if type(datacodes) == tuple:
+                codes = [d for row in datacodes for d in row if d]
+            elif datacodes:
+                codes = [datacodes]
+            else:
+                codes = [Datacode.OPEN.value, Datacode.HIGH.value, Datacode.LOW.value, Datacode.CLOSE.value, Datacode.VOLUME.value]
+
+            try:
+                codes = [self._datacode(d) for d in codes]
+            except:
+                return 'Datacode {} is invalid'.format(datacodes)
+
+            for d in codes:
+                if not Datacode.has_value(d):
+                    return 'Datacode {} not supported'.format(d)
+
+            ticker = str(ticker).strip()
+            source = str(source).upper()
+
+            if source == 'YAHOO':
+                s = self._historic(source, True, lambda fetch: self.yahoo.getHistoricRange(ticker, codes, start, end, fetch))
+            else:
+                s = 'Source \'{}\' not supported'.format(source)
+
+        except Exception as ex:
+            return str(ex)
+
+        if type(s) != list:
+            return s
+
+        epoch = datetime.date(1899, 12, 30)
+
+        matrix = []
+        for date, values in s:
+            row = [float((datetime.date.fromisoformat(date) - epoch).days)]
+            for v in values:
+                try:
+                    row.append(float(v))
+                except:
+                    row.append('' if v is None else v)
+            matrix.append(tuple(row))
+
+        return uno.Any('[][]any', tuple(matrix))
+
+    def stats(self, datacode):
+
+        """
+        Latency histograms of calls by function, source and cache hit/miss - datacode RESET clears them
+        """
+
+        if str(datacode).strip().upper() == 'RESET':
+            stats.reset()
+            return 'Statistics reset'
+
+        return stats.report()
+
     @profile
     def support(self, datacode):
 
+        import dateutil
+        import pytz
+        import pyparsing
+        import six
+
         version = '0.0.0'
 
         description_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'description.xml')
@@ -270,7 +704,8 @@ class FinancialsImpl(unohelper.Base, Financials):
         if curl_impersonate:
             s += f"\nCURL_IMPERSONATE={curl_impersonate}"
 
-        if 'curl_cffi' in self.ft.version():
+        # the daemon's session isn't available in this process
+        if 'curl_cffi' in self.ft.version() and isinstance(self.ft, BaseClient):
             s += f"\ncurl_version=\"{self.ft.session.curl.version().decode()}\""
 
         if datacode:
@@ -282,9 +717,14 @@ class FinancialsImpl(unohelper.Base, Financials):
         return s
 
     def close(self):
-        if self.yahoo: self.yahoo.close()
-        if self.coinbase: self.coinbase.close()
-        if self.ft: self.ft.close()
+        self.asyncresults.close()
+        self.hedger.close()
+        for pool in list(self.pools.values()):
+            if pool is not None:
+                pool.shutdown(wait=False)
+        if trace: trace.flush()
+        for p in list(self.providers.values()):
+            p.close()
 
 
 def createInstance(ctx):
@@ -29,40 +29,32 @@ logger = logging.getLogger(__name__)
 # logger.setLevel(logging.DEBUG)
 
 class Coinbase(BaseClient):
+
+    section = 'coinbase'
+
+    shared_cookies = False  # no cookies needed
+
     def __init__(self, ctx):
         super().__init__()
 
         self.crumb = None
-        self.realtime = {}
 
-    def getRealtime(self, ticker, datacode):
+    def _fetch_realtime(self, ticker, datacode):
 
         """
-        Retrieve realtime data for ticker from Coinbase and cache it for further lookups
+        Retrieve realtime data for ticker from Coinbase - called by getRealtime() if not cached
 
         :param ticker: the ticker symbol e.g. ETH-EUR
-        :param datacode: the requested datacode, not all are supported
-        :return:
+        :param datacode: the requested datacode, only used for messages
+        :return: tick data or error message
         """
 
-        # remove white space
-        ticker = "".join(ticker.split())
-
-        # use cached value for up to 60 seconds
-        if ticker in self.realtime:
-            tick = self.realtime[ticker]
-            if Datacode.TIMESTAMP in tick and type(tick[Datacode.TIMESTAMP]) == float and time.time() - 60 < tick[Datacode.TIMESTAMP]:
-                return self._return_value(tick, datacode)
-            else:
-                del self.realtime[ticker]
-
         url = 'https://api.exchange.coinbase.com/products/{}/stats'.format(ticker)
 
         try:
             text = self.urlopen(url)
         except BaseException as e:
             logger.exception("BaseException ticker=%s datacode=%s last_url=%s redirect_count=%s", ticker, datacode, self.last_url, self.redirect_count)
-            del self.realtime[ticker]
             return 'Coinbase.getRealtime({}, {}) - urlopen: {}'.format(ticker, datacode, e)
 
         try:
@@ -76,7 +68,6 @@ class Coinbase(BaseClient):
 
         except BaseException as e:
             logger.exception("BaseException ticker=%s datacode=%s", ticker, datacode)
-            del self.realtime[ticker]
             return 'Coinbase.getRealtime({}, {}) - exception: {}'.format(ticker, datacode, e)
 
         try:
@@ -85,10 +76,7 @@ class Coinbase(BaseClient):
             if not price:
                 return 'Could not find price for \'{}\''.format(ticker)
 
-            if ticker not in self.realtime:
-                self.realtime[ticker] =  self.get_ticker()
-
-            tick = self.realtime[ticker]
+            tick = self.get_ticker()
 
             tick[Datacode.TIMESTAMP] = time.time()
             tick[Datacode.LAST_PRICE] = float(price)
@@ -101,10 +89,9 @@ class Coinbase(BaseClient):
 
         except BaseException as e:
             logger.exception("BaseException ticker=%s datacode=%s", ticker, datacode)
-            del self.realtime[ticker]
             return 'Coinbase.getRealtime({}, {}) - process: {}'.format(ticker, datacode, e)
 
-        return self._return_value(self.realtime[ticker], datacode)
+        return tick
 
 def createInstance(ctx):
     return Coinbase(ctx)
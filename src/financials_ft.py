@@ -41,35 +41,31 @@ def handle_abbreviations(s):
 
 class FT(BaseClient):
 
+    section = 'ft'
+
+    shared_cookies = False  # no cookies needed
+
     def __init__(self, ctx):
         super().__init__()
 
         self.crumb = None
-        self.realtime = {}
         self.historicdata = {}
 
-    def getRealtime(self, ticker: str, datacode: int):
+    def exchange(self, ticker, tick):
+        # FT tickers end with the exchange e.g. VOD:LSE, funds with the currency e.g. GB00B03MLX29:GBP
+        return ticker.split(':')[-1] if ':' in ticker else None
+
+    def _fetch_realtime(self, ticker: str, datacode: int):
 
         """
-        Retrieve data for ticker from Financial Times and cache it for further lookups
+        Retrieve data for ticker from Financial Times - called by getRealtime() if not cached
 
         :param ticker: the ticker symbol e.g. VOD:LSE
-        :param datacode: the requested datacode
-        :return:
+        :param datacode: the requested datacode, only used for messages
+        :return: tick data or error message
         """
 
-        # use cached value for up to 60 seconds
-        if ticker in self.realtime:
-            tick = self.realtime[ticker]
-            if Datacode.TIMESTAMP in tick and type(tick[Datacode.TIMESTAMP]) == float and time.time() - 60 < tick[Datacode.TIMESTAMP]:
-                return self._return_value(tick, datacode)
-            else:
-                del self.realtime[ticker]
-
-        if ticker not in self.realtime:
-            self.realtime[ticker] = self.get_ticker()
-
-        tick = self.realtime[ticker]
+        tick = self.get_ticker()
 
         asset_class = self.guess_asset_class(ticker)
 
@@ -79,7 +75,6 @@ class FT(BaseClient):
             text = self.urlopen(url)
         except BaseException as e:
             logger.exception("BaseException ticker=%s datacode=%s last_url=%s redirect_count=%s", ticker, datacode, self.last_url, self.redirect_count)
-            del self.realtime[ticker]
             return f'FT.getRealtime({ticker}, {datacode}) - urlopen endpoint: {str(e)}'
 
         try:
@@ -95,7 +90,9 @@ class FT(BaseClient):
             r = '<h1 class="mod-tearsheet-overview__header__name mod-tearsheet-overview__header__name--large">(.*?)</h1>'
             match = re.compile(r, flags=re.DOTALL).search(text)
             if not match:
-                return None
+                # the page was served but has no data for the ticker, don't ask again before failure_ttl_not_found
+                self.local.status = 404
+                return f'FT.getRealtime({ticker}, {datacode}) - no data'
             start = match.span(0)[1]
 
             tick[Datacode.NAME] = self.save_wrapper(
@@ -298,12 +295,14 @@ class FT(BaseClient):
 
         except BaseException as e:
             logger.exception("BaseException ticker=%s datacode=%s", ticker, datacode)
-            del self.realtime[ticker]
             return f'FT.getRealtime({ticker}, {datacode}) - process: {str(e)}'
 
         logger.debug(tick)
 
-        return self._return_value(self.realtime[ticker], datacode)
+        return tick
+
+    def normalize(self, ticker):
+        return ticker
 
     def getHistoric(self, ticker, datacode, date):
         return 'FT.getHistoric: Historic Data not implemented.'
@@ -19,8 +19,11 @@ import urllib.parse
 
 import dateutil.parser
 
-from baseclient import BaseClient, HttpException
-from datacode import Datacode
+import lrucache
+import settings
+from baseclient import BaseClient, HttpException, RETRY_STATUS, ThrottledException
+from hosts import HostPool
+from datacode import Datacode, TTLClass, ttl_class
 from naivehtmlparser import NaiveHTMLParser
 
 logger = logging.getLogger(__name__)
@@ -29,6 +32,10 @@ logger = logging.getLogger(__name__)
 # logger.setLevel(logging.DEBUG)
 
 
+# equivalent hosts of the Yahoo Finance API
+API_HOSTS = 'query1.finance.yahoo.com query2.finance.yahoo.com'
+
+
 def default(obj, prop, fallback=''):
     try:
         if obj is None or property is None:
@@ -45,6 +52,22 @@ def default(obj, prop, fallback=''):
     return fallback
 
 
+# max. number of symbols per multi-symbol quote request
+QUOTE_BATCH_SIZE = 50
+
+# datacodes filled from the multi-symbol quote endpoint, anything else needs the full quoteSummary
+QUOTE_DATACODES = frozenset(d.value for d in (
+    Datacode.PREV_CLOSE, Datacode.OPEN, Datacode.CHANGE, Datacode.CHANGE_IN_PERCENT, Datacode.LOW, Datacode.HIGH,
+    Datacode.LAST_PRICE, Datacode.LAST_PRICE_DATE, Datacode.LAST_PRICE_TIME, Datacode.VOLUME,
+    Datacode.AVG_DAILY_VOL_3MONTH, Datacode.EPS, Datacode.PE_RATIO, Datacode.LOW_52_WEEK, Datacode.HIGH_52_WEEK,
+    Datacode.MARKET_CAP, Datacode.BID, Datacode.BIDSIZE, Datacode.ASK, Datacode.ASKSIZE, Datacode.TIMEZONE,
+    Datacode.EXCHANGE, Datacode.CURRENCY, Datacode.DIV, Datacode.DIV_YIELD, Datacode.NAME, Datacode.TICKER,
+    Datacode.SHARES_OUT))
+
+# TTL classes fully covered by the multi-symbol quote endpoint
+QUOTE_TTL_CLASSES = frozenset((TTLClass.LIVE, TTLClass.INTRADAY))
+
+
 def handle_abbreviations(s):
     s = str(s).strip()
     if s.endswith('M'):
@@ -57,12 +80,21 @@ def handle_abbreviations(s):
 
 
 class Yahoo(BaseClient):
+
+    section = 'yahoo'
+
     def __init__(self, ctx):
         super().__init__()
 
         self.crumb = None
-        self.realtime = {}
-        self.historicdata = {}
+        self.crumb_ttl = settings.getfloat('yahoo', 'crumb_ttl', fallback=7 * 86400.0)
+        names = settings.get('yahoo', 'hosts', fallback=API_HOSTS).split()
+        if not names:
+            logger.warning("No hosts in section [yahoo] of financials.ini - using %s", API_HOSTS)
+            names = API_HOSTS.split()
+        self.hosts = HostPool(names)
+        # evicted history is read again from yahoo-hist-{ticker}.json by getHistoric()
+        self.historicdata = lrucache.LRUCache('yahoo.historicdata', weigh=lrucache.ticks_weight)
 
     def _read_ticker_json_file(self, ticker):
 
@@ -116,6 +148,60 @@ class Yahoo(BaseClient):
         self.historicdata[ticker] = ticks
 
 
+    def api(self, path):
+
+        """
+        GET from the Yahoo Finance API - requests are spread over self.hosts and fail over to the next host on
+        network errors, server errors, throttling or a host's rate limit being used up
+
+        :param path: path and query e.g. /v7/finance/quote?symbols=IBM
+        :return: response text
+        """
+
+        tried = []
+        error = None
+
+        for _ in range(len(self.hosts)):
+            host = self.hosts.acquire(tried)
+            tried.append(host)
+            start = time.perf_counter()
+            try:
+                # throttled requests fail over to the next host at once, only the last host tried retries
+                text = self.urlopen('https://' + host + path, retries=0 if len(tried) < len(self.hosts) else None)
+
+            except ThrottledException as e:
+                self.hosts.release(host, None, True)
+                error = e
+                continue
+
+            except HttpException as e:
+                # circuit breaker open, nothing was sent
+                if type(e.response) == str:
+                    self.hosts.release(host, None, True)
+                    raise
+                status = self.local.status
+                if status == 401:
+                    # crumb or cookie no longer valid, get new ones with the next call
+                    self._forget_crumb()
+                failed = status is None or status >= 500 or status in RETRY_STATUS
+                self.hosts.release(host, time.perf_counter() - start, not failed)
+                if not failed:
+                    raise
+                error = e
+                continue
+
+            except BaseException as e:
+                self.hosts.release(host, time.perf_counter() - start, False)
+                error = e
+                continue
+
+            self.hosts.release(host, time.perf_counter() - start, True)
+            return text
+
+        if error is None:
+            raise HttpException(path, 'no Yahoo API host available')
+        raise error
+
     def handleCookiesAndConsent(self, url, ticker, datacode, html_file):
 
         try:
@@ -168,76 +254,201 @@ class Yahoo(BaseClient):
 
         return text
 
-    def getRealtime(self, ticker, datacode):
+    def _fetch_crumb(self, ticker, datacode):
 
         """
-        Retrieve realtime data for ticker from Yahoo Finance and cache it for further lookups
+        Get the crumb needed for API calls - reused from yahoo-crumb.json if not expired, otherwise from the getcrumb
+        endpoint after fc.yahoo.com has set the session cookie, falling back to the quote page for ticker
 
         :param ticker: the ticker symbol e.g. VOD.L
-        :param datacode: the requested datacode
-        :return:
+        :param datacode: the requested datacode, only used for messages
+        :return: None on success, error message otherwise
         """
 
-        # remove white space
-        ticker = "".join(ticker.split())
+        # cookies are set in the shared session and copied to the sessions of all threads afterwards
+        with self.cookie_session():
+            if self._load_crumb() or self._fetch_crumb_light():
+                return None
 
-        # use cached value for up to 60 seconds
-        if ticker in self.realtime:
-            tick = self.realtime[ticker]
-            if Datacode.TIMESTAMP in tick and type(tick[Datacode.TIMESTAMP]) == float and time.time() - 60 < tick[Datacode.TIMESTAMP]:
-                return self._return_value(tick, datacode)
-            else:
-                del self.realtime[ticker]
+            error = self._fetch_crumb_from_page(ticker, datacode)
+            if error is None and self.crumb:
+                self._save_crumb()
 
-        if ticker not in self.realtime:
-            self.realtime[ticker] = self.get_ticker()
+            return error
 
-        tick = self.realtime[ticker]
+    def _fetch_crumb_light(self):
 
-        if not self.crumb:
+        """
+        Cookie from fc.yahoo.com and crumb from the getcrumb endpoint - two small requests
 
-            url = f'https://finance.yahoo.com/quote/{ticker}'
-            text = self.handleCookiesAndConsent(url, ticker, datacode, f'yahoo-{ticker}.html')
+        :return: True if a crumb was found
+        """
 
-            if text is None:
-                del self.realtime[ticker]
-                return 'Yahoo.getRealtime({}, {}) - handleCookiesAndConsent'.format(ticker, datacode)
+        try:
+            self.urlopen('https://fc.yahoo.com')
+        except HttpException:
+            pass  # answers 404 but sets the cookie
+        except BaseException:
+            logger.exception("BaseException querying fc.yahoo.com")
+            return False
 
-            # crumbs like 'TKkC\u002FZBwoUA' may contain unicode _text_ (not encoded code points)
-            try:
-                r = r'\bcrumb=([^"]{11,})"'
+        try:
+            crumb = self.api('/v1/test/getcrumb').strip()
+        except BaseException:
+            logger.exception("BaseException querying getcrumb")
+            return False
+
+        # an HTML page (e.g. cookie consent) or an error message instead of a crumb
+        if len(crumb) < 11 or len(crumb) > 64 or any(c.isspace() or c in '<>{}"' for c in crumb):
+            logger.info("No crumb from getcrumb endpoint - using quote page")
+            return False
+
+        self.crumb = crumb
+        self._save_crumb()
+
+        return True
+
+    def _load_crumb(self):
+
+        """
+        Crumb and session cookies from yahoo-crumb.json
+
+        :return: True if they were found and have not expired
+        """
+
+        fn = os.path.join(self.basedir, 'yahoo-crumb.json')
+
+        try:
+            with open(fn, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except BaseException:
+            logger.exception("BaseException reading %s", fn)
+            return False
+
+        if not data.get('crumb') or data.get('expires', 0) <= time.time():
+            return False
+
+        for cookie in data.get('cookies', []):
+            self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'])
+
+        self.crumb = data['crumb']
+
+        return True
+
+    def _save_crumb(self):
+
+        """
+        Write crumb and session cookies to yahoo-crumb.json - they expire with the first cookie or after crumb_ttl
+        """
+
+        now = time.time()
+        expires = now + self.crumb_ttl
+        cookies = []
+
+        for cookie in getattr(self.session.cookies, 'jar', self.session.cookies):
+            if cookie.expires is not None:
+                if cookie.expires <= now:
+                    continue
+                expires = min(expires, cookie.expires)
+            cookies.append({'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain, 'path': cookie.path})
+
+        fn = os.path.join(self.basedir, 'yahoo-crumb.json')
+
+        try:
+            # cookies are credentials of the session, only the user may read them
+            fd = os.open(fn + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump({'crumb': self.crumb, 'expires': expires, 'cookies': cookies}, f)
+            os.replace(fn + '.tmp', fn)
+        except BaseException:
+            logger.exception("BaseException writing %s", fn)
+
+    def _forget_crumb(self):
+        self.crumb = None
+        try:
+            os.remove(os.path.join(self.basedir, 'yahoo-crumb.json'))
+        except FileNotFoundError:
+            pass
+        except BaseException:
+            logger.exception("BaseException removing yahoo-crumb.json")
+
+    def _fetch_crumb_from_page(self, ticker, datacode):
+
+        """
+        Load the quote page for ticker (handling cookie consent) and extract the crumb needed for API calls
+
+        :param ticker: the ticker symbol e.g. VOD.L
+        :param datacode: the requested datacode, only used for messages
+        :return: None on success, error message otherwise
+        """
+
+        url = f'https://finance.yahoo.com/quote/{ticker}'
+        text = self.handleCookiesAndConsent(url, ticker, datacode, f'yahoo-{ticker}.html')
+
+        if text is None:
+            return 'Yahoo.getRealtime({}, {}) - handleCookiesAndConsent'.format(ticker, datacode)
+
+        # crumbs like 'TKkC\u002FZBwoUA' may contain unicode _text_ (not encoded code points)
+        try:
+            r = r'\bcrumb=([^"]{11,})"'
+            pattern = re.compile(r)
+            match = pattern.search(text)
+            if match:
+                self.crumb = urllib.parse.unquote(match.group(1).encode('unicode-escape').decode('ascii'))
+                logger.debug(f"crumb='{match.group(1)}' self.crumb='{self.crumb}'")
+            else:
+                r = r'"crumb"\s*:\s*"([^"]{11,})"'
                 pattern = re.compile(r)
                 match = pattern.search(text)
                 if match:
                     self.crumb = urllib.parse.unquote(match.group(1).encode('unicode-escape').decode('ascii'))
                     logger.debug(f"crumb='{match.group(1)}' self.crumb='{self.crumb}'")
-                else:
-                    r = r'"crumb"\s*:\s*"([^"]{11,})"'
-                    pattern = re.compile(r)
-                    match = pattern.search(text)
-                    if match:
-                        self.crumb = urllib.parse.unquote(match.group(1).encode('unicode-escape').decode('ascii'))
-                        logger.debug(f"crumb='{match.group(1)}' self.crumb='{self.crumb}'")
-            except BaseException as e:
-                logger.exception("BaseException ticker=%s datacode=%s", ticker, datacode)
-                del self.realtime[ticker]
-                return 'Yahoo.getRealtime({}, {}) - crumb: {}'.format(ticker, datacode, e)
+        except BaseException as e:
+            logger.exception("BaseException ticker=%s datacode=%s", ticker, datacode)
+            return 'Yahoo.getRealtime({}, {}) - crumb: {}'.format(ticker, datacode, e)
+
+        return None
+
+    def _fetch_realtime(self, ticker, datacode):
+
+        """
+        Retrieve realtime data for ticker from Yahoo Finance - called by getRealtime() if not cached
+
+        :param ticker: the ticker symbol e.g. VOD.L
+        :param datacode: the requested datacode, only used for messages
+        :return: tick data or error message
+        """
+
+        # expired live data of a cached ticker is refreshed from the quote endpoint, other fields are kept
+        tick = self.realtime.get(ticker)
+        if tick is not None and ttl_class(datacode) in QUOTE_TTL_CLASSES:
+            quotes = self._fetch_quotes([ticker])
+            if type(quotes) == dict and ticker in quotes:
+                return self.merge(tick, quotes[ticker], QUOTE_TTL_CLASSES)
+
+        tick = self.get_ticker()
+
+        if not self.crumb:
+            error = self.flight.do('crumb', lambda: self._fetch_crumb(ticker, datacode))
+            if error:
+                return error
 
         if not self.crumb:
             return 'Yahoo.getRealtime({}, {}) - crumb missing'.format(ticker, datacode)
 
         try:
 
-            url = 'https://query1.finance.yahoo.com/v10/finance/quoteSummary/{}?formatted=true&' \
-                  'modules=summaryProfile,financialData,quoteType,recommendationTrend,earnings,equityPerformance,summaryDetail,defaultKeyStatistics,calendarEvents,esgScores,price,pageViews,financialsTemplate&' \
-                  'lang=en-US&region=US&crumb={}' \
+            path = '/v10/finance/quoteSummary/{}?formatted=true&' \
+                   'modules=summaryProfile,financialData,quoteType,recommendationTrend,earnings,equityPerformance,summaryDetail,defaultKeyStatistics,calendarEvents,esgScores,price,pageViews,financialsTemplate&' \
+                   'lang=en-US&region=US&crumb={}' \
                 .format(ticker, urllib.parse.quote_plus(self.crumb))
 
-            js = self.urlopen(url)
+            js = self.api(path)
 
         except HttpException as e:
             logger.exception("HttpException querying ticker=%s datacode=%s", ticker, datacode)
-            del self.realtime[ticker]
             return None
 
         try:
@@ -268,7 +479,6 @@ class Yahoo(BaseClient):
 
         except BaseException as e:
             logger.exception("BaseException parsing ticker=%s datacode=%s", ticker, datacode)
-            del self.realtime[ticker]
             return 'Yahoo.getRealtimeSummary({}, {}) - exception: {}'.format(ticker, datacode, e)
 
         try:
@@ -277,7 +487,9 @@ class Yahoo(BaseClient):
             tick[Datacode.TIMESTAMP] = time.time()
 
             if 'regularMarketPrice' not in price:
-                return None
+                # answered without a quote e.g. delisted, don't ask again before failure_ttl_not_found
+                self.local.status = 404
+                return 'Yahoo.getRealtime({}, {}) - no data'.format(ticker, datacode)
 
             tick[Datacode.PREV_CLOSE] = self.save_wrapper(lambda: float(price['regularMarketPreviousClose']['raw']))
             tick[Datacode.OPEN] = self.save_wrapper(lambda: float(price['regularMarketOpen']['raw']))
@@ -351,12 +563,261 @@ class Yahoo(BaseClient):
 
         except BaseException as e:
             logger.exception("BaseException ticker=%s datacode=%s", ticker, datacode)
-            del self.realtime[ticker]
             return 'Yahoo.getRealtime({}, {}) - process: {}'.format(ticker, datacode, e)
 
-        return self._return_value(self.realtime[ticker], datacode)
+        self.partial.discard(ticker)
+
+        return tick
+
+    def getRealtimeBatch(self, tickers, max_age=None, datacodes=None):
+
+        """
+        Retrieve price level realtime data for many tickers with as few multi-symbol quote requests as possible
+        and cache it for further lookups - fields not covered by QUOTE_DATACODES are fetched by getRealtime() on demand
+
+        :param tickers: iterable of ticker symbols e.g. ['VOD.L', 'IBM']
+        :param max_age: tickers cached for less than max_age seconds are not fetched again, default self.max_age
+        :param datacodes: datacodes about to be looked up, tickers are fetched unless all of them are cached,
+            default LAST_PRICE
+        :return: None on success, error message otherwise
+        """
+
+        # source is down - cells are answered from cache by getRealtime()
+        if not self.breaker.closed():
+            return None
+
+        # the batch can't refresh other datacodes, getRealtime() fetches them
+        datacodes = [d for d in (datacodes or ()) if d in QUOTE_DATACODES] or [Datacode.LAST_PRICE.value]
+
+        pending = []
+        stale = []
+        for ticker in tickers:
+            ticker = "".join(str(ticker).split())
+            if not ticker or ticker in pending or ticker in stale:
+                continue
+            if all(self.cached(ticker, d, max_age) is not None for d in datacodes):
+                continue
+            if max_age != 0 and self.failed(ticker) is not None:
+                continue
+            if self.max_stale and max_age != 0 and \
+                    all(self.cached(ticker, d, max_age, self.max_stale) is not None for d in datacodes):
+                stale.append(ticker)
+                continue
+            pending.append(ticker)
+
+        if stale:
+            self.refresh(tuple(stale), lambda: self._fetch_batch(stale))
+
+        return self._fetch_batch(pending)
+
+    def _fetch_batch(self, pending):
+
+        """
+        Fetch and cache multi-symbol quotes for tickers
+
+        :return: None on success, error message otherwise
+        """
+
+        quotes = self._fetch_quotes(pending)
+        if type(quotes) != dict:
+            return quotes
+
+        self._store_quotes(quotes)
+
+        return None
+
+    def _store_quotes(self, quotes):
+
+        """
+        Cache ticks from _fetch_quotes()
+
+        :return: dict of ticker to cached tick
+        """
+
+        result = {}
+
+        for ticker, fresh in quotes.items():
+            tick = self.realtime.get(ticker)
+            if tick is not None and ticker not in self.partial:
+                # a full tick from getRealtime() is a superset of this one
+                tick = self.merge(tick, fresh, QUOTE_TTL_CLASSES)
+            else:
+                tick = self.stamp(fresh)
+                self.partial.add(ticker)
+            self.realtime[ticker] = result[ticker] = tick
+            self.failures.pop(ticker, None)
+
+        self.save(*quotes)
+
+        return result
+
+    def _speculate(self, expired):
+
+        """
+        Live data of cached tickers is refreshed with multi-symbol quote requests, like _fetch_realtime() does
+        for a single ticker - getRealtime() calls for these tickers wait for the batch
+        """
+
+        quotes = [t for t, d in expired if self.fetch_kind(d) and t in self.realtime]
+        if quotes:
+            self.speculator_pool().submit(self._speculate_quotes, quotes)
+
+        super()._speculate([(t, d) for t, d in expired if t not in quotes])
+
+    def _speculate_quotes(self, tickers):
+        try:
+            self.flight.do_many([(t, True) for t in tickers], self._fetch_quotes_keys)
+        except BaseException:
+            logger.exception("BaseException speculative fetch of %s tickers", len(tickers))
+
+    def _fetch_quotes_keys(self, keys):
+        quotes = self._fetch_quotes([t for t, _ in keys])
+        if type(quotes) != dict:
+            return {}
+        return {(t, True): tick for t, tick in self._store_quotes(quotes).items()}
+
+    def _fetch_quotes(self, tickers):
+
+        """
+        Fetch tickers from the multi-symbol quote endpoint in chunks of QUOTE_BATCH_SIZE
+
+        :return: dict of ticker to tick data (tickers that failed are missing) or error message
+        """
+
+        if not tickers:
+            return {}
+
+        if not self.crumb:
+            error = self.flight.do('crumb', lambda: self._fetch_crumb(tickers[0], Datacode.LAST_PRICE.value))
+            if error:
+                return error
+
+        if not self.crumb:
+            return 'Yahoo.getRealtimeBatch({}) - crumb missing'.format(len(tickers))
+
+        result = {}
+
+        for i in range(0, len(tickers), QUOTE_BATCH_SIZE):
+            chunk = tickers[i:i + QUOTE_BATCH_SIZE]
+
+            try:
+                path = '/v7/finance/quote?symbols={}&lang=en-US&region=US&crumb={}' \
+                    .format(urllib.parse.quote(','.join(chunk), safe=','), urllib.parse.quote_plus(self.crumb))
+
+                js = self.api(path)
+
+            except HttpException:
+                logger.exception("HttpException querying tickers=%s", chunk)
+                continue
+
+            try:
+                quotes = json.loads(js)['quoteResponse']['result']
+            except BaseException:
+                logger.exception("BaseException parsing tickers=%s", chunk)
+                continue
+
+            # symbols come back upper case, cache them under the name they were asked for
+            wanted = {t.upper(): t for t in chunk}
+
+            for quote in quotes:
+                try:
+                    ticker = wanted.get(str(quote['symbol']).upper())
+                    if not ticker or 'regularMarketPrice' not in quote:
+                        continue
+
+                    result[ticker] = self._quote_to_tick(ticker, quote)
+
+                except BaseException:
+                    logger.exception("BaseException processing quote=%s", quote)
+
+        return result
+
+    def fetch_kind(self, datacode):
+        # live data of a cached ticker may come from the quote endpoint, see _fetch_realtime()
+        return ttl_class(datacode) in QUOTE_TTL_CLASSES
+
+    def cached(self, ticker, datacode, max_age=None, stale=0.0):
+        tick = super().cached(ticker, datacode, max_age, stale)
+        # ticks from getRealtimeBatch() only answer price level datacodes
+        if tick is not None and ticker in self.partial and datacode not in QUOTE_DATACODES:
+            return None
+        return tick
+
+    def expires_at(self, ticker, datacode, max_age=None):
+        if ticker in self.partial and datacode not in QUOTE_DATACODES:
+            return None
+        return super().expires_at(ticker, datacode, max_age)
+
+    def _quote_to_tick(self, ticker, quote):
+
+        """
+        Convert one result of the multi-symbol quote endpoint to tick data - values are raw numbers
+        and percentages are scaled to match the quoteSummary fields used by getRealtime()
+
+        :param ticker: the ticker symbol e.g. VOD.L
+        :param quote: dict from the quote endpoint
+        :return: tick data
+        """
+
+        tick = self.get_ticker()
+
+        tick[Datacode.TICKER] = ticker
+        tick[Datacode.TIMESTAMP] = time.time()
+
+        tick[Datacode.PREV_CLOSE] = self.save_wrapper(lambda: float(quote['regularMarketPreviousClose']))
+        tick[Datacode.OPEN] = self.save_wrapper(lambda: float(quote['regularMarketOpen']))
+        tick[Datacode.CHANGE] = self.save_wrapper(lambda: float(quote['regularMarketChange']))
+        tick[Datacode.CHANGE_IN_PERCENT] = self.save_wrapper(lambda: float(quote['regularMarketChangePercent']) / 100.0)
+
+        tick[Datacode.LOW] = self.save_wrapper(lambda: float(quote['regularMarketDayLow']))
+        tick[Datacode.HIGH] = self.save_wrapper(lambda: float(quote['regularMarketDayHigh']))
+
+        tick[Datacode.LAST_PRICE] = self.save_wrapper(lambda: float(quote['regularMarketPrice']))
+        tick[Datacode.VOLUME] = self.save_wrapper(lambda: float(quote['regularMarketVolume']))
+        tick[Datacode.AVG_DAILY_VOL_3MONTH] = self.save_wrapper(lambda: float(quote['averageDailyVolume3Month']))
+        tick[Datacode.EPS] = self.save_wrapper(lambda: float(quote['epsTrailingTwelveMonths']))
+        tick[Datacode.PE_RATIO] = self.save_wrapper(lambda: float(quote['trailingPE']))
+
+        tick[Datacode.LOW_52_WEEK] = self.save_wrapper(lambda: float(quote['fiftyTwoWeekLow']))
+        tick[Datacode.HIGH_52_WEEK] = self.save_wrapper(lambda: float(quote['fiftyTwoWeekHigh']))
+
+        tick[Datacode.MARKET_CAP] = self.save_wrapper(lambda: float(quote['marketCap']))
+
+        tick[Datacode.BID] = self.save_wrapper(lambda: float(quote['bid']))
+        tick[Datacode.BIDSIZE] = self.save_wrapper(lambda: float(quote['bidSize']))
+
+        tick[Datacode.ASK] = self.save_wrapper(lambda: float(quote['ask']))
+        tick[Datacode.ASKSIZE] = self.save_wrapper(lambda: float(quote['askSize']))
+
+        if 'exchangeTimezoneName' in quote and 'regularMarketTime' in quote:
+            tz = pytz.timezone(quote['exchangeTimezoneName'])
+
+            tick[Datacode.TIMEZONE] = tz
+            dt = datetime.datetime.fromtimestamp(int(quote['regularMarketTime']), tz)
+
+            tick[Datacode.LAST_PRICE_DATE] = dt.date()
+            tick[Datacode.LAST_PRICE_TIME] = dt.time()
+
+        tick[Datacode.EXCHANGE] = self.save_wrapper(lambda: quote['fullExchangeName'])
+        tick[Datacode.CURRENCY] = self.save_wrapper(lambda: quote['currency'])
+
+        tick[Datacode.DIV] = self.save_wrapper(lambda: float(quote['dividendRate']))
+        tick[Datacode.DIV_YIELD] = self.save_wrapper(lambda: float(quote['dividendYield']) / 100.0)
+
+        if default(quote, 'quoteType') == 'FUTURE':
+            tick[Datacode.TICKER] = self.save_wrapper(lambda: quote['underlyingSymbol'])
+            tick[Datacode.NAME] = self.save_wrapper(lambda: quote['shortName'])
+        else:
+            tick[Datacode.NAME] = self.save_wrapper(lambda: quote['longName'])
+
+        if not tick[Datacode.NAME]:
+            tick[Datacode.NAME] = tick[Datacode.TICKER]
 
-    def getHistoric(self, ticker: str, datacode: int, date):
+        tick[Datacode.SHARES_OUT] = self.save_wrapper(lambda: float(quote['sharesOutstanding']))
+
+        return tick
+
+    def getHistoric(self, ticker: str, datacode: int, date, fetch=True):
 
         """
         Retrieve historic data for ticker from Yahoo Finance and cache it for further lookups
@@ -364,7 +825,8 @@ class Yahoo(BaseClient):
         :param ticker: the ticker symbol e.g. VOD.L
         :param datacode: the requested datacode
         :param date: the requested date
-        :return:
+        :param fetch: False to answer from cached history only e.g. once the recalc budget is used up
+        :return: value, error message or None if not cached and fetch is False
         """
 
         # remove white space
@@ -402,8 +864,14 @@ class Yahoo(BaseClient):
 
                 min_tick_date = int(dateutil.parser.parse(min(ticks), yearfirst=True, dayfirst=False).timestamp())  # remember current earliest date
 
+        if not fetch:
+            return None
+
+        # realtime data may come from cache.sqlite without a crumb ever being fetched
         if not self.crumb:
-            self.getRealtime(ticker, Datacode.LAST_PRICE)
+            error = self.flight.do('crumb', lambda: self._fetch_crumb(ticker, datacode))
+            if error:
+                return error
 
         if not self.crumb:
             return 'Yahoo.getHistoric({}, {}, {}) - crumb missing'.format(ticker, datacode, date)
@@ -429,11 +897,11 @@ class Yahoo(BaseClient):
 
         try:
 
-            url = 'https://query1.finance.yahoo.com/v8/finance/chart/{}' \
-                  '?period1={}&period2={}&interval=1d&events=history&crumb={}' \
+            path = '/v8/finance/chart/{}' \
+                   '?period1={}&period2={}&interval=1d&events=history&crumb={}' \
                 .format(ticker, t1, t2, urllib.parse.quote_plus(self.crumb))
 
-            text = self.urlopen(url)
+            text = self.api(path)
 
             with open(os.path.join(self.basedir, 'yahoo-hist-{}.json'.format(ticker)), "w", encoding="utf-8") as csv_file:
                 print(text, file=csv_file)
@@ -468,5 +936,51 @@ class Yahoo(BaseClient):
 
         return None
 
+    def getHistoricRange(self, ticker: str, datacodes: list, start: str, end: str, fetch=True):
+
+        """
+        Retrieve historic data for ticker between two dates (inclusive) from Yahoo Finance - data is loaded
+        into the cache with at most two calls to getHistoric() and then served from the cache
+
+        :param ticker: the ticker symbol e.g. VOD.L
+        :param datacodes: list of requested datacodes
+        :param start: the first date
+        :param end: the last date
+        :param fetch: False to answer from cached history only
+        :return: list of (date, values) tuples for all trading days, error message or None if not cached
+        """
+
+        # remove white space
+        ticker = "".join(ticker.split())
+
+        try:
+            start = dateutil.parser.parse(start, yearfirst=True, dayfirst=False).date().isoformat()
+            end = dateutil.parser.parse(end, yearfirst=True, dayfirst=False).date().isoformat()
+        except BaseException as e:
+            logger.exception("BaseException ticker=%s start=%s end=%s", ticker, start, end)
+            return 'Yahoo.getHistoricRange({}, {}, {}) - date: {}'.format(ticker, start, end, e)
+
+        if start > end:
+            return 'Start date \'{}\' after end date \'{}\''.format(start, end)
+
+        loader = Datacode.ADJ_CLOSE.value if Datacode.ADJ_CLOSE.value in datacodes else Datacode.CLOSE.value
+
+        # loads everything from start until today unless cached already
+        s = self.getHistoric(ticker, loader, start, fetch)
+
+        if ticker not in self.historicdata:
+            return s
+
+        ticks = self.historicdata[ticker]
+
+        # cached data may be older than end date requested
+        today = datetime.date.today().isoformat()
+        if fetch and end > max(ticks) and max(ticks) < today:
+            self.getHistoric(ticker, loader, min(end, today))
+            ticks = self.historicdata[ticker]
+
+        return [(date, [self._return_value(ticks[date], datacode) for datacode in datacodes])
+                for date in sorted(ticks) if start <= date <= end]
+
 def createInstance(ctx):
     return Yahoo(ctx)
@@ -109,12 +109,28 @@ financials_xml.write('<node oor:name="' + implementation_name + '" oor:op="repla
 financials_xml.write('<node oor:name="AddInFunctions">\n')
 
 define_function(financials_xml,
-                'getRealtime', 'Fetches Realtime Financial Data.',
-                [('ticker', 'The ticker symbol.'), ('datacode', 'The data code.'), ('source', 'The source.')])
+                'getRealtime', 'Fetches Realtime Financial Data - use as array formula for a range of tickers.',
+                [('ticker', 'The ticker symbol or a range of ticker symbols.'),
+                 ('datacode', 'The data code or a row of data codes.'), ('source', 'The source.'),
+                 ('maxage', 'Max. age of cached data in seconds (optional).')])
 define_function(financials_xml,
                 'getHistoric', 'Fetches Historic Financial Data.',
                 [('ticker', 'The ticker symbol.'), ('datacode', 'The data code.'), ('date', 'The date.'),
                  ('source', 'The source.')])
+define_function(financials_xml,
+                'getRealtimeAsync', 'Fetches Realtime Financial Data in the background without blocking Calc.',
+                [('ticker', 'The ticker symbol.'), ('datacode', 'The data code.'), ('source', 'The source.'),
+                 ('maxage', 'Max. age of cached data in seconds (optional).')])
+define_function(financials_xml,
+                'getHistoricAsync', 'Fetches Historic Financial Data in the background without blocking Calc.',
+                [('ticker', 'The ticker symbol.'), ('datacode', 'The data code.'), ('date', 'The date.'),
+                 ('source', 'The source.')])
+define_function(financials_xml,
+                'getHistoricRange', 'Fetches Historic Financial Data for a date range - use as array formula.',
+                [('ticker', 'The ticker symbol.'), ('startdate', 'The first date.'),
+                 ('enddate', 'The last date (default today).'),
+                 ('datacodes', 'The data code or a row of data codes (default OPEN, HIGH, LOW, CLOSE, VOLUME).'),
+                 ('source', 'The source.')])
 
 financials_xml.write('</node>\n')
 financials_xml.write('</node>\n')
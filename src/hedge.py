@@ -0,0 +1,184 @@
+#  hedge.py - hedged realtime lookups of tickers listed by Yahoo and FT
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  Enable in financials.ini - Yahoo and FT tickers are mapped by suffix e.g. VOD.L and VOD:LSE or explicitly by
+#  Yahoo ticker:
+#
+#  [hedge]
+#  enabled = true
+#
+#  [hedge_tickers]
+#  IBM = IBM:NYQ
+
+import concurrent.futures
+import logging
+import threading
+import time
+
+import baseclient
+import settings
+import stats
+from datacode import Datacode
+
+logger = logging.getLogger(__name__)
+
+
+# logger.setLevel(logging.DEBUG)
+
+
+# price level datacodes both sources answer in the same unit - not CHANGE_IN_PERCENT (FT percent, Yahoo fraction)
+# or VOLUME (FT parses abbreviated text like 1.2m)
+HEDGE_DATACODES = frozenset(d.value for d in (
+    Datacode.LAST_PRICE, Datacode.CHANGE, Datacode.OPEN, Datacode.HIGH, Datacode.LOW, Datacode.PREV_CLOSE,
+    Datacode.BID, Datacode.ASK))
+
+# Yahoo ticker suffix -> FT ticker suffix
+SUFFIXES = '.L=:LSE .DE=:GER .PA=:PAR .AS=:AEX .MI=:MIL .TO=:TOR'
+
+# fetches of the primary source needed before its latency percentile is used instead of [hedge] delay
+MIN_SAMPLES = 20
+
+
+class Hedger:
+    """
+    Realtime lookups not answered by the primary source within a percentile of its recent fetch times are sent
+    to the secondary source as well - the first valid answer wins, the other fetch still fills its cache
+    """
+
+    def __init__(self, provider):
+
+        """
+        :param provider: function returning the provider of a source e.g. FinancialsImpl.provider
+        """
+
+        self.provider = provider
+        self.enabled = settings.getboolean('hedge', 'enabled', fallback=False)
+        self.percentile = settings.getfloat('hedge', 'percentile', fallback=95.0)
+        self.delay = settings.getfloat('hedge', 'delay', fallback=1.0)
+        self.workers = settings.getint('hedge', 'workers', fallback=8)
+
+        self.suffixes = []  # (Yahoo suffix, FT suffix)
+        for pair in settings.get('hedge', 'suffixes', fallback=SUFFIXES).split():
+            yahoo, _, ft = pair.partition('=')
+            if yahoo and ft:
+                self.suffixes.append((yahoo.upper(), ft.upper()))
+
+        self.yahoo_to_ft = {yahoo.upper(): ft for yahoo, ft in settings.items('hedge_tickers').items()}
+        self.ft_to_yahoo = {ft.upper(): yahoo for yahoo, ft in self.yahoo_to_ft.items()}
+
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def secondary(self, ticker, source):
+
+        """
+        The same instrument on the other source
+
+        :return: tuple of ticker and source or None if not mapped
+        """
+
+        ticker = ticker.upper()
+
+        if source == 'YAHOO':
+            if ticker in self.yahoo_to_ft:
+                return self.yahoo_to_ft[ticker], 'FT'
+            for yahoo, ft in self.suffixes:
+                if ticker.endswith(yahoo) and len(ticker) > len(yahoo):
+                    return ticker[:-len(yahoo)] + ft, 'FT'
+
+        elif source == 'FT':
+            if ticker in self.ft_to_yahoo:
+                return self.ft_to_yahoo[ticker], 'YAHOO'
+            for yahoo, ft in self.suffixes:
+                if ticker.endswith(ft) and len(ticker) > len(ft):
+                    return ticker[:-len(ft)] + yahoo, 'YAHOO'
+
+        return None
+
+    def hedge_after(self, source):
+
+        """
+        :return: seconds to wait for the primary source before asking the secondary one
+        """
+
+        elapsed = stats.percentile('hedge', source, 'primary', self.percentile, MIN_SAMPLES)
+        return self.delay if elapsed is None else elapsed / 1000.0
+
+    def applies(self, ticker, datacode, source):
+        return self.enabled and datacode in HEDGE_DATACODES and self.secondary(ticker, source) is not None
+
+    def getRealtime(self, ticker, datacode, source, max_age):
+
+        """
+        Look up ticker from source, hedged with the secondary source if not cached
+
+        :return: value or error message
+        """
+
+        primary = self.provider(source)
+
+        expires = primary.expires_at(ticker, datacode, max_age)
+        if expires and expires > time.time():
+            return primary.getRealtime(ticker, datacode, max_age)
+
+        other_ticker, other_source = self.secondary(ticker, source)
+
+        start = time.perf_counter()
+        first = self._pool().submit(baseclient.counted, self._primary, primary, ticker, datacode, source, max_age)
+
+        done, _ = concurrent.futures.wait([first], timeout=self.hedge_after(source))
+        if done and not stats.is_error(first.result()[0]):
+            value, requests = first.result()
+            baseclient.count_requests(requests)
+            return value
+
+        logger.debug("Hedging ticker=%s source=%s with ticker=%s source=%s", ticker, source, other_ticker,
+                     other_source)
+
+        second = self._pool().submit(baseclient.counted, self.provider(other_source).getRealtime, other_ticker,
+                                     datacode, max_age)
+
+        result = None
+        for future in concurrent.futures.as_completed([first, second]):
+            try:
+                value, requests = future.result()
+                baseclient.count_requests(requests)
+            except BaseException as e:
+                value = '{}.getRealtime({}, {}) - hedge: {}'.format(source, ticker, datacode, e)
+            if not stats.is_error(value):
+                result = value
+                break
+            if future is first:
+                result = value
+
+        stats.record('hedge', source, 'hedged', 1000 * (time.perf_counter() - start), stats.is_error(result))
+
+        return result
+
+    def _primary(self, provider, ticker, datacode, source, max_age):
+        start = time.perf_counter()
+        try:
+            result = provider.getRealtime(ticker, datacode, max_age)
+        except BaseException as e:
+            logger.exception("BaseException ticker=%s source=%s", ticker, source)
+            result = '{}.getRealtime({}, {}) - {}'.format(source, ticker, datacode, e)
+        stats.record('hedge', source, 'primary', 1000 * (time.perf_counter() - start), stats.is_error(result))
+        return result
+
+    def _pool(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(2, self.workers or 2),
+                                                                  thread_name_prefix='financials-hedge')
+            return self.pool
+
+    def close(self):
+        with self.lock:
+            if self.pool is not None:
+                self.pool.shutdown(wait=False)
@@ -0,0 +1,118 @@
+#  hosts.py - load balancing over equivalent API hosts
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import logging
+import threading
+import time
+
+import stats
+
+logger = logging.getLogger(__name__)
+
+
+# logger.setLevel(logging.DEBUG)
+
+
+# weight of the latest request in the moving average of a host's latency
+EWMA_WEIGHT = 0.2
+
+# seconds a host isn't used after a failed request, doubled with each further failure in a row
+DOWN_BASE = 10.0
+DOWN_MAX = 300.0
+
+# hosts expected to answer within this factor of the best one are used in turn
+TOLERANCE = 1.5
+
+
+class Host:
+
+    def __init__(self, name):
+        self.name = name
+        self.latency = None  # moving average in seconds, None until the first request
+        self.inflight = 0
+        self.failures = 0  # failed requests in a row
+        self.down_until = 0.0
+
+
+class HostPool:
+    """
+    Hosts answering the same API - requests go in turn to the healthy hosts with about the lowest expected latency
+    given their requests in flight, failed hosts are left out for an increasing time
+    """
+
+    def __init__(self, names):
+        if not names:
+            raise ValueError('HostPool needs at least one host')
+        self.hosts = [Host(name) for name in names]
+        self.lock = threading.Lock()
+        self.turn = 0  # index of the host next in turn
+
+    def __len__(self):
+        return len(self.hosts)
+
+    def acquire(self, exclude=()):
+
+        """
+        Pick a host for the next request - it must be given back with release()
+
+        :param exclude: names of hosts tried already
+        :return: host name
+        """
+
+        with self.lock:
+            now = time.time()
+            candidates = [h for h in self.hosts if h.name not in exclude] or self.hosts
+            healthy = [h for h in candidates if h.down_until <= now]
+
+            if healthy:
+                # by expected wait - hosts without requests yet are assumed to be as fast as the fastest one
+                known = [h.latency for h in healthy if h.latency is not None]
+                default = min(known) if known else 0.0
+
+                def wait(h):
+                    return (default if h.latency is None else h.latency) * (1 + h.inflight)
+
+                best = min(wait(h) for h in healthy)
+                equal = [h for h in healthy if wait(h) <= best * TOLERANCE]
+                host = min(equal, key=lambda h: (self.hosts.index(h) - self.turn) % len(self.hosts))
+            else:
+                host = min(candidates, key=lambda h: h.down_until)
+
+            self.turn = (self.hosts.index(host) + 1) % len(self.hosts)
+            host.inflight += 1
+            return host.name
+
+    def release(self, name, elapsed, ok):
+
+        """
+        Record the outcome of a request
+
+        :param elapsed: seconds taken or None if nothing was sent
+        :param ok: False if the host failed to answer
+        """
+
+        with self.lock:
+            host = next(h for h in self.hosts if h.name == name)
+            host.inflight -= 1
+
+            if elapsed is None:
+                return
+
+            if ok:
+                host.failures = 0
+                host.down_until = 0.0
+                host.latency = elapsed if host.latency is None else \
+                    EWMA_WEIGHT * elapsed + (1 - EWMA_WEIGHT) * host.latency
+            else:
+                host.failures += 1
+                down = min(DOWN_MAX, DOWN_BASE * 2 ** (host.failures - 1))
+                host.down_until = time.time() + down
+                logger.warning("Host %s not used for %s s after %s failures", name, down, host.failures)
+
+        stats.record('host', name, 'ok' if ok else 'failed', 1000 * elapsed, not ok)
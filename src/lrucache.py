@@ -0,0 +1,181 @@
+#  lrucache.py - size bounded provider caches
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import collections
+import itertools
+import logging
+import threading
+import weakref
+
+import settings
+import stats
+
+logger = logging.getLogger(__name__)
+
+
+# logger.setLevel(logging.DEBUG)
+
+
+# approx. memory used by one tick dict from BaseClient.get_ticker() with its values
+TICK_BYTES = 2048
+
+
+def tick_weight(tick):
+    return TICK_BYTES
+
+
+def ticks_weight(ticks):
+    return TICK_BYTES * max(1, len(ticks))
+
+
+class MemoryBudget:
+    """
+    Byte budget shared by several caches - once it is exceeded the least recently used entry of all of them is dropped
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.caches = []
+        self.clock = itertools.count()
+        # one lock for all caches of the budget, evicting from one cache while another one is being filled
+        self.lock = threading.RLock()
+
+    def add(self, cache):
+        with self.lock:
+            self.caches.append(weakref.ref(cache))
+
+    def live(self):
+        with self.lock:
+            self.caches = [ref for ref in self.caches if ref() is not None]
+            return [c for c in (ref() for ref in self.caches) if c is not None]
+
+    @property
+    def bytes(self):
+        return sum(c.bytes for c in self.live())
+
+    def trim(self, cache, key):
+
+        """
+        Evict least recently used entries until the budget is kept, never the entry just stored under key in cache
+        """
+
+        with self.lock:
+            while self.bytes > self.max_bytes:
+                victims = [c for c in self.live() if len(c) > 1 or (len(c) == 1 and not (c is cache and key in c))]
+                if not victims:
+                    break
+                min(victims, key=lambda c: c.used[next(iter(c))]).evict()
+
+
+shared_budget = None
+shared_lock = threading.Lock()
+
+
+def shared():
+
+    """
+    :return: the budget of [general] cache_memory_mb from financials.ini all caches share by default
+    """
+
+    global shared_budget
+    with shared_lock:
+        if shared_budget is None:
+            shared_budget = MemoryBudget(settings.getfloat('general', 'cache_memory_mb', fallback=64.0) * 1024 * 1024)
+        return shared_budget
+
+
+class LRUCache(collections.OrderedDict):
+    """
+    Dict dropping the least recently used entries once the estimated size of all entries exceeds the budget
+    """
+
+    def __init__(self, name, weigh=tick_weight, on_evict=None, max_bytes=None):
+
+        """
+        :param name: name used for eviction counters e.g. yahoo.realtime
+        :param weigh: function returning the estimated size of a value in bytes
+        :param on_evict: function called with the key of each evicted entry
+        :param max_bytes: memory budget of this cache alone, default the budget shared by all caches, see shared()
+        """
+
+        super().__init__()
+        self.name = name
+        self.weigh = weigh
+        self.on_evict = on_evict
+        self.budget = shared() if max_bytes is None else MemoryBudget(max_bytes)
+        self.bytes = 0
+        self.weights = {}
+        self.used = {}
+        self.evictions = 0
+        self.lock = self.budget.lock
+        self.budget.add(self)
+
+    @property
+    def max_bytes(self):
+        return self.budget.max_bytes
+
+    def __getitem__(self, key):
+        with self.lock:
+            value = super().__getitem__(key)
+            self.move_to_end(key)
+            self.used[key] = next(self.budget.clock)
+            return value
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self:
+                return default
+            return self[key]
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            self._forget(key)
+            super().__setitem__(key, value)
+            self.move_to_end(key)
+            self.used[key] = next(self.budget.clock)
+            self.weights[key] = self.weigh(value)
+            self.bytes += self.weights[key]
+            self.budget.trim(self, key)
+
+    def __delitem__(self, key):
+        with self.lock:
+            super().__delitem__(key)
+            self._forget(key)
+
+    def pop(self, key, *default):
+        with self.lock:
+            value = super().pop(key, *default)
+            self._forget(key)
+            return value
+
+    def popitem(self, last=True):
+        with self.lock:
+            key, value = super().popitem(last)
+            self._forget(key)
+            return key, value
+
+    def clear(self):
+        with self.lock:
+            super().clear()
+            self.weights.clear()
+            self.used.clear()
+            self.bytes = 0
+
+    def evict(self):
+        with self.lock:
+            evicted, _ = self.popitem(last=False)
+            self.evictions += 1
+            stats.evicted(self.name)
+            logger.debug("Evicted %s from %s", evicted, self.name)
+            if self.on_evict:
+                self.on_evict(evicted)
+
+    def _forget(self, key):
+        self.bytes -= self.weights.pop(key, 0)
+        self.used.pop(key, None)
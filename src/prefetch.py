@@ -0,0 +1,207 @@
+#  prefetch.py - warm provider caches with all tickers referenced by open spreadsheets
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from datacode import Datacode
+
+logger = logging.getLogger(__name__)
+
+
+# logger.setLevel(logging.DEBUG)
+
+
+# com.sun.star.sheet.CellFlags.FORMULA
+FORMULA_FLAG = 16
+
+# add-in calls as returned by XCell.getFormula() e.g. com.financials.getinfo.python.FinancialsImpl.getRealtime("IBM";21;"YAHOO")
+FUNCTION = re.compile(r'\bget(Realtime|HistoricRange|Historic)(?:Async)?\s*\(([^()]*)\)', flags=re.IGNORECASE)
+REFERENCE = re.compile(r"^\$?(?:'?([^.']+)'?\.)?(\$?[A-Z]+\$?[0-9]+(?::\$?[A-Z]+\$?[0-9]+)?)$", flags=re.IGNORECASE)
+
+
+def split_arguments(text):
+
+    """
+    Split formula arguments on ; or , outside of string literals - empty arguments are kept
+    """
+
+    args = []
+    current = ''
+    quoted = False
+
+    for c in text:
+        if c == '"':
+            quoted = not quoted
+        if c in ';,' and not quoted:
+            args.append(current.strip())
+            current = ''
+        else:
+            current += c
+
+    args.append(current.strip())
+    return args
+
+
+class Prefetch:
+    """
+    Collects (ticker, source, date range) sets from GETREALTIME/GETHISTORIC formulas and loads them
+    into the provider caches - one worker per source so total time is roughly that of the slowest source,
+    Yahoo tickers are loaded with multi-symbol requests and those of other sources on the pool of the source
+    """
+
+    def __init__(self, financials):
+        self.financials = financials
+        self.realtime = {}  # source -> set of tickers
+        self.historic = {}  # ticker -> earliest date (YAHOO only)
+
+    def scan(self, ctx):
+
+        """
+        Scan formulas of all open spreadsheet documents
+        """
+
+        desktop = ctx.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop', ctx)
+
+        components = desktop.getComponents().createEnumeration()
+        while components.hasMoreElements():
+            doc = components.nextElement()
+            if not hasattr(doc, 'Sheets'):
+                continue
+
+            for sheet in doc.Sheets:
+                ranges = sheet.queryContentCells(FORMULA_FLAG)
+                cells = ranges.getCells().createEnumeration()
+                while cells.hasMoreElements():
+                    cell = cells.nextElement()
+                    try:
+                        self.add_formula(doc, sheet, cell.getFormula())
+                    except BaseException:
+                        logger.exception("BaseException formula=%s", cell.getFormula())
+
+    def add_formula(self, doc, sheet, formula):
+
+        for match in FUNCTION.finditer(formula):
+            function = match.group(1).upper()
+            args = split_arguments(match.group(2))
+
+            if function == 'REALTIME' and len(args) >= 3:
+                source = self.resolve(doc, sheet, args[2])
+                if source:
+                    tickers = self.realtime.setdefault(str(source[0]).upper(), set())
+                    tickers.update(t for t in self.resolve(doc, sheet, args[0]) if t)
+
+            elif (function == 'HISTORIC' and len(args) >= 4) or (function == 'HISTORICRANGE' and len(args) >= 5):
+                source = self.resolve(doc, sheet, args[3] if function == 'HISTORIC' else args[4])
+                if source and str(source[0]).upper() == 'YAHOO':
+                    for date in self.resolve(doc, sheet, args[2] if function == 'HISTORIC' else args[1]):
+                        date, error = self.financials._date(date)
+                        if error:
+                            continue
+                        for ticker in self.resolve(doc, sheet, args[0]):
+                            if ticker and (ticker not in self.historic or date < self.historic[ticker]):
+                                self.historic[ticker] = date
+
+    def resolve(self, doc, sheet, arg):
+
+        """
+        Values of a formula argument - string and number literals or cell references
+
+        :return: list of values
+        """
+
+        if not arg:
+            return []
+
+        if arg.startswith('"'):
+            return [arg[1:-1].replace('""', '"').strip()]
+
+        try:
+            return [float(arg)]
+        except ValueError:
+            pass
+
+        match = REFERENCE.match(arg)
+        if not match:
+            return []
+
+        if match.group(1):
+            sheet = doc.Sheets.getByName(match.group(1))
+
+        cells = sheet.getCellRangeByName(match.group(2).replace('$', ''))
+        return [v.strip() if type(v) == str else v for row in cells.getDataArray() for v in row if v != '']
+
+    def run(self):
+
+        start = time.perf_counter()
+
+        jobs = []
+        for source, tickers in self.realtime.items():
+            jobs.append((source, sorted(tickers)))
+        if self.historic and 'YAHOO' not in self.realtime:
+            jobs.append(('YAHOO', []))
+
+        with ThreadPoolExecutor(max_workers=max(1, len(jobs)), thread_name_prefix='financials-prefetch') as executor:
+            for source, tickers in jobs:
+                executor.submit(self.warm, source, tickers)
+
+        logger.info("Prefetch of %s realtime and %s historic tickers took %.3f s",
+                    sum(len(t) for t in self.realtime.values()), len(self.historic), time.perf_counter() - start)
+
+    def warm(self, source, tickers):
+        try:
+            provider = self.financials.provider(source)
+            if provider is None:
+                return
+
+            # several tickers are asked at the same time on the pool of the source - Yahoo only has multi-symbol quotes
+            pool = self.financials.pool(source)
+
+            if source == 'YAHOO':
+                provider.getRealtimeBatch(tickers)
+                each(pool, lambda h: provider.getHistoric(h[0], Datacode.CLOSE.value, h[1]), sorted(self.historic.items()))
+            else:
+                each(pool, lambda t: provider.getRealtime(t, Datacode.LAST_PRICE.value), tickers)
+        except BaseException:
+            logger.exception("BaseException prefetching source=%s", source)
+
+
+def each(pool, fn, items):
+
+    """
+    Call fn for all items on pool, one after the other if pool is None
+    """
+
+    if pool is None:
+        for item in items:
+            fn(item)
+    else:
+        list(pool.map(fn, items))
+
+
+def start(ctx, financials):
+
+    """
+    Scan the documents open when the add-in is loaded and prefetch in a background thread
+    """
+
+    def run():
+        try:
+            prefetch = Prefetch(financials)
+            prefetch.scan(ctx)
+            prefetch.run()
+        except BaseException:
+            logger.exception("BaseException prefetching")
+
+    thread = threading.Thread(target=run, name='financials-prefetch', daemon=True)
+    thread.start()
+    return thread
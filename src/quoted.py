@@ -0,0 +1,240 @@
+#  quoted.py - optional cache and fetch daemon shared by all LibreOffice processes of a user
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  Start with e.g. python3 quoted.py from the extension's directory (or src) and enable in financials.ini:
+#
+#  [daemon]
+#  enabled = true
+#
+#  Clients send one JSON object per line {"source": "YAHOO", "method": "getRealtime", "args": ["IBM", 21, null]}
+#  and get one JSON object per line back {"result": 123.45} or {"error": "message"}.
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from importlib import import_module
+
+import settings
+from baseclient import PROVIDERS
+
+logger = logging.getLogger(__name__)
+
+
+# logger.setLevel(logging.DEBUG)
+
+
+# provider methods clients may call
+METHODS = frozenset(('getRealtime', 'getCached', 'getRealtimeBatch', 'getHistoric', 'getHistoricRange', 'expires_at', 'version'))
+
+# methods answering errors with a message shown in the cell, the others answer None
+LOOKUPS = frozenset(('getRealtime', 'getRealtimeBatch', 'getHistoric', 'getHistoricRange'))
+
+# seconds to use local providers after the daemon could not be reached
+RETRY_INTERVAL = 30.0
+
+
+def socket_path():
+    return settings.get('daemon', 'socket', fallback=os.path.join(settings.basedir, 'quoted.sock'))
+
+
+class Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                response = {'result': self.server.call(request['source'], request['method'], request.get('args', []))}
+            except BaseException as e:
+                logger.exception("BaseException handling request=%s", line)
+                response = {'error': '{}: {}'.format(type(e).__name__, e)}
+
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Holds one provider per source for all connected add-in instances - their caches, coalescing of
+    concurrent fetches and rate limits apply to all LibreOffice processes
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path):
+        self.providers = {}
+        self.lock = threading.Lock()
+
+        # a socket file left behind by a daemon that is gone
+        if os.path.exists(path):
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                    s.connect(path)
+                raise RuntimeError('Daemon already running on {}'.format(path))
+            except ConnectionRefusedError:
+                os.unlink(path)
+
+        super().__init__(path, Handler)
+        os.chmod(path, 0o600)
+
+    def provider(self, source):
+        with self.lock:
+            p = self.providers.get(source)
+            if p is None:
+                p = self.providers[source] = import_module(PROVIDERS[source]).createInstance(None)
+            return p
+
+    def call(self, source, method, args):
+        if source not in PROVIDERS or method not in METHODS:
+            raise ValueError('{}.{} not supported'.format(source, method))
+        return getattr(self.provider(source), method)(*args)
+
+    def server_close(self):
+        super().server_close()
+        for p in list(self.providers.values()):
+            p.close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+class RemoteClient:
+    """
+    Provider for one source answered by the daemon - falls back to a local provider while the daemon can't be
+    reached
+    """
+
+    def __init__(self, source, create_local, path=None):
+
+        """
+        :param source: the source e.g. YAHOO
+        :param create_local: function creating the local provider
+        :param path: the daemon's socket, default from financials.ini
+        """
+
+        self.source = source
+        self.create_local = create_local
+        self.path = path or socket_path()
+        # about as long as the daemon waits for the source itself, default connect_timeout + read_timeout
+        section = source.lower()
+        self.timeout = settings.getfloat('daemon', 'timeout', fallback=None) or \
+            settings.getfloat(section, 'connect_timeout', fallback=5.0) + \
+            settings.getfloat(section, 'read_timeout', fallback=20.0)
+        self.provider = None
+        self.local = threading.local()  # connection per thread
+        self.lock = threading.Lock()
+        self.down_until = 0.0
+        self.connections = []
+
+    def _local(self):
+        with self.lock:
+            if self.provider is None:
+                self.provider = self.create_local()
+            return self.provider
+
+    def _connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            connection = self.local.connection = (sock, sock.makefile('rwb'))
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def _call(self, method, *args):
+        if time.time() >= self.down_until:
+            try:
+                sock, f = self._connection()
+                f.write(json.dumps({'source': self.source, 'method': method, 'args': args}).encode('utf-8') + b'\n')
+                f.flush()
+                line = f.readline()
+                if not line:
+                    raise ConnectionError('Connection closed by daemon')
+                response = json.loads(line)
+                if 'error' in response:
+                    logger.warning("Daemon error %s.%s: %s", self.source, method, response['error'])
+                    if method not in LOOKUPS:
+                        return None
+                    return '{}.{} - daemon: {}'.format(self.source, method, response['error'])
+                return response['result']
+
+            except (OSError, ValueError):
+                logger.warning("Daemon %s not reachable - using local provider for %s s", self.path, RETRY_INTERVAL,
+                               exc_info=True)
+                self._disconnect()
+                self.down_until = time.time() + RETRY_INTERVAL
+
+        return getattr(self._local(), method)(*args)
+
+    def _disconnect(self):
+        connection = getattr(self.local, 'connection', None)
+        self.local.connection = None
+        if connection is not None:
+            with self.lock:
+                self.connections.remove(connection)
+            connection[1].close()
+            connection[0].close()
+
+    def getRealtime(self, ticker, datacode, max_age=None):
+        return self._call('getRealtime', ticker, datacode, max_age)
+
+    def getCached(self, ticker, datacode):
+        return self._call('getCached', ticker, datacode)
+
+    def getRealtimeBatch(self, tickers, max_age=None, datacodes=None):
+        return self._call('getRealtimeBatch', list(tickers), max_age, None if datacodes is None else list(datacodes))
+
+    def getHistoric(self, ticker, datacode, date, fetch=True):
+        return self._call('getHistoric', ticker, datacode, date, fetch)
+
+    def getHistoricRange(self, ticker, datacodes, start, end, fetch=True):
+        result = self._call('getHistoricRange', ticker, list(datacodes), start, end, fetch)
+        return [tuple(row) for row in result] if type(result) == list else result
+
+    def expires_at(self, ticker, datacode, max_age=None):
+        return self._call('expires_at', ticker, datacode, max_age)
+
+    def version(self):
+        return self._call('version')
+
+    def close(self):
+        with self.lock:
+            connections, self.connections = self.connections, []
+            provider = self.provider
+        for sock, f in connections:
+            f.close()
+            sock.close()
+        if provider is not None:
+            provider.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--socket', default=socket_path(), help='path of the Unix socket')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    with Server(args.socket) as server:
+        logger.info("Listening on %s", args.socket)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
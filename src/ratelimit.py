@@ -0,0 +1,137 @@
+#  ratelimit.py - per host request rate limits shared by all clients
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import email.utils
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# logger.setLevel(logging.DEBUG)
+
+
+# first delay after a throttled request in seconds, doubled with each retry
+BACKOFF_BASE = 1.0
+
+# max. delay after a throttled request without Retry-After
+BACKOFF_MAX = 30.0
+
+
+class TokenBucket:
+    """
+    Requests to one host - up to burst requests at once, then rate requests per second. After a host throttled
+    a request all requests wait until it may be asked again.
+    """
+
+    def __init__(self, host, rate, burst):
+
+        """
+        :param host: the host name, only used for messages
+        :param rate: requests per second, 0 for no limit
+        :param burst: max. number of requests without waiting
+        """
+
+        self.host = host
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # time.monotonic() the host may be asked again after throttling
+        self.lock = threading.Lock()
+
+    def acquire(self, max_wait):
+
+        """
+        Wait for the next request slot
+
+        :param max_wait: max. seconds to wait
+        :return: True or False if the slot is more than max_wait seconds away
+        """
+
+        with self.lock:
+            now = time.monotonic()
+            wait = max(0.0, self.blocked_until - now)
+
+            if self.rate:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                wait = max(wait, (1.0 - self.tokens) / self.rate)
+
+            if wait > max_wait:
+                return False
+
+            if self.rate:
+                self.tokens -= 1.0
+
+        if wait > 0:
+            logger.debug("Waiting %.3f s for host=%s", wait, self.host)
+            time.sleep(wait)
+
+        return True
+
+    def backoff(self, attempt, retry_after=None):
+
+        """
+        Host throttled a request - block all requests to it for Retry-After seconds or exponentially growing
+        times with jitter
+
+        :param attempt: number of the retry, starting with 0
+        :param retry_after: value of the Retry-After header
+        :return: seconds requests are blocked
+        """
+
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            delay = random.uniform(0.5, 1.0) * min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+        return delay
+
+
+def parse_retry_after(value):
+
+    """
+    :param value: Retry-After header - seconds or an HTTP date
+    :return: seconds or None
+    """
+
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+buckets = {}
+buckets_lock = threading.Lock()
+
+
+def bucket(host, rate, burst):
+
+    """
+    The TokenBucket of host shared by all clients - created with rate and burst on first use
+    """
+
+    with buckets_lock:
+        b = buckets.get(host)
+        if b is None:
+            b = buckets[host] = TokenBucket(host, rate, burst)
+        return b
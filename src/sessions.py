@@ -0,0 +1,175 @@
+#  sessions.py - exchange trading sessions used to keep realtime data cached while markets are closed
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  Sessions can be added or overridden in section [sessions] of financials.ini e.g.
+#
+#  [sessions]
+#  OSL = Europe/Oslo 09:00 16:25
+
+import datetime
+import functools
+import logging
+
+import settings
+
+logger = logging.getLogger(__name__)
+
+
+# logger.setLevel(logging.DEBUG)
+
+
+# exchange as found in EXCHANGE of Yahoo ticks or the FT ticker suffix -> (time zone, open, close) on Monday to Friday
+SESSIONS = {
+    'NYSE': ('America/New_York', '09:30', '16:00'),
+    'NYQ': ('America/New_York', '09:30', '16:00'),
+    'NASDAQ': ('America/New_York', '09:30', '16:00'),
+    'NASDAQGS': ('America/New_York', '09:30', '16:00'),
+    'NASDAQGM': ('America/New_York', '09:30', '16:00'),
+    'NASDAQCM': ('America/New_York', '09:30', '16:00'),
+    'NSQ': ('America/New_York', '09:30', '16:00'),
+    'NYSEARCA': ('America/New_York', '09:30', '16:00'),
+    'NYSE AMERICAN': ('America/New_York', '09:30', '16:00'),
+    'PCQ': ('America/New_York', '09:30', '16:00'),
+    'ASQ': ('America/New_York', '09:30', '16:00'),
+    'TORONTO': ('America/Toronto', '09:30', '16:00'),
+    'TOR': ('America/Toronto', '09:30', '16:00'),
+    'LSE': ('Europe/London', '08:00', '16:35'),
+    'XETRA': ('Europe/Berlin', '09:00', '17:30'),
+    'GER': ('Europe/Berlin', '09:00', '17:30'),
+    'FRANKFURT': ('Europe/Berlin', '08:00', '22:00'),
+    'FRA': ('Europe/Berlin', '08:00', '22:00'),
+    'PARIS': ('Europe/Paris', '09:00', '17:35'),
+    'PAR': ('Europe/Paris', '09:00', '17:35'),
+    'AMSTERDAM': ('Europe/Amsterdam', '09:00', '17:35'),
+    'AEX': ('Europe/Amsterdam', '09:00', '17:35'),
+    'BRUSSELS': ('Europe/Brussels', '09:00', '17:35'),
+    'BRU': ('Europe/Brussels', '09:00', '17:35'),
+    'MILAN': ('Europe/Rome', '09:00', '17:35'),
+    'MIL': ('Europe/Rome', '09:00', '17:35'),
+    'MCE': ('Europe/Madrid', '09:00', '17:35'),
+    'MAD': ('Europe/Madrid', '09:00', '17:35'),
+    'SWISS': ('Europe/Zurich', '09:00', '17:30'),
+    'SWX': ('Europe/Zurich', '09:00', '17:30'),
+    'VTX': ('Europe/Zurich', '09:00', '17:30'),
+    'STOCKHOLM': ('Europe/Stockholm', '09:00', '17:30'),
+    'STO': ('Europe/Stockholm', '09:00', '17:30'),
+    'TOKYO': ('Asia/Tokyo', '09:00', '15:30'),
+    'TYO': ('Asia/Tokyo', '09:00', '15:30'),
+    'HKSE': ('Asia/Hong_Kong', '09:30', '16:10'),
+    'HKG': ('Asia/Hong_Kong', '09:30', '16:10'),
+    'ASX': ('Australia/Sydney', '10:00', '16:12'),
+}
+
+# quotes are delayed by up to 20 minutes and closing auctions run late
+CLOSE_DELAY = datetime.timedelta(minutes=30)
+
+
+@functools.lru_cache(maxsize=None)
+def lookup(exchange):
+
+    """
+    Session of an exchange
+
+    :return: tuple of (tzinfo, open time, close time) or None if unknown
+    """
+
+    if not exchange:
+        return None
+
+    exchange = str(exchange).strip().upper()
+
+    try:
+        value = settings.get('sessions', exchange.lower())
+        if value:
+            zone, open_time, close_time = value.split()
+        elif exchange in SESSIONS:
+            zone, open_time, close_time = SESSIONS[exchange]
+        else:
+            return None
+
+        import pytz
+        return (pytz.timezone(zone),
+                datetime.time.fromisoformat(open_time), datetime.time.fromisoformat(close_time))
+
+    except BaseException:
+        logger.exception("BaseException looking up session exchange=%s", exchange)
+        return None
+
+
+def closed_until(exchange, timestamp):
+
+    """
+    Time the next session of exchange opens if the market is closed at timestamp
+
+    :param exchange: exchange name
+    :param timestamp: seconds since epoch e.g. when data was fetched
+    :return: timestamp or None if the market is open or the exchange is unknown
+    """
+
+    session = lookup(exchange)
+    if session is None:
+        return None
+
+    day = datetime.datetime.fromtimestamp(timestamp, session[0]).date()
+    opens, closes, next_open = day_session(exchange, day)
+
+    if opens is None:
+        return next_open
+    if timestamp < opens:
+        return opens
+    if timestamp < closes:
+        return None
+    return next_open
+
+
+def next_open(exchange, timestamp):
+
+    """
+    Time the next session of exchange opens after timestamp, whether the market is open or closed
+
+    :param exchange: exchange name
+    :param timestamp: seconds since epoch e.g. when data was fetched
+    :return: timestamp or None if the exchange is unknown
+    """
+
+    session = lookup(exchange)
+    if session is None:
+        return None
+
+    day = datetime.datetime.fromtimestamp(timestamp, session[0]).date()
+    opens, closes, later = day_session(exchange, day)
+
+    if opens is not None and timestamp < opens:
+        return opens
+    return later
+
+
+@functools.lru_cache(maxsize=4096)
+def day_session(exchange, day):
+
+    """
+    Session of exchange on a day in the time zone of the exchange
+
+    :return: tuple of timestamps (opens, closes, next session opens) - opens and closes are None on weekends
+    """
+
+    tz, open_time, close_time = lookup(exchange)
+
+    later = day + datetime.timedelta(days=1)
+    while later.weekday() >= 5:
+        later += datetime.timedelta(days=1)
+    next_open = tz.localize(datetime.datetime.combine(later, open_time)).timestamp()
+
+    if day.weekday() >= 5:
+        return None, None, next_open
+
+    opens = tz.localize(datetime.datetime.combine(day, open_time))
+    closes = tz.localize(datetime.datetime.combine(day, close_time)) + CLOSE_DELAY
+
+    return opens.timestamp(), closes.timestamp(), next_open
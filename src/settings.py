@@ -0,0 +1,68 @@
+#  settings.py - optional settings from ~/.financials-extension/financials.ini
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  Example financials.ini:
+#
+#  [general]
+#  prefetch = true
+
+import configparser
+import logging
+import os
+import pathlib
+
+logger = logging.getLogger(__name__)
+
+basedir = os.path.join(str(pathlib.Path.home()), '.financials-extension')
+
+parser = configparser.ConfigParser()
+
+try:
+    parser.read(os.path.join(basedir, 'financials.ini'), encoding='utf-8')
+except configparser.Error:
+    logger.exception("Error reading financials.ini - using defaults")
+
+
+def get(section, option, fallback=None):
+    return parser.get(section, option, fallback=fallback)
+
+
+def getboolean(section, option, fallback=False):
+    try:
+        return parser.getboolean(section, option, fallback=fallback)
+    except ValueError:
+        logger.warning("Invalid value for [%s] %s - using %s", section, option, fallback)
+        return fallback
+
+
+def getfloat(section, option, fallback=None):
+    try:
+        return parser.getfloat(section, option, fallback=fallback)
+    except ValueError:
+        logger.warning("Invalid value for [%s] %s - using %s", section, option, fallback)
+        return fallback
+
+
+def getint(section, option, fallback=None):
+    try:
+        return parser.getint(section, option, fallback=fallback)
+    except ValueError:
+        logger.warning("Invalid value for [%s] %s - using %s", section, option, fallback)
+        return fallback
+
+
+def items(section):
+
+    """
+    :return: dict of all options in section (names in lower case) or {} if the section is missing
+    """
+
+    if not parser.has_section(section):
+        return {}
+    return dict(parser.items(section))
@@ -0,0 +1,187 @@
+#  snapshot.py - export realtime and historic caches to a snapshot file and serve data only from it
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  Export what is cached on disk with e.g. python3 src/snapshot.py month-end.snapshot. Serve a report from the
+#  snapshot only with
+#
+#  [general]
+#  snapshot = /path/month-end.snapshot
+
+import argparse
+import glob
+import gzip
+import json
+import logging
+import os
+import time
+
+import settings
+import tickstore
+from baseclient import BaseClient, PROVIDERS, new_tick
+
+logger = logging.getLogger(__name__)
+
+
+# logger.setLevel(logging.DEBUG)
+
+
+VERSION = 1
+
+
+def export(filename, providers=None):
+
+    """
+    Write realtime and historic caches to a gzip compressed JSON file - ticks of providers in memory take
+    precedence over those in cache.sqlite and yahoo-hist-{ticker}.json
+
+    :param filename: the snapshot file
+    :param providers: dict of source to provider e.g. FinancialsImpl.providers
+    :return: tuple of number of realtime and historic tickers
+    """
+
+    realtime = {}  # source -> ticker -> encoded tick
+    historic = {}  # source -> ticker -> date -> encoded tick
+
+    store = tickstore.shared()
+    if store is not None:
+        for source, ticker, tick, partial in store.items(new_tick):
+            realtime.setdefault(source.upper(), {})[ticker] = tickstore.encode_tick(tick)
+
+    for source, provider in (providers or {}).items():
+        if isinstance(provider, BaseClient):
+            for ticker, tick in list(provider.realtime.items()):
+                realtime.setdefault(source, {})[ticker] = tickstore.encode_tick(tick)
+
+    yahoo = (providers or {}).get('YAHOO')
+    if not isinstance(yahoo, BaseClient):
+        import financials_yahoo
+        yahoo = financials_yahoo.Yahoo(None)
+
+    for fn in glob.glob(os.path.join(settings.basedir, 'yahoo-hist-*.json')):
+        ticker = os.path.basename(fn)[len('yahoo-hist-'):-len('.json')]
+        if ticker not in yahoo.historicdata:
+            try:
+                yahoo._read_ticker_json_file(ticker)
+            except BaseException:
+                logger.exception("BaseException reading %s", fn)
+
+    for ticker, ticks in list(yahoo.historicdata.items()):
+        historic.setdefault('YAHOO', {})[ticker] = {date: tickstore.encode_tick(tick) for date, tick in ticks.items()}
+
+    data = {'version': VERSION, 'created': time.time(), 'realtime': realtime, 'historic': historic}
+
+    with gzip.open(filename, 'wt', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+
+    return sum(len(t) for t in realtime.values()), sum(len(t) for t in historic.values())
+
+
+def load(filename):
+
+    """
+    Read a snapshot file
+
+    :return: dict of source to SnapshotClient
+    """
+
+    with gzip.open(filename, 'rt', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if data.get('version') != VERSION:
+        raise ValueError('Snapshot version {} not supported'.format(data.get('version')))
+
+    return {source: SnapshotClient(source, data['realtime'].get(source, {}), data['historic'].get(source, {}))
+            for source in PROVIDERS}
+
+
+class SnapshotClient(BaseClient):
+    """
+    Provider answering only from snapshot data - it has no HTTP session and data never expires
+    """
+
+    def __init__(self, source, realtime, historic):
+        self.source = source
+        self.realtime = {ticker: tickstore.decode_tick(data, self.get_ticker()) for ticker, data in realtime.items()}
+        self.historicdata = {ticker: {date: tickstore.decode_tick(data, self.get_ticker()) for date, data in ticks.items()}
+                             for ticker, ticks in historic.items()}
+
+    def normalize(self, ticker):
+        return ticker if self.source == 'FT' else "".join(ticker.split())
+
+    def getRealtime(self, ticker, datacode, max_age=None):
+        tick = self.realtime.get(self.normalize(ticker))
+        if tick is None:
+            return 'Ticker \'{}\' not in snapshot'.format(ticker)
+        return self._return_value(tick, datacode)
+
+    def getCached(self, ticker, datacode):
+        tick = self.realtime.get(self.normalize(ticker))
+        if tick is None:
+            return None
+        value = self._return_value(tick, datacode)
+        return '' if value is None else value
+
+    def getRealtimeBatch(self, tickers, max_age=None, datacodes=None):
+        return None
+
+    def expires_at(self, ticker, datacode, max_age=None):
+        return float('inf')
+
+    def getHistoric(self, ticker, datacode, date, fetch=True):
+        import dateutil.parser
+
+        ticks = self.historicdata.get(self.normalize(ticker))
+        if not ticks:
+            return 'Ticker \'{}\' not in snapshot'.format(ticker)
+
+        try:
+            date = dateutil.parser.parse(date, yearfirst=True, dayfirst=False).date().isoformat()
+        except BaseException as e:
+            return 'Snapshot.getHistoric({}, {}, {}) - date: {}'.format(ticker, datacode, date, e)
+
+        if date in ticks:
+            return self._return_value(ticks[date], datacode)
+
+        if min(ticks) <= date <= max(ticks):
+            return 'Not a trading day \'{}\''.format(date)
+
+        return 'Date \'{}\' not in snapshot'.format(date)
+
+    def getHistoricRange(self, ticker, datacodes, start, end, fetch=True):
+        import dateutil.parser
+
+        ticks = self.historicdata.get(self.normalize(ticker))
+        if not ticks:
+            return 'Ticker \'{}\' not in snapshot'.format(ticker)
+
+        try:
+            start = dateutil.parser.parse(start, yearfirst=True, dayfirst=False).date().isoformat()
+            end = dateutil.parser.parse(end, yearfirst=True, dayfirst=False).date().isoformat()
+        except BaseException as e:
+            return 'Snapshot.getHistoricRange({}, {}, {}) - date: {}'.format(ticker, start, end, e)
+
+        return [(date, [self._return_value(ticks[date], datacode) for datacode in datacodes])
+                for date in sorted(ticks) if start <= date <= end]
+
+    def version(self):
+        return 'snapshot'
+
+    def close(self):
+        pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export cache.sqlite and yahoo-hist-*.json to a snapshot file')
+    parser.add_argument('filename', help='the snapshot file to write')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    realtime, historic = export(args.filename)
+    print('Exported {} realtime and {} historic tickers to {}'.format(realtime, historic, args.filename))
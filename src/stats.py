@@ -0,0 +1,200 @@
+#  stats.py - in-memory latency histograms for calls into the extension
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import bisect
+import re
+import threading
+import time
+
+# upper bounds of histogram buckets in ms, ~25% apart from 1 us to 2 minutes
+BUCKETS = [0.001 * 1.25 ** i for i in range(84)]
+
+# error messages returned by providers look like 'Yahoo.getRealtime(IBM, 21) - crumb missing'
+ERROR = re.compile(r'^\w+\.\w+\(.*\) - ', flags=re.DOTALL)
+
+lock = threading.Lock()
+histograms = {}  # (function, source, outcome) -> Histogram
+memo_hits = {}  # source -> count of calls answered by the getRealtime fast path
+evictions = {}  # cache name -> count of entries dropped to stay within the memory budget
+over_budget = {}  # source -> count of getRealtime calls not fetched as the recalc budget was used up
+throttled_requests = {}  # host -> count of requests answered with 429 or 503
+breaker_openings = {}  # source -> count of times its circuit breaker opened
+
+
+class Histogram:
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+
+    def add(self, elapsed, error):
+        self.counts[bisect.bisect_left(BUCKETS, elapsed)] += 1
+        self.count += 1
+        self.total += elapsed
+        if error:
+            self.errors += 1
+
+    def percentile(self, p):
+
+        """
+        Upper bound of the bucket holding the p-th percentile in ms
+        """
+
+        if not self.count:
+            return 0.0
+
+        rank = p * self.count / 100.0
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return BUCKETS[i] if i < len(BUCKETS) else float('inf')
+
+        return BUCKETS[-1]
+
+
+def is_error(result):
+    return result is None or (type(result) == str and ERROR.match(result) is not None)
+
+
+def record(function, source, outcome, elapsed, error):
+
+    """
+    Record one call
+
+    :param function: name of the function called e.g. getRealtime
+    :param source: the source e.g. YAHOO
+    :param outcome: 'hit' if answered from cache, 'miss' if data was fetched
+    :param elapsed: time taken in ms
+    :param error: True if the call failed
+    """
+
+    key = (function, source, outcome)
+
+    with lock:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram()
+        histogram.add(elapsed, error)
+
+
+def memo_hit(source):
+    with lock:
+        memo_hits[source] = memo_hits.get(source, 0) + 1
+
+
+def evicted(name):
+    with lock:
+        evictions[name] = evictions.get(name, 0) + 1
+
+
+def budget_exceeded(source):
+    with lock:
+        over_budget[source] = over_budget.get(source, 0) + 1
+
+
+def throttled(host):
+    with lock:
+        throttled_requests[host] = throttled_requests.get(host, 0) + 1
+
+
+def breaker_opened(source):
+    with lock:
+        breaker_openings[source] = breaker_openings.get(source, 0) + 1
+
+
+def percentile(function, source, outcome, p, min_count=1):
+    with lock:
+        histogram = histograms.get((function, source, outcome))
+        return histogram.percentile(p) if histogram and histogram.count >= min_count else None
+
+
+def report():
+
+    """
+    Text report of all histograms e.g. for getRealtime("STATS")
+    """
+
+    lines = ['function source outcome count errors error% p50(ms) p95(ms) p99(ms) mean(ms)']
+
+    with lock:
+        for (function, source, outcome), h in sorted(histograms.items()):
+            lines.append('{} {} {} {} {} {:.1f} {:.3f} {:.3f} {:.3f} {:.3f}'.format(
+                function, source, outcome, h.count, h.errors, 100.0 * h.errors / h.count,
+                h.percentile(50), h.percentile(95), h.percentile(99), h.total / h.count))
+
+        merged = {}
+        for source, n in memo_hits.items():
+            source = str(source).upper()
+            merged[source] = merged.get(source, 0) + n
+
+        evicted = sorted(evictions.items())
+        exceeded = sorted(over_budget.items())
+        throttled_hosts = sorted(throttled_requests.items())
+        opened = sorted(breaker_openings.items())
+
+    for source, n in sorted(merged.items()):
+        lines.append('getRealtime {} memo {}'.format(source, n))
+
+    for name, n in evicted:
+        lines.append('cache {} evictions {}'.format(name, n))
+
+    for source, n in exceeded:
+        lines.append('getRealtime {} over_budget {}'.format(source, n))
+
+    for host, n in throttled_hosts:
+        lines.append('host {} throttled {}'.format(host, n))
+
+    for source, n in opened:
+        lines.append('breaker {} opened {}'.format(source, n))
+
+    return '\n'.join(lines)
+
+
+def reset():
+    with lock:
+        histograms.clear()
+        memo_hits.clear()
+        evictions.clear()
+        over_budget.clear()
+        throttled_requests.clear()
+        breaker_openings.clear()
+
+
+class Trace:
+    """
+    Opt-in per call trace for trace.log - lines are buffered and written in blocks to keep file I/O off the hot path
+    """
+
+    def __init__(self, filename, size=1000, interval=5.0):
+        self.filename = filename
+        self.size = size
+        self.interval = interval
+        self.lines = []
+        self.flushed = time.monotonic()
+        self.lock = threading.Lock()
+
+    def write(self, line):
+        with self.lock:
+            self.lines.append(line)
+            if len(self.lines) >= self.size or time.monotonic() - self.flushed > self.interval:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if self.lines:
+            with open(self.filename, "a+", encoding="utf-8") as text_file:
+                text_file.write('\n'.join(self.lines) + '\n')
+            self.lines = []
+        self.flushed = time.monotonic()
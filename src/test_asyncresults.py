@@ -0,0 +1,125 @@
+#  test_asyncresults.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import logging
+import sys
+import threading
+import unittest
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import asyncresults
+
+
+class Listener:
+    """
+    Stands in for Calc - records the values of all change notifications
+    """
+
+    def __init__(self):
+        self.values = []
+        self.changed = threading.Event()
+
+    def modified(self, event):
+        self.values.append(event.Value)
+        self.changed.set()
+
+    def wait(self, count):
+        while len(self.values) < count:
+            self.changed.clear()
+            if len(self.values) < count and not self.changed.wait(5.0):
+                break
+        return self.values
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.results = asyncresults.AsyncResults()
+        self.fetches = []
+
+    def tearDown(self):
+        self.results.close()
+
+    def fetch(self, value):
+        def fn():
+            self.fetches.append(value)
+            return value
+        return fn
+
+    def test_loading_then_value(self):
+
+        release = threading.Event()
+
+        def slow():
+            release.wait(5.0)
+            return 1.5
+
+        result = self.results.get(('getRealtime', 'IBM', 21), ('YAHOO', 'IBM'), slow)
+        listener = Listener()
+        result.addResultListener(listener)
+        release.set()
+
+        self.assertEqual(['Loading...', 1.5], listener.wait(2), 'test_loading_then_value')
+
+    def test_same_object_for_same_arguments(self):
+
+        key = ('getRealtime', 'IBM', 21)
+        first = self.results.get(key, ('YAHOO', 'IBM'), self.fetch(1.5))
+
+        self.assertIs(first, self.results.get(key, ('YAHOO', 'IBM'), self.fetch(1.5)),
+                      'test_same_object_for_same_arguments')
+
+    def test_group_fetched_together(self):
+
+        release = threading.Event()
+        self.results.get(('block',), ('block',), lambda: release.wait(5.0))
+
+        price = self.results.get(('getRealtime', 'IBM', 21), ('YAHOO', 'IBM'), self.fetch(1.5))
+        name = self.results.get(('getRealtime', 'IBM', 104), ('YAHOO', 'IBM'), self.fetch('IBM'))
+        listeners = [Listener(), Listener()]
+        price.addResultListener(listeners[0])
+        name.addResultListener(listeners[1])
+        release.set()
+
+        self.assertEqual(['Loading...', 1.5], listeners[0].wait(2), 'test_group_fetched_together price')
+        self.assertEqual(['Loading...', 'IBM'], listeners[1].wait(2), 'test_group_fetched_together name')
+        # the group was queued once although two of its cells asked
+        self.assertEqual(2, len(self.fetches), 'test_group_fetched_together fetches {}'.format(self.fetches))
+
+    def test_error(self):
+
+        def fail():
+            raise ValueError('down')
+
+        result = self.results.get(('getRealtime', 'IBM', 21), ('YAHOO', 'IBM'), fail)
+        listener = Listener()
+        result.addResultListener(listener)
+
+        self.assertEqual(['Loading...', 'down'], listener.wait(2), 'test_error')
+
+    def test_discarded_without_listeners(self):
+
+        key = ('getRealtime', 'IBM', 21)
+        result = self.results.get(key, ('YAHOO', 'IBM'), self.fetch(1.5))
+        listener = Listener()
+        result.addResultListener(listener)
+        result.removeResultListener(listener)
+
+        self.assertNotIn(key, self.results.results, 'test_discarded_without_listeners')
+        self.assertNotIn(('YAHOO', 'IBM'), self.results.groups, 'test_discarded_without_listeners group')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
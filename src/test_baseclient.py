@@ -0,0 +1,385 @@
+#  test_baseclient.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import datetime
+import logging
+import sys
+import threading
+import time
+import unittest
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import pytz
+
+import baseclient
+from datacode import Datacode, TTLClass
+
+
+NEW_YORK = pytz.timezone('America/New_York')
+
+
+def new_york(*args):
+    return NEW_YORK.localize(datetime.datetime(*args)).timestamp()
+
+
+class StubClient(baseclient.BaseClient):
+    """
+    Answers realtime lookups with queued (HTTP status, result) pairs instead of asking a source - a tick with
+    LAST_PRICE price if none are queued
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.speculative = False
+        self.responses = []
+        self.price = 1.5
+        self.fetches = 0
+        self.fetched = []
+
+    def _fetch_realtime(self, ticker, datacode):
+        self.fetches += 1
+        self.fetched.append(ticker)
+        status, result = self.responses.pop(0) if self.responses else (200, 'tick')
+        self.local.status = status
+        if result == 'tick':
+            result = self.get_ticker()
+            result[Datacode.LAST_PRICE] = self.price
+            result[Datacode.NAME] = ticker
+            result[Datacode.TIMESTAMP] = time.time()
+        return result
+
+    def age(self, ticker, seconds):
+        # pretend the cached tick was fetched seconds earlier
+        tick = self.realtime[ticker]
+        for key in [Datacode.TIMESTAMP] + list(TTLClass):
+            tick[key] -= seconds
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = baseclient.SingleFlight()
+        self.release = threading.Event()
+        self.calls = []
+
+    def blocking(self, result):
+        def fn():
+            self.calls.append(result)
+            self.release.wait(5.0)
+            return result
+        return fn
+
+    def run_threads(self, targets):
+        results = [None] * len(targets)
+
+        def run(i, target):
+            try:
+                results[i] = target()
+            except BaseException as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=run, args=(i, t)) for i, t in enumerate(targets)]
+        for t in threads:
+            t.start()
+        return threads, results
+
+    def wait_for_leader(self):
+        # the leader is running fn, give the other threads time to find its flight and wait for it
+        deadline = time.time() + 5.0
+        while not self.calls and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+
+    def test_concurrent_calls_share_one(self):
+
+        threads, results = self.run_threads([lambda: self.flight.do('IBM', self.blocking(1.5))] * 5)
+        self.wait_for_leader()
+        self.release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual([1.5] * 5, results, 'test_concurrent_calls_share_one results')
+        self.assertEqual([1.5], self.calls, 'test_concurrent_calls_share_one calls')
+        self.assertEqual({}, self.flight.calls, 'test_concurrent_calls_share_one done')
+
+    def test_different_keys(self):
+
+        self.release.set()
+
+        self.assertEqual(1, self.flight.do('A', lambda: 1), 'test_different_keys A')
+        self.assertEqual(2, self.flight.do('B', lambda: 2), 'test_different_keys B')
+        # a finished flight isn't reused
+        self.assertEqual(3, self.flight.do('A', lambda: 3), 'test_different_keys A again')
+
+    def test_error_is_shared(self):
+
+        def fail():
+            self.calls.append('fail')
+            self.release.wait(5.0)
+            raise ValueError('down')
+
+        threads, results = self.run_threads([lambda: self.flight.do('IBM', fail)] * 3)
+        self.wait_for_leader()
+        self.release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(['fail'], self.calls, 'test_error_is_shared calls')
+        self.assertTrue(all(isinstance(r, ValueError) for r in results), 'test_error_is_shared {}'.format(results))
+
+    def test_do_many(self):
+
+        def fetch(keys):
+            self.calls.append(sorted(keys))
+            self.release.wait(5.0)
+            return {key: key.lower() for key in keys if key != 'MISSING'}
+
+        threads, results = self.run_threads([lambda: self.flight.do_many(['IBM', 'MSFT', 'MISSING'], fetch)])
+        self.wait_for_leader()
+
+        # keys in flight are left out of another batch
+        self.assertEqual({}, self.flight.do_many(['IBM'], fetch), 'test_do_many taken')
+
+        waiting, answers = self.run_threads([lambda: self.flight.do('MSFT', lambda: 'single'),
+                                             lambda: self.flight.do('MISSING', lambda: 'single')])
+        time.sleep(0.1)
+        self.release.set()
+        for t in threads + waiting:
+            t.join()
+
+        self.assertEqual([{'IBM': 'ibm', 'MSFT': 'msft'}], results, 'test_do_many results')
+        self.assertEqual(['msft', 'single'], answers, 'test_do_many shared with do()')
+        self.assertEqual([['IBM', 'MISSING', 'MSFT']], self.calls, 'test_do_many calls')
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.client = StubClient()
+
+    def tearDown(self):
+        self.client.close()
+
+    def assertFailureTTL(self, ttl, ticker, msg):
+        expires, _ = self.client.failed(ticker)
+        self.assertAlmostEqual(time.time() + ttl, expires, delta=5.0, msg=msg)
+
+    def test_not_found(self):
+
+        self.client.responses = [(404, 'Ticker not found')]
+
+        s = self.client.getRealtime('NO_NAME', Datacode.LAST_PRICE.value)
+        self.assertEqual('Ticker not found', s, 'test_not_found')
+        self.assertFailureTTL(self.client.failure_ttl[baseclient.NOT_FOUND], 'NO_NAME', 'test_not_found TTL')
+
+        # answered from the failure cache
+        s = self.client.getRealtime('NO_NAME', Datacode.LAST_PRICE.value)
+        self.assertEqual('Ticker not found', s, 'test_not_found cached')
+        self.assertEqual(1, self.client.fetches, 'test_not_found fetches')
+
+    def test_answered_without_data(self):
+
+        # the source answered but the page had no data for the ticker
+        self.client.responses = [(200, 'No data')]
+
+        self.client.getRealtime('DELISTED', Datacode.LAST_PRICE.value)
+        self.assertFailureTTL(self.client.failure_ttl[baseclient.NOT_FOUND], 'DELISTED', 'test_answered_without_data')
+
+    def test_transient(self):
+
+        for status in (None, 429, 500, 503):
+            ticker = 'T{}'.format(status)
+            self.client.responses = [(status, 'Failed')]
+
+            self.client.getRealtime(ticker, Datacode.LAST_PRICE.value)
+            self.assertFailureTTL(self.client.failure_ttl[baseclient.TRANSIENT], ticker,
+                                  'test_transient status={}'.format(status))
+
+    def test_max_age_zero_asks_again(self):
+
+        self.client.responses = [(404, 'Ticker not found'), (200, 'tick')]
+
+        self.client.getRealtime('IBM', Datacode.LAST_PRICE.value)
+        s = self.client.getRealtime('IBM', Datacode.LAST_PRICE.value, 0)
+
+        self.assertEqual(1.5, s, 'test_max_age_zero_asks_again')
+        self.assertIsNone(self.client.failed('IBM'), 'test_max_age_zero_asks_again success clears failure')
+
+    def test_not_supported(self):
+
+        client = baseclient.BaseClient()
+        self.addCleanup(client.close)
+
+        s = client.getRealtime('IBM', Datacode.LAST_PRICE.value)
+        self.assertEqual('BaseClient does not support realtime data', s, 'test_not_supported')
+        self.assertIsNotNone(client.failed('IBM'), 'test_not_supported failure cached')
+
+    def test_expired_failure(self):
+
+        self.client.responses = [(500, 'Failed'), (200, 'tick')]
+
+        self.client.getRealtime('IBM', Datacode.LAST_PRICE.value)
+        self.client.failures['IBM'] = (time.time() - 1.0, 'Failed')
+
+        s = self.client.getRealtime('IBM', Datacode.LAST_PRICE.value)
+        self.assertEqual(1.5, s, 'test_expired_failure')
+        self.assertEqual(2, self.client.fetches, 'test_expired_failure fetches')
+
+
+class TestCaching(unittest.TestCase):
+
+    def setUp(self):
+        self.client = StubClient()
+
+    def tearDown(self):
+        self.client.close()
+
+    def wait_for_refresh(self):
+        deadline = time.time() + 5.0
+        while self.client.refreshing and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_max_age(self):
+
+        self.client.getRealtime('IBM', Datacode.LAST_PRICE.value)
+        self.client.age('IBM', 120.0)
+        self.client.price = 2.0
+
+        s = self.client.getRealtime('IBM', Datacode.LAST_PRICE.value, 300)
+        self.assertEqual(1.5, s, 'test_max_age younger than max_age')
+
+        s = self.client.getRealtime('IBM', Datacode.LAST_PRICE.value, 60)
+        self.assertEqual(2.0, s, 'test_max_age older than max_age')
+
+        self.client.getRealtime('IBM', Datacode.LAST_PRICE.value, 0)
+        self.assertEqual(3, self.client.fetches, 'test_max_age 0 always fetches')
+
+    def test_ttl_classes(self):
+
+        self.client.getRealtime('IBM', Datacode.LAST_PRICE.value)
+        self.client.age('IBM', 120.0)
+
+        # static fields live for days, the price for max_age seconds
+        self.client.getRealtime('IBM', Datacode.NAME.value)
+        self.assertEqual(1, self.client.fetches, 'test_ttl_classes static field cached')
+
+        self.client.getRealtime('IBM', Datacode.LAST_PRICE.value)
+        self.assertEqual(2, self.client.fetches, 'test_ttl_classes live field fetched')
+
+    def test_ttl_setting(self):
+
+        self.client.ttl[TTLClass.STATIC] = 60.0
+
+        self.client.getRealtime('IBM', Datacode.NAME.value)
+        self.client.age('IBM', 120.0)
+        self.client.getRealtime('IBM', Datacode.NAME.value)
+
+        self.assertEqual(2, self.client.fetches, 'test_ttl_setting')
+
+    def test_session_open(self):
+
+        self.client.market_hours = True
+
+        # fetched on Monday night after the close
+        tick = self.client.get_ticker()
+        tick[Datacode.EXCHANGE] = 'NasdaqGS'
+        tick[Datacode.TIMESTAMP] = new_york(2024, 3, 4, 23, 0)
+        self.client.stamp(tick)
+        opens = new_york(2024, 3, 5, 9, 30)
+
+        # the open and the previous close of Tuesday's session aren't known before it opens
+        for datacode in (Datacode.OPEN, Datacode.PREV_CLOSE, Datacode.BETA, Datacode.LAST_PRICE):
+            self.assertEqual(opens, self.client._expiry('IBM', tick, datacode.value, None),
+                             'test_session_open {}'.format(datacode.name))
+
+        self.assertEqual(tick[Datacode.TIMESTAMP] + self.client.ttl[TTLClass.STATIC],
+                         self.client._expiry('IBM', tick, Datacode.NAME.value, None), 'test_session_open static')
+
+        # fetched during the session, daily values live for ttl_daily unless the next session opens first
+        tick[Datacode.TIMESTAMP] = new_york(2024, 3, 5, 10, 0)
+        for ttl_cls in TTLClass:
+            tick[ttl_cls] = tick[Datacode.TIMESTAMP]
+        self.assertEqual(tick[Datacode.TIMESTAMP] + self.client.ttl[TTLClass.DAILY],
+                         self.client._expiry('IBM', tick, Datacode.BETA.value, None), 'test_session_open ttl_daily')
+
+        self.client.ttl[TTLClass.DAILY] = 7 * 86400.0
+        self.assertEqual(new_york(2024, 3, 6, 9, 30), self.client._expiry('IBM', tick, Datacode.BETA.value, None),
+                         'test_session_open next session')
+
+    def test_stale_while_revalidate(self):
+
+        self.client.max_stale = 600.0
+
+        self.client.getRealtime('IBM', Datacode.LAST_PRICE.value)
+        self.client.age('IBM', 120.0)
+        self.client.price = 2.0
+
+        s = self.client.getRealtime('IBM', Datacode.LAST_PRICE.value)
+        self.assertEqual(1.5, s, 'test_stale_while_revalidate stale value')
+
+        # refreshed in the background
+        self.wait_for_refresh()
+        self.assertEqual(2, self.client.fetches, 'test_stale_while_revalidate refreshed')
+        self.assertEqual(2.0, self.client.getRealtime('IBM', Datacode.LAST_PRICE.value),
+                         'test_stale_while_revalidate fresh value')
+
+    def test_too_stale(self):
+
+        self.client.max_stale = 600.0
+
+        self.client.getRealtime('IBM', Datacode.LAST_PRICE.value)
+        self.client.age('IBM', 60.0 + 601.0)
+        self.client.price = 2.0
+
+        s = self.client.getRealtime('IBM', Datacode.LAST_PRICE.value)
+        self.assertEqual(2.0, s, 'test_too_stale')
+
+    def test_failed_refresh_keeps_stale_value(self):
+
+        self.client.max_stale = 600.0
+
+        self.client.getRealtime('IBM', Datacode.LAST_PRICE.value)
+        self.client.age('IBM', 120.0)
+        self.client.responses = [(500, 'Failed')]
+
+        self.client.getRealtime('IBM', Datacode.LAST_PRICE.value)
+        self.wait_for_refresh()
+
+        self.assertEqual(1.5, self.client.getRealtime('IBM', Datacode.LAST_PRICE.value),
+                         'test_failed_refresh_keeps_stale_value')
+
+    def test_speculative_fetch(self):
+
+        self.client.speculative = True
+
+        for ticker in ('IBM', 'MSFT', 'SAP', 'OLD'):
+            self.client.getRealtime(ticker, Datacode.LAST_PRICE.value)
+            self.client.age(ticker, 120.0)
+        self.client.fetched = []
+
+        # OLD wasn't looked up within the working set window
+        used, datacode = self.client.working_set['OLD']
+        self.client.working_set['OLD'] = (used - self.client.working_window, datacode)
+        self.client.speculated_at = 0.0
+
+        self.client.getRealtime('IBM', Datacode.LAST_PRICE.value)
+        self.client.speculator.shutdown(wait=True)
+
+        self.assertEqual(['IBM', 'MSFT', 'SAP'], sorted(self.client.fetched), 'test_speculative_fetch')
+        self.assertIsNotNone(self.client.cached('SAP', Datacode.LAST_PRICE.value), 'test_speculative_fetch cached')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
@@ -0,0 +1,116 @@
+#  test_batch.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import logging
+import sys
+import unittest
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import financials_yahoo
+from datacode import Datacode, TTLClass
+
+
+class StubYahoo(financials_yahoo.Yahoo):
+    """
+    Yahoo client answering the multi-symbol quote endpoint without the network
+    """
+
+    def __init__(self):
+        super().__init__(None)
+        self.store = None  # keep the user's cache.sqlite out of it
+        self.speculative = False
+        self.batches = []
+        self.open = 1.4
+
+    def _fetch_quotes(self, tickers):
+        if not tickers:
+            return {}
+        self.batches.append(sorted(tickers))
+        return {t: self._quote_to_tick(t, {'symbol': t, 'regularMarketPrice': 1.5, 'regularMarketOpen': self.open,
+                                                 'marketCap': 1000000.0})
+                for t in tickers if t != 'NO_NAME'}
+
+    def age(self, ticker, seconds, ttl_classes=tuple(TTLClass)):
+        tick = self.realtime[ticker]
+        for key in [Datacode.TIMESTAMP] + list(ttl_classes):
+            tick[key] -= seconds
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.yahoo = StubYahoo()
+
+    def tearDown(self):
+        self.yahoo.close()
+
+    def test_batch(self):
+
+        s = self.yahoo.getRealtimeBatch(['IBM', ' MSFT ', 'IBM', 'NO_NAME', ''])
+
+        self.assertIsNone(s, 'test_batch {}'.format(s))
+        self.assertEqual([['IBM', 'MSFT', 'NO_NAME']], self.yahoo.batches, 'test_batch one request')
+        self.assertEqual({'IBM', 'MSFT'}, self.yahoo.partial, 'test_batch partial ticks')
+        self.assertEqual(1.5, self.yahoo.getRealtime('MSFT', Datacode.LAST_PRICE.value), 'test_batch cached')
+
+    def test_fresh_tickers_skipped(self):
+
+        self.yahoo.getRealtimeBatch(['IBM'])
+        self.yahoo.getRealtimeBatch(['IBM', 'MSFT'])
+
+        self.assertEqual([['IBM'], ['MSFT']], self.yahoo.batches, 'test_fresh_tickers_skipped')
+
+    def test_requested_datacodes(self):
+
+        self.yahoo.getRealtimeBatch(['IBM'])
+        # the price is fresh but the market cap, fetched with it, is older than its TTL
+        self.yahoo.age('IBM', 7 * 86400.0, [c for c in TTLClass if c != TTLClass.LIVE])
+
+        self.yahoo.getRealtimeBatch(['IBM'], None, [Datacode.LAST_PRICE.value])
+        self.assertEqual([['IBM']], self.yahoo.batches, 'test_requested_datacodes price only')
+
+        self.yahoo.getRealtimeBatch(['IBM'], None, [Datacode.LAST_PRICE.value, Datacode.MARKET_CAP.value])
+        self.assertEqual([['IBM'], ['IBM']], self.yahoo.batches, 'test_requested_datacodes market cap')
+
+    def test_datacodes_not_in_quotes(self):
+
+        self.yahoo.getRealtimeBatch(['IBM'])
+
+        # the quote endpoint can't answer BETA, getRealtime() fetches it
+        self.yahoo.getRealtimeBatch(['IBM'], None, [Datacode.LAST_PRICE.value, Datacode.BETA.value])
+        self.assertEqual([['IBM']], self.yahoo.batches, 'test_datacodes_not_in_quotes')
+
+    def test_open_refreshed_from_quotes(self):
+
+        self.yahoo.getRealtimeBatch(['IBM'])
+        self.yahoo.age('IBM', 1000.0, [TTLClass.INTRADAY])
+        self.yahoo.open = 1.6
+
+        # the open of the next session comes with the quote, the tick isn't fetched again from quoteSummary
+        s = self.yahoo.getRealtime('IBM', Datacode.OPEN.value)
+        self.assertEqual(1.6, s, 'test_open_refreshed_from_quotes')
+        self.assertEqual([['IBM'], ['IBM']], self.yahoo.batches, 'test_open_refreshed_from_quotes batches')
+
+    def test_breaker_open(self):
+
+        for i in range(self.yahoo.breaker.threshold):
+            self.yahoo.breaker.failure()
+
+        self.assertIsNone(self.yahoo.getRealtimeBatch(['IBM']), 'test_breaker_open')
+        self.assertEqual([], self.yahoo.batches, 'test_breaker_open no request')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
@@ -0,0 +1,140 @@
+#  test_breaker.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import logging
+import sys
+import threading
+import unittest
+from unittest import mock
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import breaker
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def allow_in_other_thread(b):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(b.allow()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(breaker, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.breaker = breaker.CircuitBreaker('test', 3, 60.0, probe_timeout=30.0)
+
+    def open(self):
+        for i in range(3):
+            self.breaker.failure()
+
+    def test_opens_after_threshold(self):
+
+        self.breaker.failure()
+        self.breaker.failure()
+        self.assertTrue(self.breaker.allow(), 'test_opens_after_threshold below threshold')
+
+        self.breaker.failure()
+        self.assertEqual(breaker.OPEN, self.breaker.state, 'test_opens_after_threshold state')
+        self.assertFalse(self.breaker.allow(), 'test_opens_after_threshold allow')
+        self.assertEqual(60.0, self.breaker.retry_in(), 'test_opens_after_threshold retry_in')
+
+    def test_success_resets_failures(self):
+
+        self.breaker.failure()
+        self.breaker.failure()
+        self.breaker.success()
+        self.breaker.failure()
+        self.breaker.failure()
+
+        self.assertTrue(self.breaker.closed(), 'test_success_resets_failures')
+
+    def test_one_probe_after_cooldown(self):
+
+        self.open()
+        self.clock.now += 60.0
+
+        self.assertTrue(self.breaker.allow(), 'test_one_probe_after_cooldown probe')
+        self.assertEqual(breaker.HALF_OPEN, self.breaker.state, 'test_one_probe_after_cooldown state')
+        self.assertTrue(self.breaker.allow(), 'test_one_probe_after_cooldown same thread')
+        self.assertFalse(allow_in_other_thread(self.breaker), 'test_one_probe_after_cooldown other thread')
+
+    def test_probe_success_closes(self):
+
+        self.open()
+        self.clock.now += 60.0
+        self.breaker.allow()
+        self.breaker.success()
+
+        self.assertTrue(self.breaker.closed(), 'test_probe_success_closes state')
+        self.assertTrue(allow_in_other_thread(self.breaker), 'test_probe_success_closes other thread')
+
+    def test_probe_failure_opens_again(self):
+
+        self.open()
+        self.clock.now += 60.0
+        self.breaker.allow()
+        self.breaker.failure()
+
+        self.assertEqual(breaker.OPEN, self.breaker.state, 'test_probe_failure_opens_again state')
+        self.assertEqual(60.0, self.breaker.retry_in(), 'test_probe_failure_opens_again new cooldown')
+
+    def test_release(self):
+
+        self.open()
+        self.clock.now += 60.0
+        self.breaker.allow()
+
+        self.breaker.release()
+        self.assertTrue(allow_in_other_thread(self.breaker), 'test_release other thread probes')
+        self.assertFalse(self.breaker.allow(), 'test_release probe taken')
+
+    def test_probe_timeout(self):
+
+        self.open()
+        self.clock.now += 60.0
+        self.breaker.allow()
+
+        self.clock.now += 29.0
+        self.assertFalse(allow_in_other_thread(self.breaker), 'test_probe_timeout probe running')
+
+        self.clock.now += 1.0
+        self.assertTrue(allow_in_other_thread(self.breaker), 'test_probe_timeout probe expired')
+
+    def test_disabled(self):
+
+        b = breaker.CircuitBreaker('test', 0, 60.0)
+        for i in range(100):
+            b.failure()
+
+        self.assertTrue(b.allow(), 'test_disabled')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
@@ -0,0 +1,182 @@
+#  test_budget.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import logging
+import sys
+import unittest
+from unittest import mock
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import budget
+import financials
+import financials_yahoo
+from datacode import Datacode
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(budget, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def call(self, b, seconds):
+        b.enter()
+        self.clock.advance(seconds)
+        exhausted = b.exhausted()
+        b.leave()
+        return exhausted
+
+    def test_exhausted(self):
+
+        b = budget.Budget(10.0)
+
+        self.assertFalse(self.call(b, 4.0), 'test_exhausted first call')
+        self.clock.advance(1.0)
+        self.assertFalse(self.call(b, 4.0), 'test_exhausted within budget')
+        self.clock.advance(1.0)
+        self.assertTrue(self.call(b, 1.0), 'test_exhausted over budget')
+
+    def test_idle_starts_new_pass(self):
+
+        b = budget.Budget(10.0, idle=2.0)
+
+        self.assertTrue(self.call(b, 11.0), 'test_idle_starts_new_pass over budget')
+        self.clock.advance(1.0)
+        self.assertTrue(self.call(b, 0.1), 'test_idle_starts_new_pass same pass')
+
+        self.clock.advance(2.5)
+        self.assertFalse(self.call(b, 0.1), 'test_idle_starts_new_pass new pass')
+
+    def test_overlapping_calls(self):
+
+        b = budget.Budget(10.0, idle=2.0)
+
+        # a call still running keeps the pass going however long the gap to the next call
+        b.enter()
+        self.clock.advance(11.0)
+        b.enter()
+        self.assertTrue(b.exhausted(), 'test_overlapping_calls')
+        b.leave()
+        b.leave()
+
+    def test_no_limit(self):
+
+        for seconds in (0, None):
+            b = budget.Budget(seconds)
+            self.assertFalse(self.call(b, 3600.0), 'test_no_limit {}'.format(seconds))
+
+
+class StubYahoo:
+    """
+    History source taking 20 seconds for each fetch - IBM's history is cached
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.fetches = []
+
+    def getHistoric(self, ticker, datacode, date, fetch=True):
+        if fetch:
+            self.fetches.append(ticker)
+            self.clock.advance(20.0)
+            return 1.5
+        return 1.4 if ticker == 'IBM' else None
+
+    def getHistoricRange(self, ticker, datacodes, start, end, fetch=True):
+        s = self.getHistoric(ticker, datacodes[0], start, fetch)
+        return s if s is None else [(start, [s])]
+
+    def close(self):
+        pass
+
+
+class TestHistoric(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(budget, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.financials = financials.createInstance(None)
+        self.addCleanup(self.financials.close)
+        self.financials.budget = budget.Budget(30.0)
+        self.yahoo = self.financials.providers['YAHOO'] = StubYahoo(self.clock)
+
+    def getHistoric(self, ticker):
+        return self.financials.getHistoric(ticker, Datacode.CLOSE.value, '2024-03-01', 'YAHOO')
+
+    def test_over_budget(self):
+
+        self.assertEqual(1.5, self.getHistoric('MSFT'), 'test_over_budget fetched')
+        self.assertEqual(1.5, self.getHistoric('SAP'), 'test_over_budget fetched within budget')
+
+        # the pass has taken 40 s
+        self.assertEqual(1.4, self.getHistoric('IBM'), 'test_over_budget cached')
+        self.assertEqual('Timed out - recalc budget of 30.0 s used up', self.getHistoric('VOD.L'),
+                         'test_over_budget not cached')
+        self.assertEqual(['MSFT', 'SAP'], self.yahoo.fetches, 'test_over_budget fetches')
+
+        # the next pass may fetch again
+        self.clock.advance(budget.IDLE + 1.0)
+        self.assertEqual(1.5, self.getHistoric('VOD.L'), 'test_over_budget next pass')
+
+    def test_async_not_budgeted(self):
+
+        self.getHistoric('MSFT')
+        self.getHistoric('SAP')
+
+        s = self.financials._getHistoric('VOD.L', Datacode.CLOSE.value, '2024-03-01', 'YAHOO', False)
+        self.assertEqual(1.5, s, 'test_async_not_budgeted')
+
+    def test_cached_history(self):
+
+        yahoo = financials_yahoo.Yahoo(None)
+        self.addCleanup(yahoo.close)
+        tick = yahoo.get_ticker()
+        tick[Datacode.CLOSE] = 1.4
+        yahoo.historicdata['IBM'] = {'2024-03-01': tick, '2024-03-04': tick}
+
+        with mock.patch.object(yahoo, 'api', side_effect=AssertionError('fetched')):
+            self.assertEqual(1.4, yahoo.getHistoric('IBM', Datacode.CLOSE.value, '2024-03-01', False),
+                             'test_cached_history cached')
+            self.assertEqual('Not a trading day \'2024-03-02\'',
+                             yahoo.getHistoric('IBM', Datacode.CLOSE.value, '2024-03-02', False),
+                             'test_cached_history trading day')
+            self.assertIsNone(yahoo.getHistoric('IBM', Datacode.CLOSE.value, '2024-03-05', False),
+                              'test_cached_history later')
+            self.assertIsNone(yahoo.getHistoric('NO_NAME', Datacode.CLOSE.value, '2024-03-01', False),
+                              'test_cached_history not cached')
+
+            s = yahoo.getHistoricRange('IBM', [Datacode.CLOSE.value], '2024-03-01', '2024-03-31', False)
+            self.assertEqual([('2024-03-01', [1.4]), ('2024-03-04', [1.4])], s, 'test_cached_history range')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
@@ -34,6 +34,16 @@ class Test(unittest.TestCase):
         s = financials.getRealtime('ETH-EUR', Datacode.LAST_PRICE.value, 'COINBASE')
         self.assertEqual(float, type(s), 'test_currency LAST_PRICE')
 
+    def test_max_age(self):
+        s = financials.getRealtime('BTC-EUR', Datacode.LAST_PRICE.value, 'COINBASE', 3600)
+        self.assertEqual(float, type(s), 'test_max_age LAST_PRICE {}'.format(s))
+
+        s = financials.getRealtime('BTC-EUR', Datacode.LAST_PRICE.value, 'COINBASE', 0)
+        self.assertEqual(float, type(s), 'test_max_age LAST_PRICE {}'.format(s))
+
+        s = financials.getRealtime('BTC-EUR', Datacode.LAST_PRICE.value, 'COINBASE', -1)
+        self.assertEqual('Max age is invalid', s, 'test_max_age LAST_PRICE {}'.format(s))
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('unittest_args', nargs='*')
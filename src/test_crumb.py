@@ -0,0 +1,137 @@
+#  test_crumb.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import json
+import logging
+import os
+import stat
+import sys
+import tempfile
+import time
+import unittest
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import baseclient
+import financials_yahoo
+
+CRUMB = 'TKkC/ZBwoUA'
+
+
+class StubYahoo(financials_yahoo.Yahoo):
+    """
+    Yahoo client answering fc.yahoo.com and the getcrumb endpoint without the network - fc.yahoo.com sets
+    the session cookie like the real one
+    """
+
+    def __init__(self, basedir, crumb=CRUMB):
+        super().__init__(None)
+        self.basedir = basedir
+        self.answer = crumb
+        self.requests = []
+
+    def urlopen(self, url, data=None, retries=None):
+        self.requests.append(url)
+        self.session.cookies.set('A3', 'cookie', domain='.yahoo.com', path='/')
+        raise baseclient.HttpException(url, 'HTTP 404')
+
+    def api(self, path):
+        self.requests.append(path)
+        return self.answer
+
+    def _fetch_crumb_from_page(self, ticker, datacode):
+        self.requests.append('page')
+        return 'Yahoo.getRealtime({}, {}) - no crumb on page'.format(ticker, datacode)
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.basedir = directory.name
+        self.filename = os.path.join(self.basedir, 'yahoo-crumb.json')
+
+    def client(self, crumb=CRUMB):
+        yahoo = StubYahoo(self.basedir, crumb)
+        self.addCleanup(yahoo.close)
+        return yahoo
+
+    def test_light_crumb_is_saved(self):
+
+        yahoo = self.client()
+
+        self.assertIsNone(yahoo._fetch_crumb('IBM', 21), 'test_light_crumb_is_saved')
+        self.assertEqual(CRUMB, yahoo.crumb, 'test_light_crumb_is_saved crumb')
+        self.assertEqual(['https://fc.yahoo.com', '/v1/test/getcrumb'], yahoo.requests,
+                         'test_light_crumb_is_saved requests')
+
+        with open(self.filename, encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(CRUMB, data['crumb'], 'test_light_crumb_is_saved file')
+        self.assertEqual(['A3'], [c['name'] for c in data['cookies']], 'test_light_crumb_is_saved cookies')
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(self.filename).st_mode), 'test_light_crumb_is_saved mode')
+
+    def test_saved_crumb_is_reused(self):
+
+        self.client()._fetch_crumb('IBM', 21)
+
+        yahoo = self.client()
+        self.assertIsNone(yahoo._fetch_crumb('IBM', 21), 'test_saved_crumb_is_reused')
+        self.assertEqual(CRUMB, yahoo.crumb, 'test_saved_crumb_is_reused crumb')
+        self.assertEqual([], yahoo.requests, 'test_saved_crumb_is_reused no requests')
+        self.assertEqual('cookie', yahoo.session.cookies.get('A3'), 'test_saved_crumb_is_reused cookie')
+
+    def test_expired_crumb(self):
+
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            json.dump({'crumb': 'OLD_CRUMB_123', 'expires': time.time() - 1.0, 'cookies': []}, f)
+
+        yahoo = self.client()
+        yahoo._fetch_crumb('IBM', 21)
+        self.assertEqual(CRUMB, yahoo.crumb, 'test_expired_crumb')
+
+    def test_crumb_expires_with_cookie(self):
+
+        yahoo = self.client()
+        yahoo.crumb = CRUMB
+        expires = int(time.time()) + 3600
+        yahoo.session.cookies.set('A1', 'cookie', domain='.yahoo.com', path='/', expires=expires)
+        yahoo._save_crumb()
+
+        with open(self.filename, encoding='utf-8') as f:
+            self.assertEqual(expires, json.load(f)['expires'], 'test_crumb_expires_with_cookie')
+
+    def test_no_crumb_from_endpoint(self):
+
+        # e.g. a cookie consent page
+        yahoo = self.client('<html><body>consent</body></html>')
+
+        s = yahoo._fetch_crumb('IBM', 21)
+        self.assertEqual('Yahoo.getRealtime(IBM, 21) - no crumb on page', s, 'test_no_crumb_from_endpoint')
+        self.assertEqual('page', yahoo.requests[-1], 'test_no_crumb_from_endpoint falls back to page')
+        self.assertFalse(os.path.exists(self.filename), 'test_no_crumb_from_endpoint not saved')
+
+    def test_forget_crumb(self):
+
+        yahoo = self.client()
+        yahoo._fetch_crumb('IBM', 21)
+        yahoo._forget_crumb()
+
+        self.assertIsNone(yahoo.crumb, 'test_forget_crumb')
+        self.assertFalse(os.path.exists(self.filename), 'test_forget_crumb file')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
@@ -0,0 +1,127 @@
+#  test_hedge.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import logging
+import sys
+import threading
+import unittest
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import hedge
+import stats
+from datacode import Datacode
+
+
+class StubProvider:
+    """
+    Answers every lookup with result once release is set
+    """
+
+    def __init__(self, result, release=None):
+        self.result = result
+        self.release = release
+        self.lookups = []
+
+    def getRealtime(self, ticker, datacode, max_age=None):
+        self.lookups.append(ticker)
+        if self.release is not None:
+            self.release.wait(5.0)
+        return self.result
+
+    def expires_at(self, ticker, datacode, max_age=None):
+        return None
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        stats.reset()
+        self.providers = {}
+        self.hedger = hedge.Hedger(self.providers.get)
+        self.hedger.enabled = True
+        self.hedger.delay = 0.05
+
+    def tearDown(self):
+        self.hedger.close()
+
+    def test_secondary(self):
+
+        self.assertEqual(('VOD:LSE', 'FT'), self.hedger.secondary('vod.l', 'YAHOO'), 'test_secondary suffix')
+        self.assertEqual(('VOD.L', 'YAHOO'), self.hedger.secondary('VOD:LSE', 'FT'), 'test_secondary FT suffix')
+        self.assertIsNone(self.hedger.secondary('IBM', 'YAHOO'), 'test_secondary not mapped')
+        self.assertIsNone(self.hedger.secondary('.L', 'YAHOO'), 'test_secondary suffix only')
+        self.assertIsNone(self.hedger.secondary('BTC-USD', 'COINBASE'), 'test_secondary other source')
+
+        self.hedger.yahoo_to_ft = {'IBM': 'IBM:NYQ'}
+        self.hedger.ft_to_yahoo = {'IBM:NYQ': 'IBM'}
+        self.assertEqual(('IBM:NYQ', 'FT'), self.hedger.secondary('IBM', 'YAHOO'), 'test_secondary mapped')
+        self.assertEqual(('IBM', 'YAHOO'), self.hedger.secondary('IBM:NYQ', 'FT'), 'test_secondary mapped FT')
+
+    def test_applies(self):
+
+        self.assertTrue(self.hedger.applies('VOD.L', Datacode.LAST_PRICE.value, 'YAHOO'), 'test_applies')
+        self.assertFalse(self.hedger.applies('VOD.L', Datacode.VOLUME.value, 'YAHOO'), 'test_applies VOLUME')
+        self.assertFalse(self.hedger.applies('VOD.L', Datacode.CHANGE_IN_PERCENT.value, 'YAHOO'),
+                         'test_applies CHANGE_IN_PERCENT')
+        self.assertFalse(self.hedger.applies('IBM', Datacode.LAST_PRICE.value, 'YAHOO'), 'test_applies not mapped')
+
+        self.hedger.enabled = False
+        self.assertFalse(self.hedger.applies('VOD.L', Datacode.LAST_PRICE.value, 'YAHOO'), 'test_applies disabled')
+
+    def test_primary_answers_in_time(self):
+
+        self.providers['YAHOO'] = StubProvider(72.5)
+        self.providers['FT'] = StubProvider(72.4)
+
+        s = self.hedger.getRealtime('VOD.L', Datacode.LAST_PRICE.value, 'YAHOO', None)
+
+        self.assertEqual(72.5, s, 'test_primary_answers_in_time')
+        self.assertEqual([], self.providers['FT'].lookups, 'test_primary_answers_in_time not hedged')
+
+    def test_slow_primary(self):
+
+        release = threading.Event()
+        self.providers['YAHOO'] = StubProvider(72.5, release)
+        self.providers['FT'] = StubProvider(72.4)
+
+        try:
+            s = self.hedger.getRealtime('VOD.L', Datacode.LAST_PRICE.value, 'YAHOO', None)
+        finally:
+            release.set()
+
+        self.assertEqual(72.4, s, 'test_slow_primary')
+        self.assertEqual(['VOD:LSE'], self.providers['FT'].lookups, 'test_slow_primary hedged')
+
+    def test_failed_primary(self):
+
+        self.providers['YAHOO'] = StubProvider('Yahoo.getRealtime(VOD.L, 21) - failed')
+        self.providers['FT'] = StubProvider(72.4)
+
+        s = self.hedger.getRealtime('VOD.L', Datacode.LAST_PRICE.value, 'YAHOO', None)
+
+        self.assertEqual(72.4, s, 'test_failed_primary')
+
+    def test_both_failed(self):
+
+        self.providers['YAHOO'] = StubProvider('Yahoo.getRealtime(VOD.L, 21) - failed')
+        self.providers['FT'] = StubProvider('FT.getRealtime(VOD:LSE, 21) - failed')
+
+        s = self.hedger.getRealtime('VOD.L', Datacode.LAST_PRICE.value, 'YAHOO', None)
+
+        self.assertEqual('Yahoo.getRealtime(VOD.L, 21) - failed', s, 'test_both_failed error of primary')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
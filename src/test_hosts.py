@@ -0,0 +1,153 @@
+#  test_hosts.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import logging
+import sys
+import unittest
+from unittest import mock
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import baseclient
+import financials_yahoo
+import hosts
+import settings
+import stats
+
+QUERY1 = 'query1.finance.yahoo.com'
+QUERY2 = 'query2.finance.yahoo.com'
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        stats.reset()
+        self.clock = FakeClock()
+        patcher = mock.patch.object(hosts, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.pool = hosts.HostPool([QUERY1, QUERY2])
+
+    def request(self, elapsed=0.1, ok=True, exclude=()):
+        name = self.pool.acquire(exclude)
+        self.pool.release(name, elapsed, ok)
+        return name
+
+    def test_equal_hosts_in_turn(self):
+
+        names = [self.request() for i in range(10)]
+
+        self.assertEqual([QUERY1, QUERY2] * 5, names, 'test_equal_hosts_in_turn')
+
+    def test_concurrent_requests_spread(self):
+
+        names = [self.pool.acquire() for i in range(4)]
+
+        self.assertEqual(2, names.count(QUERY1), 'test_concurrent_requests_spread {}'.format(names))
+        self.assertEqual(2, names.count(QUERY2), 'test_concurrent_requests_spread {}'.format(names))
+
+    def test_faster_host_preferred(self):
+
+        self.pool.release(self.pool.acquire(), 0.1, True)
+        self.pool.release(self.pool.acquire(), 1.0, True)
+
+        names = [self.request(elapsed=0.1) for i in range(5)]
+        self.assertEqual([QUERY1] * 5, names, 'test_faster_host_preferred')
+
+        # until enough requests are in flight on the faster host
+        names = [self.pool.acquire() for i in range(11)]
+        self.assertIn(QUERY2, names, 'test_faster_host_preferred when busy')
+
+    def test_failed_host_left_out(self):
+
+        self.request(ok=False)
+        self.assertEqual(self.clock.now + hosts.DOWN_BASE, self.pool.hosts[0].down_until, 'test_failed_host_left_out')
+
+        names = [self.request() for i in range(3)]
+        self.assertEqual([QUERY2] * 3, names, 'test_failed_host_left_out in use')
+
+        self.clock.now += hosts.DOWN_BASE
+        self.assertIn(QUERY1, [self.request() for i in range(2)], 'test_failed_host_left_out back')
+
+    def test_down_time_grows(self):
+
+        host = self.pool.hosts[0]
+        for failures in range(1, 10):
+            self.pool.acquire([QUERY2])
+            self.pool.release(QUERY1, 0.1, False)
+            expected = min(hosts.DOWN_MAX, hosts.DOWN_BASE * 2 ** (failures - 1))
+            self.assertEqual(self.clock.now + expected, host.down_until, 'test_down_time_grows {}'.format(failures))
+
+        self.pool.acquire([QUERY2])
+        self.pool.release(QUERY1, 0.1, True)
+        self.assertEqual(0, host.failures, 'test_down_time_grows reset')
+
+    def test_exclude(self):
+
+        self.assertEqual(QUERY2, self.request(exclude=[QUERY1]), 'test_exclude')
+        self.assertEqual(QUERY2, self.request(exclude=[QUERY1]), 'test_exclude again')
+        # all hosts tried - any host is better than none
+        self.assertIn(self.request(exclude=[QUERY1, QUERY2]), (QUERY1, QUERY2), 'test_exclude all')
+
+    def test_all_down(self):
+
+        self.request(ok=False)
+        self.clock.now += 1.0
+        self.request(ok=False)
+
+        self.assertEqual(QUERY1, self.pool.acquire(), 'test_all_down earliest back')
+
+    def test_not_sent(self):
+
+        name = self.pool.acquire()
+        self.pool.release(name, None, False)
+
+        self.assertEqual(0, self.pool.hosts[0].inflight, 'test_not_sent inflight')
+        self.assertEqual(0.0, self.pool.hosts[0].down_until, 'test_not_sent not down')
+        self.assertIsNone(self.pool.hosts[0].latency, 'test_not_sent latency')
+
+    def test_no_hosts(self):
+
+        with self.assertRaises(ValueError, msg='test_no_hosts'):
+            hosts.HostPool([])
+
+    def test_yahoo_hosts_setting_empty(self):
+
+        get = settings.get
+        with mock.patch.object(settings, 'get', lambda section, option, fallback=None:
+                               '' if option == 'hosts' else get(section, option, fallback)):
+            yahoo = financials_yahoo.Yahoo(None)
+        self.addCleanup(yahoo.close)
+
+        self.assertEqual([QUERY1, QUERY2], [h.name for h in yahoo.hosts.hosts], 'test_yahoo_hosts_setting_empty')
+
+        # no host left to ask isn't an error without a message
+        yahoo.hosts.hosts = []
+        with self.assertRaises(baseclient.HttpException, msg='test_yahoo_hosts_setting_empty api') as cm:
+            yahoo.api('/v7/finance/quote?symbols=IBM')
+        self.assertIn('no Yahoo API host available', str(cm.exception), 'test_yahoo_hosts_setting_empty message')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
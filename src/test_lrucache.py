@@ -0,0 +1,102 @@
+#  test_lrucache.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import logging
+import sys
+import unittest
+from unittest import mock
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import lrucache
+
+
+class Test(unittest.TestCase):
+
+    def test_eviction(self):
+
+        evicted = []
+        cache = lrucache.LRUCache('test', weigh=lambda v: 100, on_evict=evicted.append, max_bytes=300)
+
+        cache['A'] = 1
+        cache['B'] = 2
+        cache['C'] = 3
+        self.assertEqual([], evicted, 'test_eviction within budget')
+        self.assertEqual(300, cache.bytes, 'test_eviction bytes')
+
+        # A is used again so B is the least recently used
+        self.assertEqual(1, cache['A'], 'test_eviction get')
+        cache['D'] = 4
+
+        self.assertEqual(['B'], evicted, 'test_eviction least recently used')
+        self.assertEqual(['C', 'A', 'D'], list(cache), 'test_eviction order')
+        self.assertEqual(1, cache.evictions, 'test_eviction count')
+
+    def test_replace_and_remove(self):
+
+        cache = lrucache.LRUCache('test', weigh=lambda v: v, max_bytes=1000)
+
+        cache['A'] = 100
+        cache['A'] = 300
+        self.assertEqual(300, cache.bytes, 'test_replace_and_remove replace')
+
+        cache['B'] = 200
+        del cache['A']
+        self.assertEqual(200, cache.bytes, 'test_replace_and_remove del')
+
+        self.assertEqual(200, cache.pop('B'), 'test_replace_and_remove pop')
+        self.assertEqual(0, cache.bytes, 'test_replace_and_remove empty')
+
+        cache['C'] = 100
+        cache.clear()
+        self.assertEqual(0, cache.bytes, 'test_replace_and_remove clear')
+
+    def test_oversized_entry_is_kept(self):
+
+        cache = lrucache.LRUCache('test', weigh=lambda v: v, max_bytes=100)
+
+        cache['A'] = 50
+        cache['B'] = 500
+
+        self.assertEqual(['B'], list(cache), 'test_oversized_entry_is_kept')
+
+    def test_shared_budget(self):
+
+        evicted = []
+
+        with mock.patch.object(lrucache, 'shared_budget', lrucache.MemoryBudget(300)):
+            first = lrucache.LRUCache('first', weigh=lambda v: 100, on_evict=lambda k: evicted.append(('first', k)))
+            second = lrucache.LRUCache('second', weigh=lambda v: 100, on_evict=lambda k: evicted.append(('second', k)))
+
+            first['A'] = 1
+            second['A'] = 1
+            first['B'] = 2
+            self.assertEqual(300, first.budget.bytes, 'test_shared_budget bytes')
+
+            # the least recently used entry of both caches goes first
+            second['B'] = 2
+            self.assertEqual([('first', 'A')], evicted, 'test_shared_budget evicted from other cache')
+
+            first['B']
+            second['C'] = 3
+            self.assertEqual([('first', 'A'), ('second', 'A')], evicted, 'test_shared_budget evicted LRU')
+            self.assertEqual(300, first.budget.bytes, 'test_shared_budget within budget')
+
+            # dropped caches no longer count
+            del second
+            self.assertEqual(100, first.budget.bytes, 'test_shared_budget dropped cache')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
@@ -0,0 +1,122 @@
+#  test_nodata.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import baseclient
+import financials_ft
+import financials_yahoo
+import tickstore
+from datacode import Datacode
+
+EMPTY_FT_PAGE = '<html><body><h1>Search results</h1><p>No results for your search</p></body></html>'
+
+EMPTY_QUOTE_SUMMARY = json.dumps({'quoteSummary': {'result': [{
+    'price': {'symbol': 'DELISTED', 'maxAge': 1},
+    'quoteType': {'symbol': 'DELISTED'},
+}], 'error': None}})
+
+
+class StubFT(financials_ft.FT):
+    """
+    FT client answering every page with a search page without data
+    """
+
+    def __init__(self, basedir):
+        super().__init__(None)
+        self.basedir = basedir
+        self.speculative = False
+        self.fetches = 0
+
+    def urlopen(self, url, data=None, retries=None):
+        self.fetches += 1
+        self.local.status = 200
+        return EMPTY_FT_PAGE
+
+
+class StubYahoo(financials_yahoo.Yahoo):
+    """
+    Yahoo client answering quoteSummary without a quote
+    """
+
+    def __init__(self, basedir):
+        super().__init__(None)
+        self.basedir = basedir
+        self.speculative = False
+        self.crumb = 'TKkC/ZBwoUA'
+        self.fetches = 0
+
+    def api(self, path):
+        self.fetches += 1
+        self.local.status = 200
+        return EMPTY_QUOTE_SUMMARY
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.basedir = directory.name
+        self.store = tickstore.TickStore(os.path.join(self.basedir, 'cache.sqlite'))
+        self.addCleanup(self.store.close)
+
+    def client(self, cls):
+        client = cls(self.basedir)
+        client.store = self.store
+        self.addCleanup(client.close)
+        return client
+
+    def assertNotFound(self, client, ticker, msg):
+        self.assertIsNotNone(client.failed(ticker), msg + ' failure cached')
+        expires, _ = client.failed(ticker)
+        self.assertAlmostEqual(client.failure_ttl[baseclient.NOT_FOUND],
+                               expires - time.time(), delta=5.0, msg=msg + ' not found')
+        self.assertNotIn(ticker, client.realtime, msg + ' not cached')
+        self.assertEqual([], self.store.items(client.get_ticker), msg + ' not persisted')
+
+    def test_empty_ft_page(self):
+
+        ft = self.client(StubFT)
+
+        s = ft.getRealtime('NO_NAME:LSE', Datacode.NAME.value)
+        self.assertEqual('FT.getRealtime(NO_NAME:LSE, 104) - no data', s, 'test_empty_ft_page')
+        self.assertNotFound(ft, 'NO_NAME:LSE', 'test_empty_ft_page')
+
+        # answered from the failure cache
+        ft.getRealtime('NO_NAME:LSE', Datacode.LAST_PRICE.value)
+        self.assertEqual(1, ft.fetches, 'test_empty_ft_page fetches')
+
+    def test_empty_yahoo_quote_summary(self):
+
+        yahoo = self.client(StubYahoo)
+
+        s = yahoo.getRealtime('DELISTED', Datacode.NAME.value)
+        self.assertEqual('Yahoo.getRealtime(DELISTED, 104) - no data', s, 'test_empty_yahoo_quote_summary')
+        self.assertNotFound(yahoo, 'DELISTED', 'test_empty_yahoo_quote_summary')
+
+        yahoo.getRealtime('DELISTED', Datacode.LAST_PRICE.value)
+        self.assertEqual(1, yahoo.fetches, 'test_empty_yahoo_quote_summary fetches')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
@@ -0,0 +1,153 @@
+#  test_prefetch.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import logging
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import prefetch
+from datacode import Datacode
+
+
+class StubProvider:
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.lookups = []
+        self.batches = []
+        self.historic = []
+
+    def getRealtime(self, ticker, datacode, max_age=None):
+        time.sleep(self.delay)
+        with self.lock:
+            self.lookups.append((ticker, datacode))
+        return 1.5
+
+    def getRealtimeBatch(self, tickers, max_age=None, datacodes=None):
+        self.batches.append(list(tickers))
+
+    def getHistoric(self, ticker, datacode, date):
+        time.sleep(self.delay)
+        with self.lock:
+            self.historic.append((ticker, datacode, date))
+        return 1.5
+
+
+class StubFinancials:
+    """
+    The parts of FinancialsImpl prefetching uses
+    """
+
+    def __init__(self):
+        self.providers = {'YAHOO': StubProvider(0.1), 'FT': StubProvider(0.1), 'COINBASE': StubProvider()}
+        self.pools = {'YAHOO': ThreadPoolExecutor(max_workers=4), 'FT': ThreadPoolExecutor(max_workers=4)}
+
+    def provider(self, source):
+        return self.providers.get(source)
+
+    def pool(self, source):
+        return self.pools.get(source)
+
+    def _date(self, date):
+        return (None, 'Date format not supported') if date == 'soon' else (date, None)
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.shutdown()
+
+
+class StubSheet:
+
+    def __init__(self, cells):
+        self.cells = cells
+
+    def getCellRangeByName(self, name):
+        sheet = self
+
+        class Range:
+            def getDataArray(self):
+                return sheet.cells[name]
+
+        return Range()
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.financials = StubFinancials()
+        self.prefetch = prefetch.Prefetch(self.financials)
+
+    def tearDown(self):
+        self.financials.close()
+
+    def test_split_arguments(self):
+
+        self.assertEqual(['"IBM"', '21', '"YAHOO"'], prefetch.split_arguments('"IBM";21;"YAHOO"'),
+                         'test_split_arguments')
+        self.assertEqual(['"A;B"', '', 'C1'], prefetch.split_arguments('"A;B",,C1'), 'test_split_arguments quoted')
+
+    def test_add_formula(self):
+
+        sheet = StubSheet({'A1:A2': ((' IBM ',), ('MSFT',)), 'B1': (('FT',),)})
+
+        self.prefetch.add_formula(None, sheet, '=GETREALTIME(A1:A2;21;"YAHOO")+getRealtimeAsync("VOD:LSE";21;B1)')
+        self.prefetch.add_formula(None, sheet, '=com.financials.getinfo.python.FinancialsImpl.getHistoric('
+                                               '"IBM";90;"2024-03-01";"YAHOO")')
+        self.prefetch.add_formula(None, sheet, '=GETHISTORIC("IBM";90;"2023-01-02";"YAHOO")')
+        self.prefetch.add_formula(None, sheet, '=GETHISTORIC("SAP";90;"soon";"YAHOO")')
+        self.prefetch.add_formula(None, sheet, '=GETHISTORIC("VOD:LSE";90;"2024-03-01";"FT")')
+
+        self.assertEqual({'YAHOO': {'IBM', 'MSFT'}, 'FT': {'VOD:LSE'}}, self.prefetch.realtime, 'test_add_formula')
+        self.assertEqual({'IBM': '2023-01-02'}, self.prefetch.historic, 'test_add_formula historic')
+
+    def test_run(self):
+
+        self.prefetch.realtime = {'YAHOO': {'IBM', 'MSFT'}, 'FT': {'A', 'B', 'C', 'D'}, 'COINBASE': {'BTC-USD'},
+                                  'NO_SUCH_SOURCE': {'X'}}
+        self.prefetch.historic = {'IBM': '2023-01-02', 'MSFT': '2023-01-02', 'SAP': '2023-01-03', 'VOD.L': '2024-03-01'}
+
+        start = time.perf_counter()
+        self.prefetch.run()
+        elapsed = time.perf_counter() - start
+
+        providers = self.financials.providers
+        self.assertEqual([['IBM', 'MSFT']], providers['YAHOO'].batches, 'test_run Yahoo batch')
+        self.assertEqual([('IBM', Datacode.CLOSE.value, '2023-01-02'), ('MSFT', Datacode.CLOSE.value, '2023-01-02'),
+                          ('SAP', Datacode.CLOSE.value, '2023-01-03'), ('VOD.L', Datacode.CLOSE.value, '2024-03-01')],
+                         sorted(providers['YAHOO'].historic), 'test_run historic')
+        self.assertEqual(['A', 'B', 'C', 'D'], sorted(t for t, _ in providers['FT'].lookups), 'test_run FT')
+        self.assertEqual([('BTC-USD', Datacode.LAST_PRICE.value)], providers['COINBASE'].lookups, 'test_run Coinbase')
+
+        # FT tickers and Yahoo history are looked up on the pool of the source at the same time
+        self.assertLess(elapsed, 0.35, 'test_run in parallel {:.3f} s'.format(elapsed))
+
+    def test_run_without_pool(self):
+
+        del self.financials.pools['YAHOO']
+        self.prefetch.historic = {'IBM': '2023-01-02', 'MSFT': '2023-01-02'}
+
+        self.prefetch.run()
+
+        self.assertEqual([('IBM', Datacode.CLOSE.value, '2023-01-02'), ('MSFT', Datacode.CLOSE.value, '2023-01-02')],
+                         self.financials.providers['YAHOO'].historic, 'test_run_without_pool')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
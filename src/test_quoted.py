@@ -0,0 +1,113 @@
+#  test_quoted.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import quoted
+
+
+class StubProvider:
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = []
+
+    def getRealtime(self, ticker, datacode, max_age=None):
+        self.calls.append(('getRealtime', ticker, datacode, max_age))
+        return '{} {}'.format(self.name, ticker)
+
+    def getRealtimeBatch(self, tickers, max_age=None, datacodes=None):
+        self.calls.append(('getRealtimeBatch', tickers, max_age, datacodes))
+        return None
+
+    def getHistoric(self, ticker, datacode, date, fetch=True):
+        raise KeyError(ticker)
+
+    def getHistoricRange(self, ticker, datacodes, start, end, fetch=True):
+        return [('2024-03-01', 1.5), ('2024-03-04', 1.6)]
+
+    def expires_at(self, ticker, datacode, max_age=None):
+        raise RuntimeError('not cached')
+
+    def close(self):
+        pass
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'quoted.sock')
+
+        self.server = quoted.Server(self.path)
+        self.daemon = self.server.providers['YAHOO'] = StubProvider('daemon')
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+
+        self.local = StubProvider('local')
+        self.client = quoted.RemoteClient('YAHOO', lambda: self.local, self.path)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_answered_by_daemon(self):
+
+        self.assertEqual('daemon IBM', self.client.getRealtime('IBM', 21, 60), 'test_answered_by_daemon')
+        self.assertEqual([('getRealtime', 'IBM', 21, 60)], self.daemon.calls, 'test_answered_by_daemon args')
+        self.assertEqual([], self.local.calls, 'test_answered_by_daemon not local')
+
+    def test_arguments(self):
+
+        self.client.getRealtimeBatch(('IBM', 'MSFT'), None, (21, 104))
+        self.assertEqual([('getRealtimeBatch', ['IBM', 'MSFT'], None, [21, 104])], self.daemon.calls,
+                         'test_arguments lists')
+
+        s = self.client.getHistoricRange('IBM', (5, 6), '2024-03-01', '2024-03-04')
+        self.assertEqual([('2024-03-01', 1.5), ('2024-03-04', 1.6)], s, 'test_arguments rows are tuples')
+
+    def test_error(self):
+
+        s = self.client.getHistoric('IBM', 5, '2024-03-01')
+        self.assertEqual("YAHOO.getHistoric - daemon: KeyError: 'IBM'", s, 'test_error')
+
+        s = self.client._call('close')
+        self.assertIsNone(s, 'test_error method not supported')
+
+    def test_error_not_shown(self):
+
+        # an error isn't a time or a cached value, it would be mistaken for one
+        self.assertIsNone(self.client.expires_at('IBM', 21), 'test_error_not_shown expires_at')
+        self.assertEqual([], self.local.calls, 'test_error_not_shown not local')
+
+    def test_daemon_down(self):
+
+        self.server.shutdown()
+        self.server.server_close()
+
+        self.assertEqual('local IBM', self.client.getRealtime('IBM', 21), 'test_daemon_down')
+        self.assertGreater(self.client.down_until, 0.0, 'test_daemon_down retried later')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
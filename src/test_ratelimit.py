@@ -0,0 +1,146 @@
+#  test_ratelimit.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import email.utils
+import logging
+import sys
+import unittest
+from unittest import mock
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import ratelimit
+
+
+class FakeClock:
+    """
+    time.time(), time.monotonic() and time.sleep() - sleeping advances the clock at once
+    """
+
+    def __init__(self):
+        self.now = 1700000000.0
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(ratelimit, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_rate(self):
+
+        bucket = ratelimit.TokenBucket('host', 2.0, 3)
+
+        for i in range(3):
+            self.assertTrue(bucket.acquire(10.0), 'test_burst_then_rate burst {}'.format(i))
+        self.assertEqual([], self.clock.slept, 'test_burst_then_rate no wait')
+
+        self.assertTrue(bucket.acquire(10.0), 'test_burst_then_rate fourth')
+        self.assertEqual([0.5], self.clock.slept, 'test_burst_then_rate wait for a token')
+
+    def test_refill(self):
+
+        bucket = ratelimit.TokenBucket('host', 1.0, 2)
+
+        bucket.acquire(10.0)
+        bucket.acquire(10.0)
+        self.clock.now += 100.0
+
+        # tokens don't pile up beyond burst
+        bucket.acquire(10.0)
+        bucket.acquire(10.0)
+        self.assertEqual([], self.clock.slept, 'test_refill burst')
+        bucket.acquire(10.0)
+        self.assertEqual([1.0], self.clock.slept, 'test_refill rate')
+
+    def test_max_wait(self):
+
+        bucket = ratelimit.TokenBucket('host', 0.1, 1)
+
+        self.assertTrue(bucket.acquire(1.0), 'test_max_wait first')
+        self.assertFalse(bucket.acquire(1.0), 'test_max_wait 10 s away')
+        self.assertEqual([], self.clock.slept, 'test_max_wait no sleep')
+
+        # a refused request doesn't use a token
+        self.assertTrue(bucket.acquire(10.0), 'test_max_wait within max_wait')
+        self.assertEqual([10.0], self.clock.slept, 'test_max_wait slept')
+
+    def test_no_rate_limit(self):
+
+        bucket = ratelimit.TokenBucket('host', 0, 1)
+
+        for i in range(100):
+            self.assertTrue(bucket.acquire(0.0), 'test_no_rate_limit {}'.format(i))
+        self.assertEqual([], self.clock.slept, 'test_no_rate_limit')
+
+    def test_backoff_retry_after(self):
+
+        bucket = ratelimit.TokenBucket('host', 0, 1)
+
+        self.assertEqual(5.0, bucket.backoff(0, '5'), 'test_backoff_retry_after delay')
+        self.assertFalse(bucket.acquire(4.0), 'test_backoff_retry_after blocked')
+        self.assertTrue(bucket.acquire(5.0), 'test_backoff_retry_after waits')
+        self.assertEqual([5.0], self.clock.slept, 'test_backoff_retry_after slept')
+
+        # a shorter Retry-After doesn't unblock earlier
+        bucket.backoff(0, '10')
+        bucket.backoff(0, '1')
+        self.assertFalse(bucket.acquire(9.0), 'test_backoff_retry_after longest wins')
+
+    def test_backoff_exponential(self):
+
+        bucket = ratelimit.TokenBucket('host', 0, 1)
+
+        for attempt in range(8):
+            expected = min(ratelimit.BACKOFF_MAX, ratelimit.BACKOFF_BASE * 2 ** attempt)
+            delay = bucket.backoff(attempt)
+            self.assertTrue(0.5 * expected <= delay <= expected,
+                            'test_backoff_exponential attempt={} delay={}'.format(attempt, delay))
+
+    def test_parse_retry_after(self):
+
+        self.assertEqual(120.0, ratelimit.parse_retry_after('120'), 'test_parse_retry_after seconds')
+        self.assertEqual(0.0, ratelimit.parse_retry_after('-3'), 'test_parse_retry_after negative')
+        self.assertIsNone(ratelimit.parse_retry_after(None), 'test_parse_retry_after None')
+        self.assertIsNone(ratelimit.parse_retry_after('soon'), 'test_parse_retry_after invalid')
+
+        date = email.utils.formatdate(self.clock.now + 30.0, usegmt=True)
+        self.assertEqual(30.0, ratelimit.parse_retry_after(date), 'test_parse_retry_after HTTP date')
+
+        date = email.utils.formatdate(self.clock.now - 30.0, usegmt=True)
+        self.assertEqual(0.0, ratelimit.parse_retry_after(date), 'test_parse_retry_after past HTTP date')
+
+    def test_shared_bucket(self):
+
+        with mock.patch.object(ratelimit, 'buckets', {}):
+            first = ratelimit.bucket('query1.finance.yahoo.com', 5.0, 10)
+            self.assertIs(first, ratelimit.bucket('query1.finance.yahoo.com', 1.0, 1), 'test_shared_bucket same host')
+            self.assertIsNot(first, ratelimit.bucket('query2.finance.yahoo.com', 5.0, 10), 'test_shared_bucket other')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
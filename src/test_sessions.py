@@ -0,0 +1,85 @@
+#  test_sessions.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import datetime
+import logging
+import sys
+import unittest
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import pytz
+
+import sessions
+
+NEW_YORK = pytz.timezone('America/New_York')
+
+
+def new_york(*args):
+    return NEW_YORK.localize(datetime.datetime(*args)).timestamp()
+
+
+class Test(unittest.TestCase):
+
+    def test_open(self):
+
+        # Tuesday
+        self.assertIsNone(sessions.closed_until('NYSE', new_york(2024, 3, 5, 12, 0)), 'test_open midday')
+        self.assertIsNone(sessions.closed_until('NYSE', new_york(2024, 3, 5, 9, 30)), 'test_open at open')
+        self.assertIsNone(sessions.closed_until('nyse', new_york(2024, 3, 5, 12, 0)), 'test_open lower case')
+
+        # data fetched shortly after the close may still change
+        self.assertIsNone(sessions.closed_until('NYSE', new_york(2024, 3, 5, 16, 20)), 'test_open close delay')
+
+    def test_closed(self):
+
+        self.assertEqual(new_york(2024, 3, 5, 9, 30), sessions.closed_until('NYSE', new_york(2024, 3, 5, 8, 0)),
+                         'test_closed before open')
+        self.assertEqual(new_york(2024, 3, 6, 9, 30), sessions.closed_until('NYSE', new_york(2024, 3, 5, 16, 30)),
+                         'test_closed after close')
+
+    def test_weekend(self):
+
+        monday = new_york(2024, 3, 4, 9, 30)
+
+        self.assertEqual(monday, sessions.closed_until('NYSE', new_york(2024, 3, 1, 17, 0)), 'test_weekend Friday')
+        self.assertEqual(monday, sessions.closed_until('NYSE', new_york(2024, 3, 2, 8, 0)), 'test_weekend Saturday')
+        self.assertEqual(monday, sessions.closed_until('NYSE', new_york(2024, 3, 3, 12, 0)), 'test_weekend Sunday')
+
+    def test_daylight_saving_time(self):
+
+        # clocks go forward on Sunday March 10 2024 in New York
+        self.assertEqual(new_york(2024, 3, 11, 9, 30), sessions.closed_until('NYSE', new_york(2024, 3, 8, 17, 0)),
+                         'test_daylight_saving_time')
+
+    def test_next_open(self):
+
+        self.assertEqual(new_york(2024, 3, 5, 9, 30), sessions.next_open('NYSE', new_york(2024, 3, 4, 23, 0)),
+                         'test_next_open closed')
+        self.assertEqual(new_york(2024, 3, 6, 9, 30), sessions.next_open('NYSE', new_york(2024, 3, 5, 9, 30)),
+                         'test_next_open at open')
+        self.assertEqual(new_york(2024, 3, 11, 9, 30), sessions.next_open('NYSE', new_york(2024, 3, 8, 12, 0)),
+                         'test_next_open Friday')
+        self.assertIsNone(sessions.next_open('NO_SUCH_EXCHANGE', new_york(2024, 3, 5, 12, 0)),
+                          'test_next_open unknown exchange')
+
+    def test_unknown_exchange(self):
+
+        self.assertIsNone(sessions.closed_until('NO_SUCH_EXCHANGE', new_york(2024, 3, 2, 8, 0)),
+                          'test_unknown_exchange')
+        self.assertIsNone(sessions.closed_until(None, new_york(2024, 3, 2, 8, 0)), 'test_unknown_exchange None')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
@@ -0,0 +1,129 @@
+#  test_snapshot.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import baseclient
+import financials_yahoo
+import settings
+import snapshot
+import tickstore
+from datacode import Datacode
+
+
+class Test(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.filename = os.path.join(cls.directory.name, 'month-end.snapshot')
+
+        yahoo = financials_yahoo.Yahoo(None)
+        try:
+            tick = yahoo.get_ticker()
+            tick[Datacode.LAST_PRICE] = 72.5
+            tick[Datacode.NAME] = 'Vodafone Group Plc'
+            tick[Datacode.TIMESTAMP] = time.time()
+            yahoo.realtime['VOD.L'] = tick
+
+            ticks = {}
+            for date, close in (('2024-03-01', 70.0), ('2024-03-04', 71.0), ('2024-03-05', 72.0)):
+                ticks[date] = yahoo.get_ticker()
+                ticks[date][Datacode.CLOSE] = close
+            yahoo.historicdata['VOD.L'] = ticks
+
+            # only what the providers hold, not the cache files of the user running the test
+            with mock.patch.object(tickstore, 'shared', lambda: None), \
+                    mock.patch.object(settings, 'basedir', cls.directory.name):
+                cls.exported = snapshot.export(cls.filename, {'YAHOO': yahoo})
+        finally:
+            yahoo.close()
+
+        cls.providers = snapshot.load(cls.filename)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_export(self):
+
+        self.assertEqual((1, 1), self.exported, 'test_export')
+        self.assertEqual({'YAHOO', 'FT', 'COINBASE'}, set(self.providers), 'test_export providers')
+
+    def test_export_store(self):
+
+        filename = os.path.join(self.directory.name, 'store.snapshot')
+        store = tickstore.TickStore(os.path.join(self.directory.name, 'cache.sqlite'))
+        try:
+            tick = baseclient.new_tick()
+            tick[Datacode.LAST_PRICE] = 180.5
+            tick[Datacode.TIMESTAMP] = time.time()
+            store.save('yahoo', [('IBM', tick, False)])
+
+            with mock.patch.object(tickstore, 'shared', lambda: store), \
+                    mock.patch.object(settings, 'basedir', self.directory.name):
+                self.assertEqual((1, 0), snapshot.export(filename), 'test_export_store')
+        finally:
+            store.close()
+
+        yahoo = snapshot.load(filename)['YAHOO']
+        self.assertEqual(180.5, yahoo.getRealtime('IBM', Datacode.LAST_PRICE.value), 'test_export_store tick')
+
+    def test_realtime(self):
+
+        yahoo = self.providers['YAHOO']
+
+        self.assertEqual(72.5, yahoo.getRealtime('VOD.L', Datacode.LAST_PRICE.value), 'test_realtime')
+        self.assertEqual(72.5, yahoo.getRealtime('VOD.L', Datacode.LAST_PRICE.value, 0), 'test_realtime max_age 0')
+        self.assertEqual('Vodafone Group Plc', yahoo.getCached('VOD.L', Datacode.NAME.value), 'test_realtime cached')
+        self.assertEqual("Ticker 'IBM' not in snapshot", yahoo.getRealtime('IBM', Datacode.LAST_PRICE.value),
+                         'test_realtime missing')
+        self.assertIsNone(yahoo.getCached('IBM', Datacode.LAST_PRICE.value), 'test_realtime missing cached')
+        self.assertEqual(float('inf'), yahoo.expires_at('VOD.L', Datacode.LAST_PRICE.value), 'test_realtime expiry')
+
+    def test_historic(self):
+
+        yahoo = self.providers['YAHOO']
+
+        self.assertEqual(71.0, yahoo.getHistoric('VOD.L', Datacode.CLOSE.value, '2024-03-04'), 'test_historic')
+        self.assertEqual("Not a trading day '2024-03-02'",
+                         yahoo.getHistoric('VOD.L', Datacode.CLOSE.value, '2024-03-02'), 'test_historic weekend')
+        self.assertEqual("Date '2024-04-01' not in snapshot",
+                         yahoo.getHistoric('VOD.L', Datacode.CLOSE.value, '2024-04-01'), 'test_historic outside')
+
+        s = yahoo.getHistoricRange('VOD.L', [Datacode.CLOSE.value], '2024-03-02', '2024-03-31')
+        self.assertEqual([('2024-03-04', [71.0]), ('2024-03-05', [72.0])], s, 'test_historic range')
+
+    def test_version(self):
+
+        filename = os.path.join(self.directory.name, 'future.snapshot')
+        with gzip.open(filename, 'wt', encoding='utf-8') as f:
+            json.dump({'version': snapshot.VERSION + 1, 'realtime': {}, 'historic': {}}, f)
+
+        with self.assertRaises(ValueError, msg='test_version'):
+            snapshot.load(filename)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
@@ -0,0 +1,58 @@
+#  test_startup.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import unittest
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+# dependencies the add-in must not load before a lookup needs them
+LAZY_MODULES = ['dateutil', 'pytz', 'pyparsing', 'six', 'requests', 'curl_cffi',
+                'financials_yahoo', 'financials_ft', 'financials_coinbase']
+
+SCRIPT = '''
+import json, sys
+import financials
+impl = financials.createInstance(None)
+loaded = [m for m in {modules} if m in sys.modules]
+date = impl._date(45352)
+impl.provider('COINBASE')
+print(json.dumps({{'loaded': loaded, 'date': date, 'providers': sorted(impl.providers)}}))
+impl.close()
+'''
+
+
+class Test(unittest.TestCase):
+
+    def test_lazy_loading(self):
+
+        # a fresh interpreter, modules loaded by other tests don't count
+        script = SCRIPT.format(modules=LAZY_MODULES)
+        output = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual(0, output.returncode, 'test_lazy_loading {}'.format(output.stderr))
+
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+
+        self.assertEqual([], result['loaded'], 'test_lazy_loading modules')
+        self.assertEqual(['2024-03-01', None], result['date'], 'test_lazy_loading serial date')
+        self.assertEqual(['COINBASE'], result['providers'], 'test_lazy_loading providers on first use')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
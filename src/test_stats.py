@@ -0,0 +1,120 @@
+#  test_stats.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import logging
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import baseclient
+import stats
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        stats.reset()
+
+    def test_percentile(self):
+
+        h = stats.Histogram()
+        self.assertEqual(0.0, h.percentile(50), 'test_percentile empty')
+
+        for i in range(99):
+            h.add(1.0, False)
+        h.add(1000.0, True)
+
+        self.assertTrue(1.0 <= h.percentile(50) < 1.25, 'test_percentile p50 {}'.format(h.percentile(50)))
+        self.assertTrue(1.0 <= h.percentile(99) < 1.25, 'test_percentile p99 {}'.format(h.percentile(99)))
+        self.assertTrue(1000.0 <= h.percentile(100) < 1250.0, 'test_percentile max {}'.format(h.percentile(100)))
+        self.assertEqual(1, h.errors, 'test_percentile errors')
+
+    def test_percentile_min_count(self):
+
+        for i in range(5):
+            stats.record('hedge', 'YAHOO', 'primary', 10.0, False)
+
+        self.assertIsNone(stats.percentile('hedge', 'YAHOO', 'primary', 95, 10), 'test_percentile_min_count few')
+        self.assertIsNotNone(stats.percentile('hedge', 'YAHOO', 'primary', 95, 5), 'test_percentile_min_count')
+        self.assertIsNone(stats.percentile('hedge', 'FT', 'primary', 95), 'test_percentile_min_count unknown')
+
+    def test_is_error(self):
+
+        self.assertTrue(stats.is_error(None), 'test_is_error None')
+        self.assertTrue(stats.is_error('Yahoo.getRealtime(IBM, 21) - crumb missing'), 'test_is_error message')
+        self.assertFalse(stats.is_error('International Business Machines'), 'test_is_error text value')
+        self.assertFalse(stats.is_error(1.5), 'test_is_error number')
+
+    def test_report(self):
+
+        stats.record('getRealtime', 'YAHOO', 'hit', 0.5, False)
+        stats.record('getRealtime', 'YAHOO', 'hit', 0.5, True)
+        stats.memo_hit('yahoo')
+        stats.memo_hit('YAHOO')
+        stats.evicted('yahoo.realtime')
+        stats.budget_exceeded('FT')
+        stats.throttled('query1.finance.yahoo.com')
+        stats.breaker_opened('ft')
+
+        lines = stats.report().split('\n')
+
+        self.assertEqual('function source outcome count errors error% p50(ms) p95(ms) p99(ms) mean(ms)', lines[0],
+                         'test_report header')
+        self.assertTrue(lines[1].startswith('getRealtime YAHOO hit 2 1 50.0 '), 'test_report {}'.format(lines[1]))
+        self.assertIn('getRealtime YAHOO memo 2', lines, 'test_report memo')
+        self.assertIn('cache yahoo.realtime evictions 1', lines, 'test_report evictions')
+        self.assertIn('getRealtime FT over_budget 1', lines, 'test_report over_budget')
+        self.assertIn('host query1.finance.yahoo.com throttled 1', lines, 'test_report throttled')
+        self.assertIn('breaker ft opened 1', lines, 'test_report breaker')
+
+        stats.reset()
+        self.assertEqual(1, len(stats.report().split('\n')), 'test_report reset')
+
+    def test_memo_hits_from_threads(self):
+
+        def hit():
+            for i in range(1000):
+                stats.memo_hit('YAHOO')
+
+        threads = [threading.Thread(target=hit) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(8000, stats.memo_hits['YAHOO'], 'test_memo_hits_from_threads')
+
+    def test_requests_per_thread(self):
+
+        def fetch():
+            baseclient.count_requests(2)
+            return 1.5
+
+        start = baseclient.thread_requests()
+
+        # requests of other threads don't count
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            result, requests = pool.submit(baseclient.counted, fetch).result()
+        self.assertEqual(start, baseclient.thread_requests(), 'test_requests_per_thread other thread')
+        self.assertEqual((1.5, 2), (result, requests), 'test_requests_per_thread counted')
+
+        baseclient.count_requests(requests)
+        self.assertEqual(start + 2, baseclient.thread_requests(), 'test_requests_per_thread handed back')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
@@ -48,6 +48,17 @@ class Test(unittest.TestCase):
         self.assertTrue("type(datacode)=<class 'tuple'>" in s, 'test_errors SUPPORT {}'.format(s))
         self.assertTrue("str(datacode)=((1, 2), ('3', '4'), (5.0, 6.0))" in s, 'test_errors SUPPORT {}'.format(s))
 
+    def test_stats(self):
+
+        s = financials.getRealtime('STATS', 'RESET')
+        self.assertEqual('Statistics reset', s, 'test_stats RESET {}'.format(s))
+
+        financials.getRealtime('SUPPORT')
+
+        s = financials.getRealtime('STATS')
+        self.assertTrue(s.startswith('function source outcome count'), 'test_stats STATS {}'.format(s))
+        self.assertIn('support NONE hit 1 0', s, 'test_stats STATS {}'.format(s))
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
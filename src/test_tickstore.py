@@ -0,0 +1,89 @@
+#  test_tickstore.py
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import sys
+import tempfile
+import unittest
+
+logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+import tickstore
+from datacode import Datacode, TTLClass
+
+
+def get_ticker():
+    return {datacode: None for datacode in Datacode}
+
+
+def sample_tick():
+    tick = get_ticker()
+    tick[Datacode.TICKER] = 'VOD.L'
+    tick[Datacode.LAST_PRICE] = 72.5
+    tick[Datacode.NAME] = 'Vodafone Group Plc'
+    tick[Datacode.LAST_PRICE_DATE] = datetime.date(2024, 3, 1)
+    tick[Datacode.LAST_PRICE_TIME] = datetime.time(16, 35, 12)
+    tick[Datacode.EX_DIV_DATE] = datetime.datetime(2024, 2, 1, 9, 0)
+    tick[Datacode.TIMESTAMP] = 1709310912.5
+    tick[TTLClass.STATIC] = 1709300000.0
+    return tick
+
+
+class Test(unittest.TestCase):
+
+    def test_encode_decode(self):
+
+        tick = sample_tick()
+
+        data = tickstore.encode_tick(tick)
+        self.assertNotIn('VOLUME', data, 'test_encode_decode None values are left out')
+        self.assertEqual({'d': '2024-03-01'}, data['LAST_PRICE_DATE'], 'test_encode_decode date')
+
+        # stored as JSON
+        decoded = tickstore.decode_tick(json.loads(json.dumps(data)), get_ticker())
+        self.assertEqual(tick, decoded, 'test_encode_decode round trip')
+
+    def test_decode_ignores_unknown_names(self):
+
+        decoded = tickstore.decode_tick({'NO_SUCH_DATACODE': 1, 'LAST_PRICE': 2.0}, get_ticker())
+
+        self.assertEqual(2.0, decoded[Datacode.LAST_PRICE], 'test_decode_ignores_unknown_names')
+        self.assertNotIn('NO_SUCH_DATACODE', decoded, 'test_decode_ignores_unknown_names')
+
+    def test_store(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            store = tickstore.TickStore(os.path.join(directory, 'cache.sqlite'))
+            try:
+                tick = sample_tick()
+                unfetched = get_ticker()
+
+                store.save('yahoo', [('VOD.L', tick, True), ('NO_TIMESTAMP', unfetched, False)])
+
+                self.assertEqual((tick, True), store.load('yahoo', 'VOD.L', get_ticker()), 'test_store load')
+                self.assertIsNone(store.load('ft', 'VOD.L', get_ticker()), 'test_store other source')
+                self.assertIsNone(store.load('yahoo', 'NO_TIMESTAMP', get_ticker()), 'test_store not fetched')
+
+                tick[Datacode.LAST_PRICE] = 73.0
+                store.save('yahoo', [('VOD.L', tick, False)])
+                self.assertEqual([('yahoo', 'VOD.L', tick, False)], store.items(get_ticker), 'test_store replace')
+            finally:
+                store.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('unittest_args', nargs='*')
+    args = parser.parse_args()
+    unit_argv = [sys.argv[0]] + args.unittest_args
+    unittest.main(argv=unit_argv)
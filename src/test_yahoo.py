@@ -56,6 +56,28 @@ class Test(unittest.TestCase):
         s = financials.getRealtime('EURGBP=X', Datacode.LAST_PRICE.value, 'YAHOO')
         self.assertEqual(float, type(s), 'test_currency LAST_PRICE')
 
+    def test_realtime_batch(self):
+
+        financials.memo.clear()
+        financials.yahoo.realtime.clear()
+        financials.yahoo.partial.clear()
+
+        s = financials.yahoo.getRealtimeBatch(['IBM', 'MSFT', 'VOD.L', 'NO_NAME'])
+        self.assertIsNone(s, 'test_realtime_batch {}'.format(s))
+
+        self.assertIn('IBM', financials.yahoo.partial, 'test_realtime_batch IBM')
+        self.assertIn('VOD.L', financials.yahoo.partial, 'test_realtime_batch VOD.L')
+        self.assertNotIn('NO_NAME', financials.yahoo.realtime, 'test_realtime_batch NO_NAME')
+
+        s = financials.getRealtime('MSFT', Datacode.LAST_PRICE.value, 'YAHOO')
+        self.assertEqual(float, type(s), 'test_realtime_batch LAST_PRICE {}'.format(s))
+        self.assertIn('MSFT', financials.yahoo.partial, 'test_realtime_batch MSFT')
+
+        # not part of the multi-symbol quote - triggers full fetch
+        s = financials.getRealtime('IBM', 'SECTOR', 'YAHOO')
+        self.assertEqual(s, 'Technology', 'test_realtime_batch SECTOR {}'.format(s))
+        self.assertNotIn('IBM', financials.yahoo.partial, 'test_realtime_batch IBM')
+
     def test_realtime_US_ZVZZT(self):
 
         s = financials.getRealtime('ZVZZT', Datacode.PAYOUT_RATIO.value, 'YAHOO')
@@ -465,6 +487,25 @@ class Test(unittest.TestCase):
         s = financials.getHistoric('VERX.L', Datacode.CLOSE.value, 42646.0, 'YAHOO')  # 2016-10-03
         self.assertAlmostEqual(s, 22.26, 2, 'test_historic_UK_ETF CLOSE {}'.format(s))
 
+    def test_historic_range(self):
+
+        s = financials.getHistoricRange('IBM', '2017-01-01', '2017-01-31', None, 'YAHOO')
+        self.assertEqual(20, len(s.value), 'test_historic_range {}'.format(s))
+        self.assertEqual(42738.0, s.value[0][0], 'test_historic_range date {}'.format(s))  # 2017-01-03
+        self.assertEqual(6, len(s.value[0]), 'test_historic_range {}'.format(s))
+        self.assertAlmostEqual(159.84, s.value[0][4], 2, 'test_historic_range CLOSE {}'.format(s))
+
+        s = financials.getHistoricRange('IBM', 42738, 42738, (('CLOSE', 'ADJ_CLOSE'),), 'YAHOO')
+        self.assertEqual(1, len(s.value), 'test_historic_range {}'.format(s))
+        self.assertAlmostEqual(159.84, s.value[0][1], 2, 'test_historic_range CLOSE {}'.format(s))
+        self.assertEqual(float, type(s.value[0][2]), 'test_historic_range ADJ_CLOSE {}'.format(s))
+
+        s = financials.getHistoricRange('IBM', '2017-01-31', '2017-01-01', None, 'YAHOO')
+        self.assertEqual('Start date \'2017-01-31\' after end date \'2017-01-01\'', s, 'test_historic_range {}'.format(s))
+
+        s = financials.getHistoricRange('IBM', '2017-01-01', '2017-01-31', None, 'FT')
+        self.assertEqual('Source \'FT\' not supported', s, 'test_historic_range {}'.format(s))
+
     def test_historic_DE_equity(self):
 
         s = financials.getHistoric('SAP.DE', Datacode.LAST_PRICE.value, '2017-01-01', 'YAHOO')
@@ -520,6 +561,25 @@ class Test(unittest.TestCase):
         s = financials.getHistoric('IBM', Datacode.CLOSE.value, -1000000, 'YAHOO')
         self.assertEqual(s, 'Date format not supported: -1000000', 'test_historic_errors CLOSE {}'.format(s))
 
+    def test_realtime_cell_range(self):
+
+        s = financials.getRealtime((('IBM',), ('MSFT',), ('',), ('IBM',)), Datacode.LAST_PRICE.value, 'YAHOO')
+        self.assertEqual(4, len(s.value), 'test_realtime_cell_range {}'.format(s))
+        self.assertEqual(float, type(s.value[0][0]), 'test_realtime_cell_range IBM {}'.format(s))
+        self.assertEqual(float, type(s.value[1][0]), 'test_realtime_cell_range MSFT {}'.format(s))
+        self.assertEqual('', s.value[2][0], 'test_realtime_cell_range empty {}'.format(s))
+        self.assertEqual(s.value[0][0], s.value[3][0], 'test_realtime_cell_range IBM {}'.format(s))
+
+        s = financials.getRealtime((('IBM',), ('MSFT',)), (('LAST_PRICE', 'CURRENCY', Datacode.NAME.value),), 'YAHOO')
+        self.assertEqual(2, len(s.value), 'test_realtime_cell_range {}'.format(s))
+        self.assertEqual(3, len(s.value[0]), 'test_realtime_cell_range {}'.format(s))
+        self.assertEqual('USD', s.value[1][1], 'test_realtime_cell_range CURRENCY {}'.format(s))
+        self.assertEqual('International Business Machines Corporation', s.value[0][2],
+                         'test_realtime_cell_range NAME {}'.format(s))
+
+        s = financials.getRealtime((('IBM',),), Datacode.LAST_PRICE.value, ((1, 2),))
+        self.assertEqual(s, 'Cell range not allowed for source', 'test_realtime_cell_range')
+
     def test_errors_cell_range_passed(self):
         cell_range = ((1, 2), ('3', '4'), (5.0, 6.0))
 
@@ -0,0 +1,174 @@
+#  tickstore.py - persistent realtime cache in ~/.financials-extension/cache.sqlite
+#
+#  license: GNU LGPL
+#
+#  This library is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+import settings
+from datacode import Datacode, TTLClass
+
+logger = logging.getLogger(__name__)
+
+
+# logger.setLevel(logging.DEBUG)
+
+
+def encode_tick(tick):
+
+    """
+    Convert tick data to a JSON compatible dict - dates, times and time zones are tagged, fetch times
+    per TTLClass are kept under the class name
+    """
+
+    data = {}
+
+    for datacode, value in tick.items():
+        if value is None:
+            continue
+        if isinstance(value, datetime.datetime):
+            value = {'dt': value.isoformat()}
+        elif isinstance(value, datetime.date):
+            value = {'d': value.isoformat()}
+        elif isinstance(value, datetime.time):
+            value = {'t': value.isoformat()}
+        elif isinstance(value, datetime.tzinfo):
+            value = {'tz': str(value)}
+        data[datacode.name] = value
+
+    return data
+
+
+def decode_tick(data, tick):
+
+    """
+    Fill tick with values from a dict created by encode_tick()
+    """
+
+    for name, value in data.items():
+        if name in TTLClass.__members__:
+            tick[TTLClass[name]] = value
+            continue
+        if name not in Datacode.__members__:
+            continue
+        if type(value) == dict:
+            if 'dt' in value:
+                value = datetime.datetime.fromisoformat(value['dt'])
+            elif 'd' in value:
+                value = datetime.date.fromisoformat(value['d'])
+            elif 't' in value:
+                value = datetime.time.fromisoformat(value['t'])
+            elif 'tz' in value:
+                value = timezone(value['tz'])
+        tick[Datacode[name]] = value
+
+    return tick
+
+
+def timezone(name):
+    try:
+        import pytz
+        return pytz.timezone(name)
+    except BaseException:
+        return name
+
+
+class TickStore:
+    """
+    Parsed realtime ticks by source and ticker with the time they were fetched
+    """
+
+    def __init__(self, filename):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS realtime ('
+                                'source TEXT NOT NULL, ticker TEXT NOT NULL, timestamp REAL NOT NULL, '
+                                'partial INTEGER NOT NULL DEFAULT 0, data TEXT NOT NULL, PRIMARY KEY (source, ticker))')
+        self.connection.commit()
+
+    def load(self, source, ticker, tick):
+
+        """
+        Fill tick with the stored data for ticker
+
+        :return: tuple of tick and partial flag or None if not stored
+        """
+
+        with self.lock:
+            row = self.connection.execute('SELECT partial, data FROM realtime WHERE source = ? AND ticker = ?',
+                                          (source, ticker)).fetchone()
+        if row is None:
+            return None
+
+        return decode_tick(json.loads(row[1]), tick), bool(row[0])
+
+    def items(self, get_ticker):
+
+        """
+        All stored ticks
+
+        :param get_ticker: function returning an empty tick to fill
+        :return: list of (source, ticker, tick, partial) tuples
+        """
+
+        with self.lock:
+            rows = self.connection.execute('SELECT source, ticker, partial, data FROM realtime').fetchall()
+
+        return [(source, ticker, decode_tick(json.loads(data), get_ticker()), bool(partial))
+                for source, ticker, partial, data in rows]
+
+    def save(self, source, items):
+
+        """
+        Store ticks in one transaction
+
+        :param source: the source e.g. yahoo
+        :param items: list of (ticker, tick, partial) tuples
+        """
+
+        rows = [(source, ticker, tick[Datacode.TIMESTAMP], int(partial), json.dumps(encode_tick(tick)))
+                for ticker, tick, partial in items if type(tick.get(Datacode.TIMESTAMP)) == float]
+
+        with self.lock:
+            self.connection.executemany('INSERT OR REPLACE INTO realtime (source, ticker, timestamp, partial, data) '
+                                        'VALUES (?, ?, ?, ?, ?)', rows)
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+store = None
+store_lock = threading.Lock()
+
+
+def shared():
+
+    """
+    The TickStore shared by all clients - None if it can't be opened
+    """
+
+    global store
+
+    with store_lock:
+        if store is None:
+            try:
+                os.makedirs(settings.basedir, exist_ok=True)
+                store = TickStore(os.path.join(settings.basedir, 'cache.sqlite'))
+            except BaseException:
+                logger.exception("BaseException opening cache.sqlite")
+                store = False
+
+    return store or None